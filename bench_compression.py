@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+消息压缩基准测试
+按 permessage-deflate 的压缩方式（raw deflate）压缩500条搜索结果（search_completed）、
+数据管理列表（data_read_completed）和一个小状态包，比较不同窗口位数 / memLevel / 压缩级别下
+每条消息的压缩耗时与节省的字节数，用于选择 WebSocketServer 的压缩配置
+"""
+
+import os
+import sys
+import time
+import zlib
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'server'))
+
+from C2SPackageHelper import C2SPackageHelper
+from compression import COMPRESSION_MIN_SIZE, WINDOW_BITS, MEM_LEVEL, COMPRESSION_LEVEL
+from bench_packages import build_results
+from bench_wire_format import build_records, frame_size
+
+RESULTS = 500
+ROUNDS = 50
+
+# (窗口位数, memLevel, 压缩级别)
+SETTINGS = [
+    (9, 1, 1),
+    (10, 4, 6),
+    (WINDOW_BITS, MEM_LEVEL, 1),
+    (WINDOW_BITS, MEM_LEVEL, COMPRESSION_LEVEL),
+    (WINDOW_BITS, MEM_LEVEL, 9),
+    (15, 8, 6),
+]
+
+
+def compress_message(data, window_bits, mem_level, level):
+    # 与 permessage-deflate 相同：raw deflate，消息末尾 Z_SYNC_FLUSH 并去掉 00 00 ff ff
+    encoder = zlib.compressobj(level, zlib.DEFLATED, -window_bits, mem_level)
+    compressed = encoder.compress(data) + encoder.flush(zlib.Z_SYNC_FLUSH)
+    return compressed[:-4]
+
+
+def measure(data, window_bits, mem_level, level):
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        compressed = compress_message(data, window_bits, mem_level, level)
+    compress_ms = (time.perf_counter() - started) / ROUNDS * 1000
+
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        decoder = zlib.decompressobj(-window_bits)
+        decoder.decompress(compressed + b'\x00\x00\xff\xff')
+    decompress_ms = (time.perf_counter() - started) / ROUNDS * 1000
+    return len(compressed), compress_ms, decompress_ms
+
+
+def main():
+    C2SPackageHelper.set_wire_format('json')
+    packets = [
+        ('search_completed', C2SPackageHelper.search_completed(build_results(RESULTS))),
+        ('data_read_completed', C2SPackageHelper.data_read_completed(build_records(RESULTS))),
+        ('sniff_progress', C2SPackageHelper.sniff_progress('sniff_1', 'analyzing', 50)),
+    ]
+
+    print(f"搜索结果数: {RESULTS}, 轮数: {ROUNDS}, 最小压缩大小: {COMPRESSION_MIN_SIZE}字节")
+    for name, packet in packets:
+        data = packet if isinstance(packet, bytes) else packet.encode('utf-8')
+        skipped = len(data) < COMPRESSION_MIN_SIZE
+        print()
+        print(f"{name}: {frame_size(packet) / 1024:.1f}KB" + ("（小于阈值，服务端不压缩）" if skipped else ""))
+        print(f"{'窗口/memLevel/级别':<20}{'压缩后(KB)':>12}{'压缩比':>8}{'节省(KB)':>10}{'压缩(ms)':>10}{'解压(ms)':>10}")
+        for window_bits, mem_level, level in SETTINGS:
+            size, compress_ms, decompress_ms = measure(data, window_bits, mem_level, level)
+            label = f"{window_bits}/{mem_level}/{level}"
+            if (window_bits, mem_level, level) == (WINDOW_BITS, MEM_LEVEL, COMPRESSION_LEVEL):
+                label += " (默认)"
+            print(f"{label:<20}{size / 1024:>12.2f}{len(data) / size:>8.1f}{(len(data) - size) / 1024:>10.1f}"
+                  f"{compress_ms:>10.3f}{decompress_ms:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
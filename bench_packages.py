@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+数据包序列化基准测试
+构造500条与真实搜索结果结构一致的中文数据，比较旧的 json.dumps(ensure_ascii=True)、
+紧凑UTF-8 JSON 以及 C2SPackageHelper 当前实现（安装 orjson 时使用 orjson）的包大小和耗时
+"""
+
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'server'))
+
+import C2SPackageHelper as helper_module
+from C2SPackageHelper import C2SPackageHelper
+
+RESULTS = 500
+ROUNDS = 50
+
+
+def build_results(count):
+    """
+    构造与 handle_search_data 发送的搜索结果结构一致的数据
+    """
+    results = []
+    for i in range(count):
+        results.append({
+            'title': f"雅安市人民政府关于进一步加强城市基础设施建设的通知（第{i}号）",
+            'summary': "为深入贯彻落实党中央、国务院关于城市工作的决策部署，进一步提升城市基础设施建设水平，"
+                       "改善人居环境，结合我市实际，现就有关事项通知如下。各区县人民政府要高度重视，认真组织实施。",
+            'url': f"http://www.yaan.gov.cn/xinwen/show/2023101{i % 10}/{100000 + i}.html",
+            'source_url': f"http://www.yaan.gov.cn/xinwen/show/2023101{i % 10}/{100000 + i}.html",
+            'cover_url': f"http://www.yaan.gov.cn/uploads/images/2023/10/{i}.jpg",
+            'image_url': f"http://www.yaan.gov.cn/uploads/images/2023/10/{i}.jpg",
+            'data_source': 'yaanGov',
+            'id': f"{i}_1697000000",
+            'data_source_info': {
+                'name': '雅安市人民政府',
+                'description': '雅安市人民政府门户网站新闻搜索',
+                'enabled': True
+            }
+        })
+    return results
+
+
+def legacy_create_package(package_type, data=None):
+    # 旧实现：默认 ensure_ascii=True，中文转义为 \uXXXX
+    return json.dumps({'type': package_type, 'data': data or {}})
+
+
+def compact_create_package(package_type, data=None):
+    return json.dumps({'type': package_type, 'data': data or {}}, ensure_ascii=False, separators=(',', ':'))
+
+
+def measure(func, *args):
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        result = func(*args)
+    return (time.perf_counter() - started) / ROUNDS * 1000, len(result.encode('utf-8'))
+
+
+def main():
+    data_list = build_results(RESULTS)
+    backend = 'orjson' if helper_module.orjson is not None else 'json'
+
+    cases = [
+        ('json.dumps (旧实现)', lambda: legacy_create_package('search_completed', {'data_list': data_list})),
+        ('json 紧凑UTF-8', lambda: compact_create_package('search_completed', {'data_list': data_list})),
+        (f"C2SPackageHelper ({backend})", lambda: C2SPackageHelper.search_completed(data_list)),
+    ]
+
+    print(f"搜索结果数: {RESULTS}, 轮数: {ROUNDS}")
+    print(f"{'实现':<28}{'大小(KB)':>12}{'耗时(ms)':>12}")
+    for name, func in cases:
+        elapsed, size = measure(func)
+        print(f"{name:<28}{size / 1024:>12.1f}{elapsed:>12.2f}")
+
+    elapsed, size = measure(C2SPackageHelper.searching)
+    print(f"{'searching (预序列化)':<28}{size / 1024:>12.3f}{elapsed:>12.4f}")
+    elapsed, size = measure(legacy_create_package, 'searching')
+    print(f"{'searching (每次序列化)':<28}{size / 1024:>12.3f}{elapsed:>12.4f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+搜索解析吞吐量基准测试
+构造与百度、雅安政府网站结构一致的搜索结果页面，模拟多个搜索同时执行（抓取用固定延迟代替网络I/O），
+比较在搜索线程中直接解析与提交到不同大小的解析进程池时每秒完成的搜索数
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from server import parse_pool
+
+SEARCHES = 32          # 每种配置执行的搜索次数
+SEARCH_THREADS = 8     # 同时执行的搜索数（与 JobManager 的线程数相当）
+FETCH_LATENCY = 0.05   # 模拟的抓取延迟（秒）
+RESULTS_PER_PAGE = 50
+
+SOURCES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'search_sources')
+
+
+def build_baidu_page(count):
+    """
+    构造与百度搜索结果结构一致的页面（含大段脚本和样式，接近真实页面大小）
+    """
+    items = []
+    for i in range(count):
+        items.append(
+            f'<div class="result c-container" id="{i}"><h3 class="t"><a href="http://www.baidu.com/link?url={i:032x}">'
+            f'雅安市人民政府关于进一步加强城市基础设施建设的通知（第{i}号）</a></h3>'
+            f'<div class="c-row"><div class="c-span3"><img src="//t7.baidu.com/it/u={i},{i * 7}&fm=193"></div>'
+            f'<div class="c-span9"><div class="c-abstract">为深入贯彻落实党中央、国务院关于城市工作的决策部署，'
+            f'进一步提升城市基础设施建设水平，改善人居环境，结合我市实际，现就有关事项通知如下。</div>'
+            f'<div class="c-showurl">www.yaan.gov.cn/xinwen/{i}.html</div></div></div></div>'
+        )
+    script = '<script>' + 'var bds={se:{},su:{urdata:[],urSendClick:function(){}}};' * 2000 + '</script>'
+    style = '<style>' + '.c-container{margin:0 0 14px;}.c-abstract{color:#333;}' * 1000 + '</style>'
+    return (f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>雅安_百度搜索</title>{style}</head>'
+            f'<body><div id="content_left">{"".join(items)}</div>{script}</body></html>').encode('utf-8')
+
+
+def build_yaan_page(count):
+    """
+    构造与雅安政府网站搜索结果结构一致的页面
+    """
+    items = []
+    for i in range(count):
+        items.append(
+            f'<li><h1><a href="https://www.yaan.gov.cn/xinwen/show/{100000 + i}.html" target="_blank">'
+            f'雅安市人民政府关于进一步加强城市基础设施建设的通知（第{i}号）</a></h1>'
+            f'<p><span>为深入贯彻落实党中央、国务院关于城市工作的决策部署，进一步提升城市基础设施建设水平。</span></p>'
+            f'<div class="info">发布时间：2023-10-11</div></li>'
+        )
+    nav = ''.join(f'<li><a href="/column/{i}.html">栏目{i}</a></li>' for i in range(200))
+    return (f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>搜索结果</title></head>'
+            f'<body><ul class="nav">{nav}</ul><ul class="search-list">{"".join(items)}</ul></body></html>').encode('utf-8')
+
+
+def run_search(source_file, raw):
+    # 抓取阶段（网络I/O，不占用GIL）+ 解析阶段
+    time.sleep(FETCH_LATENCY)
+    return parse_pool.parse_in_pool(source_file, raw, 'utf-8')
+
+
+def measure(workers, pages):
+    """
+    Returns:
+        float: 每秒完成的搜索数
+    """
+    parse_pool.configure(workers)
+    # 预热：启动解析进程并加载搜索源模块
+    with ThreadPoolExecutor(max_workers=max(workers, 1) * len(pages)) as executor:
+        list(executor.map(lambda page: parse_pool.parse_in_pool(*page, 'utf-8'), pages * max(workers, 1)))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=SEARCH_THREADS) as executor:
+        futures = [executor.submit(run_search, *pages[i % len(pages)]) for i in range(SEARCHES)]
+        for future in futures:
+            future.result()
+    elapsed = time.perf_counter() - started
+    parse_pool.shutdown()
+    return SEARCHES / elapsed
+
+
+def main():
+    pages = [
+        (os.path.join(SOURCES_DIR, 'baidu.py'), build_baidu_page(RESULTS_PER_PAGE)),
+        (os.path.join(SOURCES_DIR, 'yaanGov.py'), build_yaan_page(RESULTS_PER_PAGE)),
+    ]
+    cores = os.cpu_count() or 1
+    print(f"CPU核心数: {cores}, 搜索数: {SEARCHES}, 搜索线程: {SEARCH_THREADS}, 抓取延迟: {FETCH_LATENCY * 1000:.0f}ms")
+    for source_file, raw in pages:
+        rows = parse_pool.parse_source_page(source_file, raw, 'utf-8')
+        print(f"{os.path.basename(source_file)}: 页面 {len(raw) / 1024:.0f}KB, 提取 {len(rows)} 条结果")
+
+    # 输出搜索源的解析日志会影响计时，基准测试期间关闭
+    import logging
+    logging.disable(logging.CRITICAL)
+
+    print(f"{'解析方式':<20}{'搜索/秒':>10}{'加速比':>10}")
+    baseline = measure(0, pages)
+    print(f"{'线程内解析':<20}{baseline:>10.1f}{1.0:>10.2f}")
+    workers = 1
+    while True:
+        throughput = measure(workers, pages)
+        print(f"{f'进程池 ({workers}进程)':<20}{throughput:>10.1f}{throughput / baseline:>10.2f}")
+        if workers >= cores:
+            break
+        workers = min(workers * 2, cores)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+嗅探延迟基准测试
+对本地HTML文件（test_local_html.html 以及 html_cache 中可解码的缓存页面）离线执行规则提取，
+比较“每个提取器各自解析页面”与“一次解析、共享文档”两种方式的耗时
+"""
+
+import glob
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'server'))
+
+from spider_tool import SpiderTool
+from html_document import ParsedDocument
+
+ROUNDS = 20
+
+
+def load_pages():
+    """
+    读取本地页面，跳过无法按UTF-8解码的缓存文件（例如未解压的br响应）
+    """
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    pages = []
+    paths = [os.path.join(base_dir, 'test_local_html.html')]
+    paths += sorted(glob.glob(os.path.join(base_dir, 'search_sources', 'html_cache', '*.html')))
+    for path in paths:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                pages.append((os.path.basename(path), f.read()))
+        except (UnicodeDecodeError, OSError) as e:
+            print(f"跳过 {os.path.basename(path)}: {e.__class__.__name__}")
+    return pages
+
+
+def scale_page(html_content, times):
+    """
+    将页面的 <main> 区域重复若干次，构造更大、更深的页面
+    """
+    start = html_content.find('<main>')
+    end = html_content.find('</main>')
+    if start < 0 or end < 0:
+        return html_content
+    body = html_content[start:end + len('</main>')]
+    nested = body
+    for _ in range(times - 1):
+        nested = '<div class="wrapper">' + nested + body + '</div>'
+    return html_content[:start] + nested + html_content[end + len('</main>'):]
+
+
+def sniff_per_extractor(spider_tool, html_content, target_title):
+    # 旧的调用方式：每个提取器都从原始HTML重新解析
+    title_xpath = spider_tool.extract_title_xpath(html_content, target_title)
+    spider_tool.extract_content_xpath(html_content, title_xpath)
+    spider_tool.extract_image_xpath(html_content)
+
+
+def sniff_shared_document(spider_tool, html_content, target_title):
+    spider_tool.extract_rules('http://localhost/bench', html_content, target_title)
+
+
+def measure(func, *args):
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        func(*args)
+    return (time.perf_counter() - started) / ROUNDS * 1000
+
+
+def main():
+    spider_tool = SpiderTool()
+    target_title = 'Python教程：从入门到精通'
+
+    cases = []
+    for name, html_content in load_pages():
+        cases.append((name, html_content))
+        if '<main>' in html_content:
+            # 逐层嵌套放大，检验正文评分在深层页面上的扩展性
+            for times in (8, 32):
+                cases.append((f"{name} x{times}", scale_page(html_content, times)))
+
+    print(f"{'页面':<32}{'大小(KB)':>10}{'逐个解析(ms)':>16}{'共享文档(ms)':>16}{'解析(ms)':>12}")
+    for name, html_content in cases:
+        per_extractor = measure(sniff_per_extractor, spider_tool, html_content, target_title)
+        shared = measure(sniff_shared_document, spider_tool, html_content, target_title)
+        parse_only = measure(ParsedDocument.from_html, html_content)
+        size_kb = len(html_content.encode('utf-8')) / 1024
+        print(f"{name:<32}{size_kb:>10.1f}{per_extractor:>16.2f}{shared:>16.2f}{parse_only:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+传输格式基准测试
+比较 JSON 与 MessagePack 两种数据包格式在500条搜索结果和数据管理列表上的
+编码耗时、解码耗时以及帧大小（即线上传输的字节数）
+"""
+
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'server'))
+
+import C2SPackageHelper as helper_module
+from C2SPackageHelper import C2SPackageHelper
+from bench_packages import build_results
+
+RESULTS = 500
+ROUNDS = 50
+
+
+def build_records(count):
+    """
+    构造与 data_read_completed 发送的数据管理列表结构一致的数据
+    """
+    return [
+        (i, f"雅安市人民政府关于进一步加强城市基础设施建设的通知（第{i}号）",
+         "为深入贯彻落实党中央、国务院关于城市工作的决策部署，进一步提升城市基础设施建设水平。",
+         f"http://www.yaan.gov.cn/uploads/images/2023/10/{i}.jpg",
+         f"http://www.yaan.gov.cn/xinwen/show/2023101{i % 10}/{100000 + i}.html",
+         'yaanGov', '2023-10-11 10:00:00', '城市建设')
+        for i in range(count)
+    ]
+
+
+def decode_json(frame):
+    return json.loads(frame)
+
+
+def decode_msgpack(frame):
+    return helper_module.msgpack.unpackb(frame, raw=False)
+
+
+def measure(func):
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        result = func()
+    return (time.perf_counter() - started) / ROUNDS * 1000, result
+
+
+def frame_size(frame):
+    return len(frame) if isinstance(frame, bytes) else len(frame.encode('utf-8'))
+
+
+def main():
+    formats = [('json', decode_json)]
+    if helper_module.msgpack is not None:
+        formats.append(('msgpack', decode_msgpack))
+    else:
+        print("未安装 msgpack，仅测试 JSON")
+
+    results = build_results(RESULTS)
+    records = build_records(RESULTS)
+    payloads = [
+        ('search_completed', lambda: C2SPackageHelper.search_completed(results)),
+        ('data_read_completed', lambda: C2SPackageHelper.data_read_completed(records)),
+    ]
+
+    print(f"条数: {RESULTS}, 轮数: {ROUNDS}, JSON后端: {'orjson' if helper_module.orjson is not None else 'json'}")
+    print(f"{'数据包':<22}{'格式':<10}{'大小(KB)':>10}{'编码(ms)':>10}{'解码(ms)':>10}")
+    for name, build in payloads:
+        for fmt, decode in formats:
+            C2SPackageHelper.set_wire_format(fmt)
+            encode_ms, frame = measure(build)
+            decode_ms, _ = measure(lambda: decode(frame))
+            print(f"{name:<22}{fmt:<10}{frame_size(frame) / 1024:>10.1f}{encode_ms:>10.2f}{decode_ms:>10.2f}")
+    C2SPackageHelper.set_wire_format('json')
+
+
+if __name__ == '__main__':
+    main()
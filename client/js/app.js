@@ -8,7 +8,14 @@ const AppState = {
     itemsPerPage: 18, // 6行 × 3列
     selectedItems: new Set(),
     dataRecords: [],
-    searchSources: []
+    syncedRecords: new Map(), // 已同步的全部数据记录（ID -> 记录），dataRecords 可能是其筛选结果
+    dataFilter: null, // 数据管理页面的本地筛选条件 {field, content}，为 null 时显示全部数据
+    dataVersion: null, // 数据记录最后同步到的版本号，用于增量同步
+    searchSources: [],
+    sniffJobs: new Set(), // 进行中的嗅探任务ID
+    sniffRequests: new Map(), // 进行中的嗅探请求ID -> 记录标题（多个嗅探可同时进行）
+    searchRequestId: null, // 最近一次搜索请求的ID，用于忽略被新搜索取代的旧搜索的消息
+    extractJobs: new Set() // 进行中的正文采集任务ID
 };
 
 // 页面加载完成后执行
@@ -44,6 +51,18 @@ function initializeApp() {
     
     // 注册连接建立回调，在连接建立后刷新数据
     WebSocketClient.on('onConnect', function() {
+        // 主页面使用新的连接，先凭会话令牌恢复登录（搜索排队和任务数限制按登录用户计算）
+        WebSocketClient.resumeSession(sessionStorage.getItem('session_token'));
+        
+        // 重新协商数据包格式
+        WebSocketClient.negotiateProtocol();
+        
+        // 订阅数据变更，其他用户入库或删除数据时只接收增量
+        WebSocketClient.send({
+            type: 'subscribe',
+            data: { topics: ['data_records'] }
+        });
+        
         // 刷新数据管理页面
         refreshDataManagementPage();
         
@@ -62,6 +81,9 @@ function registerWebSocketCallbacks() {
     // 连接关闭回调
     WebSocketClient.on('onClose', function() {
         console.log('WebSocket连接已关闭');
+        // 连接断开时服务端会取消该连接的后台任务
+        AppState.sniffJobs.clear();
+        AppState.extractJobs.clear();
     });
     
     // 错误回调
@@ -70,6 +92,16 @@ function registerWebSocketCallbacks() {
         showStatusMessage('连接服务器失败：' + error.message, 'error');
     });
     
+    // 处理恢复登录的结果，会话令牌失效时返回登录页面
+    WebSocketClient.on('login_response', function(data) {
+        if (data.status !== 'success') {
+            sessionStorage.removeItem('user');
+            sessionStorage.removeItem('session_token');
+            WebSocketClient.disconnect();
+            window.location.href = 'login.html';
+        }
+    });
+    
     // 处理服务端发送的错误响应
     WebSocketClient.on('error', function(data) {
         console.error('客户端处理WebSocket错误响应:', data);
@@ -77,10 +109,15 @@ function registerWebSocketCallbacks() {
     });
     
     // 处理嗅探规则响应
-    WebSocketClient.on('sniff_rules_response', function(data) {
+    WebSocketClient.on('sniff_rules_response', function(data, requestId) {
+        if (data.data && data.data.job_id) {
+            AppState.sniffJobs.delete(data.data.job_id);
+        }
+        const title = AppState.sniffRequests.get(requestId) || '';
+        AppState.sniffRequests.delete(requestId);
         if (data.success) {
             console.log('嗅探规则成功:', data.data);
-            showStatusMessage('规则嗅探成功', 'success');
+            showStatusMessage('规则嗅探成功 ' + title, 'success');
             
             // 可以在这里更新界面显示，比如显示提取到的XPath
             const rules = data.data.rules;
@@ -93,7 +130,78 @@ function registerWebSocketCallbacks() {
             refreshDataManagementPage();
         } else {
             console.error('嗅探规则失败:', data.message);
-            showStatusMessage('规则嗅探失败：' + data.message, 'error');
+            showStatusMessage('规则嗅探失败：' + title + ' ' + data.message, 'error');
+        }
+    });
+    
+    // 处理嗅探进度消息
+    WebSocketClient.on('sniff_progress', function(data, requestId) {
+        console.log('嗅探进度:', data);
+        AppState.sniffJobs.add(data.job_id);
+        const title = AppState.sniffRequests.get(requestId) || '';
+        showStatusMessage('正在进行规则嗅探... ' + title + ' ' + data.percent + '%', 'info');
+    });
+    
+    // 处理嗅探取消消息
+    WebSocketClient.on('sniff_cancelled', function(data, requestId) {
+        AppState.sniffJobs.delete(data.job_id);
+        AppState.sniffRequests.delete(requestId);
+        showStatusMessage('规则嗅探已取消', 'warning');
+    });
+    
+    // 处理批量嗅探单项结果消息
+    WebSocketClient.on('sniff_batch_item', function(data) {
+        if (data.success) {
+            console.log('嗅探完成:', data.source_url, data.rules);
+        } else {
+            console.warn('嗅探失败:', data.source_url, data.error);
+        }
+    });
+    
+    // 批量嗅探响应回调
+    WebSocketClient.on('sniff_rules_batch_response', function(data) {
+        if (data.success) {
+            AppState.sniffJobs.delete(data.data.job_id);
+            const result = data.data;
+            showStatusMessage('批量嗅探完成：成功 ' + result.succeeded + ' 条，失败 ' + result.failed +
+                ' 条，跳过 ' + result.skipped.length + ' 条（已有域名规则）', result.failed ? 'warning' : 'success');
+            refreshDataManagementPage();
+        } else {
+            console.error('批量嗅探失败:', data.message);
+            showStatusMessage('批量嗅探失败：' + data.message, 'error');
+        }
+    });
+    
+    // 处理正文提取进度消息
+    WebSocketClient.on('extract_progress', function(data) {
+        console.log('正文提取进度:', data);
+        AppState.extractJobs.add(data.job_id);
+        showStatusMessage('正在采集正文... ' + data.message, 'info');
+    });
+    
+    // 处理正文提取取消消息
+    WebSocketClient.on('extract_cancelled', function(data) {
+        AppState.extractJobs.delete(data.job_id);
+        showStatusMessage('正文采集已取消', 'warning');
+    });
+    
+    // 正文提取响应回调
+    WebSocketClient.on('extract_articles_response', function(data) {
+        if (data.success) {
+            AppState.extractJobs.delete(data.data.job_id);
+            const failed = data.data.results.filter(result => !result.success);
+            failed.forEach(result => console.warn('正文采集失败:', result.url, result.error));
+            
+            if (failed.length === 0) {
+                showStatusMessage('正文采集完成，已更新 ' + data.data.updated + ' 条数据', 'success');
+            } else {
+                showStatusMessage('正文采集完成，已更新 ' + data.data.updated + ' 条数据，' + failed.length + ' 条失败', 'warning');
+            }
+            
+            refreshDataManagementPage();
+        } else {
+            console.error('正文采集失败:', data.message);
+            showStatusMessage('正文采集失败：' + data.message, 'error');
         }
     });
     
@@ -181,6 +289,34 @@ function registerWebSocketCallbacks() {
         showStatusMessage('数据读取完成，共 ' + AppState.dataRecords.length + ' 条数据', 'success');
     });
     
+    // 处理数据记录同步响应（全量快照或增量）
+    WebSocketClient.on('data_sync', function(data) {
+        console.log('客户端收到数据同步:', data.mode, data.version, data.records.length, data.deleted.length);
+        if (data.mode === 'snapshot') {
+            AppState.syncedRecords.clear();
+        }
+        applyRecordChanges(data.records, data.deleted);
+        AppState.dataVersion = data.version;
+        showStatusMessage('数据同步完成，共 ' + AppState.dataRecords.length + ' 条数据', 'success');
+    });
+    
+    // 处理其他用户新增的数据记录（增量）
+    WebSocketClient.on('records_added', function(data) {
+        console.log('客户端收到新增数据记录:', data.records.length);
+        applyRecordChanges(data.records, []);
+    });
+    
+    // 处理其他用户删除的数据记录（增量）
+    WebSocketClient.on('records_deleted', function(data) {
+        console.log('客户端收到删除数据记录:', data.ids.length);
+        applyRecordChanges([], data.ids);
+    });
+    
+    // 处理订阅响应
+    WebSocketClient.on('subscribe_response', function(data) {
+        console.log('客户端已订阅数据变更:', data);
+    });
+    
     // 处理寻找搜索源消息
     WebSocketClient.on('finding_search_sources', function(data) {
         console.log('客户端收到寻找搜索源消息:', data);
@@ -210,13 +346,36 @@ function registerWebSocketCallbacks() {
     });
     
     // 处理搜索完成消息
-    WebSocketClient.on('search_completed', function(data) {
+    WebSocketClient.on('search_completed', function(data, requestId) {
         console.log('客户端收到搜索完成消息:', data);
+        if (requestId !== AppState.searchRequestId) {
+            return;
+        }
+        AppState.searchRequestId = null;
         AppState.searchResults = data.data_list;
         AppState.currentPage = 1;
         displaySearchResults();
         showStatusMessage('搜索完成，共找到 ' + AppState.searchResults.length + ' 条数据', 'success');
     });
+    
+    // 处理搜索排队消息（同时执行的搜索数已达上限，队列位置变化时推送）
+    WebSocketClient.on('search_queued', function(data, requestId) {
+        console.log('客户端收到搜索排队消息:', data);
+        if (requestId !== AppState.searchRequestId) {
+            return;
+        }
+        showStatusMessage('搜索排队中：第 ' + data.position + ' 位，共 ' + data.queue_length + ' 个搜索等待', 'info');
+    });
+    
+    // 处理搜索取消消息（被新搜索取代的旧搜索不提示）
+    WebSocketClient.on('search_cancelled', function(data, requestId) {
+        console.log('客户端收到搜索取消消息:', data);
+        if (requestId !== AppState.searchRequestId) {
+            return;
+        }
+        AppState.searchRequestId = null;
+        showStatusMessage('搜索已取消', 'warning');
+    });
 }
 
 // 初始化页面元素
@@ -293,6 +452,7 @@ function switchPage(pageId) {
 function initializeDataCollectionPage() {
     // 获取DOM元素
     const startSearchBtn = document.getElementById('start-search');
+    const cancelSearchBtn = document.getElementById('cancel-search');
     const searchContentInput = document.getElementById('search-content');
     const maxPagesInput = document.getElementById('max-pages');
     const selectAllBtn = document.getElementById('select-all');
@@ -318,7 +478,11 @@ function initializeDataCollectionPage() {
             }
         };
         
-        if (WebSocketClient.send(searchRequest)) {
+        const requestId = WebSocketClient.send(searchRequest);
+        if (requestId) {
+            // 新搜索会取消服务端仍在进行的上一次搜索
+            AppState.searchRequestId = requestId;
+            
             // 清空之前的搜索结果
             AppState.searchResults = [];
             AppState.selectedItems.clear();
@@ -329,6 +493,23 @@ function initializeDataCollectionPage() {
         }
     });
     
+    // 取消搜索按钮点击事件
+    cancelSearchBtn.addEventListener('click', function() {
+        if (!AppState.searchRequestId) {
+            showStatusMessage('没有正在进行的搜索', 'warning');
+            return;
+        }
+        
+        const cancelRequest = {
+            type: 'cancel_search',
+            data: {}
+        };
+        
+        if (!WebSocketClient.send(cancelRequest)) {
+            showStatusMessage('发送取消搜索请求失败，请检查连接', 'error');
+        }
+    });
+    
     // 全选按钮点击事件
     selectAllBtn.addEventListener('click', function() {
         const currentPageResults = getCurrentPageResults();
@@ -386,6 +567,8 @@ function initializeDataManagementPage() {
     const deselectAllDataBtn = document.getElementById('deselect-all-data');
     const deleteSelectedDataBtn = document.getElementById('delete-selected-data');
     const analyzeSelectedDataBtn = document.getElementById('analyze-selected-data');
+    const sniffSelectedDataBtn = document.getElementById('sniff-selected-data');
+    const cancelDataJobsBtn = document.getElementById('cancel-data-jobs');
     
     // 搜索数据按钮点击事件
     searchDataBtn.addEventListener('click', function() {
@@ -393,20 +576,17 @@ function initializeDataManagementPage() {
         const searchField = dataSearchFieldSelect.value;
         
         if (!searchContent) {
-            // 没有搜索内容，刷新所有数据
+            // 没有搜索内容，清除筛选并刷新所有数据
+            AppState.dataFilter = null;
             refreshDataManagementPage();
             return;
         }
         
-        // 这里可以添加数据搜索逻辑
-        // 目前先简单过滤本地数据
-        const filteredRecords = AppState.dataRecords.filter(record => {
-            return record[searchField].toLowerCase().includes(searchContent.toLowerCase());
-        });
-        
-        AppState.dataRecords = filteredRecords;
+        // 在本地已同步的数据中筛选，之后收到的数据变更也按该条件筛选
+        AppState.dataFilter = { field: searchField, content: searchContent.toLowerCase() };
+        AppState.dataRecords = getDisplayedRecords();
         displayDataRecords();
-        showStatusMessage('搜索完成，共找到 ' + filteredRecords.length + ' 条数据', 'success');
+        showStatusMessage('搜索完成，共找到 ' + AppState.dataRecords.length + ' 条数据', 'success');
     });
     
     // 全选按钮点击事件
@@ -446,7 +626,8 @@ function initializeDataManagementPage() {
             const deleteRequest = {
                 type: 'delete_data',
                 data: {
-                    selected_ids: Array.from(AppState.selectedItems)
+                    selected_ids: Array.from(AppState.selectedItems),
+                    since_version: AppState.dataVersion
                 }
             };
             
@@ -466,6 +647,39 @@ function initializeDataManagementPage() {
         // 这里可以添加数据分析逻辑
         showStatusMessage('数据分析功能将在后续版本中实现', 'info');
     });
+    
+    // 嗅探选中数据按钮点击事件
+    sniffSelectedDataBtn.addEventListener('click', function() {
+        if (AppState.selectedItems.size === 0) {
+            showStatusMessage('请先选择要嗅探的数据', 'warning');
+            return;
+        }
+        
+        showStatusMessage('正在批量嗅探规则...', 'info');
+        
+        // 发送批量嗅探请求（已有高置信度域名规则的数据由服务端跳过）
+        const batchRequest = {
+            type: 'sniff_rules_batch',
+            data: {
+                record_ids: Array.from(AppState.selectedItems)
+            }
+        };
+        
+        if (!WebSocketClient.send(batchRequest)) {
+            showStatusMessage('发送批量嗅探请求失败，请检查连接', 'error');
+        }
+    });
+    
+    // 取消嗅探/采集按钮点击事件：取消所有进行中的嗅探和正文采集任务
+    cancelDataJobsBtn.addEventListener('click', function() {
+        if (AppState.sniffJobs.size === 0 && AppState.extractJobs.size === 0) {
+            showStatusMessage('没有正在进行的嗅探或采集', 'warning');
+            return;
+        }
+        
+        AppState.sniffJobs.forEach(jobId => cancelSniff(jobId));
+        AppState.extractJobs.forEach(jobId => cancelExtract(jobId));
+    });
 }
 
 // 初始化搜索源管理页面元素
@@ -487,8 +701,10 @@ function initializeProfilePage() {
     // 退出登录按钮点击事件
     logoutBtn.addEventListener('click', function() {
         if (confirm('确定要退出登录吗？')) {
-            // 清空会话存储的用户信息
+            // 通知服务端删除会话令牌，并清空会话存储的用户信息
+            WebSocketClient.send({ type: 'logout' });
             sessionStorage.removeItem('user');
+            sessionStorage.removeItem('session_token');
             
             // 断开WebSocket连接
             WebSocketClient.disconnect();
@@ -542,20 +758,56 @@ function loadProfile() {
 
 // 刷新数据管理页面
 function refreshDataManagementPage() {
-    // 清空显示的数据
-    AppState.dataRecords = [];
+    // 先显示已同步的数据（按当前筛选条件），再只请求上次同步之后的变更
+    AppState.dataRecords = getDisplayedRecords();
     displayDataRecords();
     
-    // 发送数据管理刷新请求
-    const refreshRequest = {
-        type: 'refresh_data_management'
+    // 发送数据同步请求，没有版本号时服务端返回全量快照
+    const syncRequest = {
+        type: 'sync_data_records',
+        data: {
+            since_version: AppState.dataVersion
+        }
     };
     
-    if (!WebSocketClient.send(refreshRequest)) {
+    if (!WebSocketClient.send(syncRequest)) {
         showStatusMessage('发送数据管理刷新请求失败，请检查连接', 'error');
     }
 }
 
+// 将新增/修改和删除的记录合并到已同步的数据中并刷新显示
+function applyRecordChanges(records, deletedIds) {
+    records.forEach(record => AppState.syncedRecords.set(record.id, record));
+    deletedIds.forEach(id => {
+        AppState.syncedRecords.delete(id);
+        AppState.selectedItems.delete(id);
+    });
+    AppState.dataRecords = getDisplayedRecords();
+    displayDataRecords();
+}
+
+// 获取数据管理页面要显示的记录：已同步的全部数据按当前筛选条件过滤后排序
+function getDisplayedRecords() {
+    let records = Array.from(AppState.syncedRecords.values());
+    const filter = AppState.dataFilter;
+    if (filter) {
+        records = records.filter(record => {
+            return String(record[filter.field] || '').toLowerCase().includes(filter.content);
+        });
+    }
+    return sortDataRecords(records);
+}
+
+// 按采集时间倒序排列数据记录（与服务端查询顺序一致）
+function sortDataRecords(records) {
+    return records.sort((a, b) => {
+        if (a.created_at !== b.created_at) {
+            return a.created_at < b.created_at ? 1 : -1;
+        }
+        return b.id - a.id;
+    });
+}
+
 // 刷新搜索源管理页面
 function refreshSearchSourceManagementPage() {
     // 发送搜索源管理刷新请求
@@ -929,11 +1181,38 @@ function createDataTableRow(record) {
     return row;
 }
 
-// 采集功能（待实现）
+// 采集功能实现：按已嗅探的规则提取完整正文
 function collectData(recordId) {
     console.log('采集数据:', recordId);
+    
     // 显示提示信息
-    showStatusMessage('采集功能将在后续版本实现', 'info');
+    showStatusMessage('正在采集正文...', 'info');
+    
+    // 发送采集请求到服务器（提取在服务端后台执行，进度通过 extract_progress 推送）
+    const extractRequest = {
+        type: 'extract_articles',
+        data: {
+            record_ids: [recordId]
+        }
+    };
+    
+    if (!WebSocketClient.send(extractRequest)) {
+        showStatusMessage('发送采集请求失败，请检查连接', 'error');
+    }
+}
+
+// 取消正文采集任务
+function cancelExtract(jobId) {
+    const cancelRequest = {
+        type: 'cancel_extract',
+        data: {
+            job_id: jobId
+        }
+    };
+    
+    if (!WebSocketClient.send(cancelRequest)) {
+        showStatusMessage('发送取消采集请求失败，请检查连接', 'error');
+    }
 }
 
 // 嗅探功能实现
@@ -956,11 +1235,35 @@ function sniffData(recordId) {
     // 显示提示信息
     showStatusMessage('正在进行规则嗅探...', 'info');
     
-    // 发送嗅探请求到服务器
-    WebSocketClient.send('sniff_rules', {
-        source_url: record.source_url,
-        target_title: record.title
-    });
+    // 发送嗅探请求到服务器（嗅探在服务端后台执行，进度通过 sniff_progress 推送）
+    const sniffRequest = {
+        type: 'sniff_rules',
+        data: {
+            source_url: record.source_url,
+            target_title: record.title
+        }
+    };
+    
+    const requestId = WebSocketClient.send(sniffRequest);
+    if (requestId) {
+        AppState.sniffRequests.set(requestId, record.title);
+    } else {
+        showStatusMessage('发送嗅探请求失败，请检查连接', 'error');
+    }
+}
+
+// 取消嗅探任务
+function cancelSniff(jobId) {
+    const cancelRequest = {
+        type: 'cancel_sniff',
+        data: {
+            job_id: jobId
+        }
+    };
+    
+    if (!WebSocketClient.send(cancelRequest)) {
+        showStatusMessage('发送取消嗅探请求失败，请检查连接', 'error');
+    }
 }
 
 
@@ -21,6 +21,7 @@ window.addEventListener('load', function() {
         if (data.status === 'success') {
             // 登录成功，保存用户信息并跳转到主页面
             sessionStorage.setItem('user', JSON.stringify(data.user));
+            sessionStorage.setItem('session_token', data.token || '');
             loginMessage.textContent = '登录成功，正在跳转到主页面...';
             loginMessage.style.backgroundColor = 'rgba(76, 175, 80, 0.3)';
             loginMessage.style.color = '#4caf50';
@@ -65,7 +66,8 @@ window.addEventListener('load', function() {
             type: 'login',
             data: {
                 username: username,
-                password: password
+                password: password,
+                wire_format: WebSocketClient.preferredWireFormat()
             }
         };
         
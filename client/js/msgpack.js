@@ -0,0 +1,105 @@
+// MessagePack解码模块
+// 服务端协商为 msgpack 传输格式后，数据包以二进制帧发送，由此模块解码为与JSON相同结构的对象
+const MessagePack = {
+    textDecoder: new TextDecoder('utf-8'),
+
+    // 解码一个完整的MessagePack数据包
+    decode: function(bytes) {
+        const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+        const state = { bytes: bytes, view: view, offset: 0 };
+        const value = this.read(state);
+        if (state.offset !== bytes.byteLength) {
+            throw new Error('MessagePack数据包末尾有多余字节');
+        }
+        return value;
+    },
+
+    // 读取一个值
+    read: function(state) {
+        const view = state.view;
+        const type = view.getUint8(state.offset++);
+
+        // positive fixint / fixmap / fixarray / fixstr / negative fixint
+        if (type < 0x80) return type;
+        if (type < 0x90) return this.readMap(state, type & 0x0f);
+        if (type < 0xa0) return this.readArray(state, type & 0x0f);
+        if (type < 0xc0) return this.readString(state, type & 0x1f);
+        if (type >= 0xe0) return type - 0x100;
+
+        let length;
+        switch (type) {
+            case 0xc0: return null;
+            case 0xc2: return false;
+            case 0xc3: return true;
+
+            // bin 8 / 16 / 32
+            case 0xc4: length = view.getUint8(state.offset); state.offset += 1; return this.readBinary(state, length);
+            case 0xc5: length = view.getUint16(state.offset); state.offset += 2; return this.readBinary(state, length);
+            case 0xc6: length = view.getUint32(state.offset); state.offset += 4; return this.readBinary(state, length);
+
+            // float 32 / 64
+            case 0xca: state.offset += 4; return view.getFloat32(state.offset - 4);
+            case 0xcb: state.offset += 8; return view.getFloat64(state.offset - 8);
+
+            // uint 8 / 16 / 32 / 64
+            case 0xcc: state.offset += 1; return view.getUint8(state.offset - 1);
+            case 0xcd: state.offset += 2; return view.getUint16(state.offset - 2);
+            case 0xce: state.offset += 4; return view.getUint32(state.offset - 4);
+            case 0xcf: state.offset += 8; return Number(view.getBigUint64(state.offset - 8));
+
+            // int 8 / 16 / 32 / 64
+            case 0xd0: state.offset += 1; return view.getInt8(state.offset - 1);
+            case 0xd1: state.offset += 2; return view.getInt16(state.offset - 2);
+            case 0xd2: state.offset += 4; return view.getInt32(state.offset - 4);
+            case 0xd3: state.offset += 8; return Number(view.getBigInt64(state.offset - 8));
+
+            // str 8 / 16 / 32
+            case 0xd9: length = view.getUint8(state.offset); state.offset += 1; return this.readString(state, length);
+            case 0xda: length = view.getUint16(state.offset); state.offset += 2; return this.readString(state, length);
+            case 0xdb: length = view.getUint32(state.offset); state.offset += 4; return this.readString(state, length);
+
+            // array 16 / 32
+            case 0xdc: length = view.getUint16(state.offset); state.offset += 2; return this.readArray(state, length);
+            case 0xdd: length = view.getUint32(state.offset); state.offset += 4; return this.readArray(state, length);
+
+            // map 16 / 32
+            case 0xde: length = view.getUint16(state.offset); state.offset += 2; return this.readMap(state, length);
+            case 0xdf: length = view.getUint32(state.offset); state.offset += 4; return this.readMap(state, length);
+        }
+        throw new Error('不支持的MessagePack类型: 0x' + type.toString(16));
+    },
+
+    readString: function(state, length) {
+        const value = this.textDecoder.decode(state.bytes.subarray(state.offset, state.offset + length));
+        state.offset += length;
+        return value;
+    },
+
+    readBinary: function(state, length) {
+        const value = state.bytes.slice(state.offset, state.offset + length);
+        state.offset += length;
+        return value;
+    },
+
+    readArray: function(state, length) {
+        const value = new Array(length);
+        for (let i = 0; i < length; i++) {
+            value[i] = this.read(state);
+        }
+        return value;
+    },
+
+    readMap: function(state, length) {
+        const value = {};
+        for (let i = 0; i < length; i++) {
+            const key = this.read(state);
+            value[key] = this.read(state);
+        }
+        return value;
+    }
+};
+
+// 导出MessagePack模块
+if (typeof module !== 'undefined' && module.exports) {
+    module.exports = MessagePack;
+}
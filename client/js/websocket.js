@@ -5,12 +5,17 @@ const WebSocketClient = {
     callbacks: {},
     reconnectInterval: 5000, // 重连间隔时间（毫秒）
     reconnectTimer: null, // 重连定时器
+    wireFormat: 'json', // 服务端数据包格式（json / msgpack），连接建立后协商
+    nextRequestId: 1, // 下一个请求ID，服务端在该请求的所有响应中回显
     
     // 连接到WebSocket服务器
     connect: function(host = 'ws://localhost:8080') {
         console.log('客户端尝试连接WebSocket服务器:', host);
         try {
             this.socket = new WebSocket(host);
+            // MessagePack数据包以二进制帧发送
+            this.socket.binaryType = 'arraybuffer';
+            this.wireFormat = 'json';
             
             this.socket.onopen = () => {
                 console.log('客户端WebSocket连接已成功建立');
@@ -25,7 +30,9 @@ const WebSocketClient = {
             this.socket.onmessage = (event) => {
                 console.log('客户端收到WebSocket消息:', event.data);
                 try {
-                    const message = JSON.parse(event.data);
+                    const message = typeof event.data === 'string'
+                        ? JSON.parse(event.data)
+                        : MessagePack.decode(new Uint8Array(event.data));
                     this.handleMessage(message);
                 } catch (error) {
                     console.error('客户端解析WebSocket消息失败:', error);
@@ -92,15 +99,18 @@ const WebSocketClient = {
         }
     },
     
-    // 发送消息
+    // 发送消息，成功时返回请求ID（服务端并发处理请求，可据此匹配响应）
     send: function(message) {
         console.log('客户端尝试发送WebSocket消息:', message);
         if (this.isConnected) {
             try {
+                if (message.request_id === undefined) {
+                    message.request_id = this.nextRequestId++;
+                }
                 const jsonMessage = JSON.stringify(message);
                 this.socket.send(jsonMessage);
                 console.log('客户端WebSocket消息发送成功:', jsonMessage);
-                return true;
+                return message.request_id;
             } catch (error) {
                 console.error('客户端WebSocket消息发送失败:', error);
                 return false;
@@ -111,14 +121,41 @@ const WebSocketClient = {
         }
     },
     
+    // 客户端希望使用的数据包格式（加载了MessagePack解码模块时使用msgpack）
+    preferredWireFormat: function() {
+        return typeof MessagePack !== 'undefined' ? 'msgpack' : 'json';
+    },
+    
+    // 请求协商数据包格式（登录请求中也可以通过 wire_format 字段请求）
+    negotiateProtocol: function() {
+        return this.send({
+            type: 'negotiate_protocol',
+            data: { wire_format: this.preferredWireFormat() }
+        });
+    },
+    
+    // 凭登录时获得的会话令牌恢复登录状态（每个新连接都需要，服务端按连接记录登录用户）
+    resumeSession: function(token) {
+        return this.send({
+            type: 'resume_session',
+            data: { token: token }
+        });
+    },
+    
     // 处理接收到的消息
     handleMessage: function(message) {
         console.log('客户端处理WebSocket消息:', message);
         
+        // 记录协商结果，之后的数据包可能是二进制帧
+        if (message.type === 'protocol_negotiated') {
+            this.wireFormat = message.data.wire_format;
+            console.log('客户端数据包格式协商完成:', this.wireFormat);
+        }
+        
         // 根据消息类型触发相应的回调
         if (message.type && this.callbacks[message.type]) {
             console.log('客户端触发WebSocket消息回调:', message.type);
-            this.callbacks[message.type](message.data);
+            this.callbacks[message.type](message.data, message.request_id);
         } else {
             console.warn('客户端未处理的WebSocket消息类型:', message.type);
         }
@@ -1,11 +1,18 @@
 from weakref import ref
-import requests
-from urllib.parse import quote, unquote
+from urllib.parse import quote
 import logging
 import time
 import json
+import os
+import sys
 from bs4 import BeautifulSoup
 
+# 添加项目根目录到Python路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from server.http_client import get_http_client
+from server.parse_pool import parse_in_pool, decode_html
+
 # 配置日志 - 添加文件输出
 logging.basicConfig(
     level=logging.INFO,  # 设置为INFO级别，但在代码中关键位置使用INFO日志
@@ -17,11 +24,14 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# parse_page 返回的结果元组字段
+RESULT_FIELDS = ('title', 'summary', 'url', 'cover_url')
+
 class BaiduSpider:
     def __init__(self):
         # 初始化基本配置
         self.base_url = 'https://www.baidu.com/s'
-        # 使用用户提供的请求头 - 移除accept-encoding避免编码问题
+        # 使用用户提供的请求头 - accept-encoding由共享HTTP客户端按可用解码器统一设置（gzip/deflate/br）
         self.headers = {
             'accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
             'accept-language': 'zh-CN,zh;q=0.9,en-US;q=0.8,en;q=0.7,en-GB;q=0.6',
@@ -29,9 +39,8 @@ class BaiduSpider:
             'connection': 'keep-alive',
             'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36 Edg/142.0.0.0'
         }
-        # 创建会话对象
-        self.session = requests.Session()
-        self.session.headers.update(self.headers)
+        # 使用共享HTTP客户端（按主机复用连接、限速和重试）
+        self.http = get_http_client()
     
     def search(self, keyword, page=1):
         """
@@ -66,20 +75,17 @@ class BaiduSpider:
         
         try:
             # 发送请求，直接使用构造好的URL
-            response = self.session.get(
-                url=full_url,
-                timeout=15
+            response = self.http.get(
+                full_url,
+                headers=self.headers,
+                timeout=15,
+                source='baidu'
             )
             
             # 检查响应状态
             response.raise_for_status()
             
-            # 智能处理编码问题
-            # 让requests自动检测编码
-            response.encoding = response.apparent_encoding
-            # 如果检测失败，尝试使用UTF-8
-            if response.encoding is None or response.encoding == 'ISO-8859-1':
-                response.encoding = 'utf-8'
+            # 此处不解码：字符集检测和HTML解析都在解析进程中进行（见 parse_page）
             
             logging.info(f'请求成功，状态码: {response.status_code}')
             logging.info(f'实际访问的URL: {response.url}')
@@ -94,7 +100,8 @@ class BaiduSpider:
                 'status': 'success',
                 'status_code': response.status_code,
                 'url': response.url,
-                'content': response.text,
+                'content': response.content,
+                'encoding': self.http.get_declared_encoding(response),
                 'params': params_info
             }
             
@@ -106,7 +113,8 @@ class BaiduSpider:
                 'url': full_url
             }
     
-    def extract_search_results(self, html_content):
+    @staticmethod
+    def extract_search_results(html_content):
         """
         使用BeautifulSoup从HTML中提取搜索结果信息
         
@@ -284,8 +292,8 @@ class BaiduSpider:
             # 如果成功，保存完整的HTML内容
             if result.get('status') == 'success':
                 html_filename = rf'html_cache\baidu_search_response_{keyword}_{page}.html'
-                # 保存完整的HTML内容
-                with open(html_filename, 'w', encoding='utf-8') as f:
+                # 保存完整的HTML内容（原始响应字节）
+                with open(html_filename, 'wb') as f:
                     f.write(result['content'])
                 logging.info(f'完整HTML响应已保存到 {html_filename}')
                 
@@ -294,6 +302,20 @@ class BaiduSpider:
             logging.error(f'保存响应信息失败: {str(e)}')
             return False
 
+def parse_page(raw, encoding=None):
+    """
+    解析阶段（在解析进程池中执行）：解码原始响应并提取搜索结果
+    
+    Args:
+        raw (bytes): 原始响应内容
+        encoding (str, optional): 响应头声明的字符集
+        
+    Returns:
+        list: 结果元组列表，字段顺序见 RESULT_FIELDS
+    """
+    results = BaiduSpider.extract_search_results(decode_html(raw, encoding))
+    return [tuple(result[field] for field in RESULT_FIELDS) for result in results]
+
 def run_spider(keyword, page=1):
     """
     运行爬虫的主函数 - 专注于动态参数处理和数据提取
@@ -330,13 +352,14 @@ def run_spider(keyword, page=1):
             
             # 显示响应大小信息
             content_size = len(result['content'])
-            print(f"\n响应内容大小: {content_size} 字符")
+            print(f"\n响应内容大小: {content_size} 字节")
             print(f"响应信息已保存到: search_info_{keyword}_{page}.json")
             print(f"完整HTML内容已保存到: search_response_{keyword}_{page}.html")
             
             # 提取搜索结果信息
             print(f"\n🔍 正在提取搜索结果信息...")
-            extracted_results = spider.extract_search_results(result['content'])
+            rows = parse_in_pool(__file__, result['content'], result.get('encoding'))
+            extracted_results = [dict(zip(RESULT_FIELDS, row)) for row in rows]
             
             # 保存提取的搜索结果
             if extracted_results:
@@ -358,7 +381,7 @@ def run_spider(keyword, page=1):
         logging.error(error_msg)
         return {'status': 'error', 'message': str(e)}
 
-def main(keyword, max_pages=1):
+def main(keyword, max_pages=1, cancel_event=None):
     try:  
         # 验证关键词
         if not keyword.strip():
@@ -367,6 +390,11 @@ def main(keyword, max_pages=1):
         
         all_results = []
         for page in range(1, max_pages + 1):
+            # 搜索已取消时不再请求后续页面
+            if cancel_event is not None and cancel_event.is_set():
+                print("\n搜索已取消")
+                break
+            
             # 执行爬虫
             print("\n正在发送请求，请稍候...")
             response = run_spider(keyword, page)
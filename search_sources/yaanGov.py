@@ -2,9 +2,19 @@ import requests
 from bs4 import BeautifulSoup
 import json
 import os
+import sys
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from server.http_client import get_http_client
+from server.parse_pool import parse_in_pool, decode_html
+
+# parse_page 返回的结果元组字段
+RESULT_FIELDS = ('title', 'summary', 'image_url', 'source_url')
 
 def fetch_webpage(keyword, page_num):
-    """根据关键词和页码获取网页内容"""
+    """根据关键词和页码获取网页内容，返回 (原始响应字节, 响应头声明的字符集)，失败时返回 None"""
     url = f"https://www.yaan.gov.cn/search.html?q={keyword}&page={page_num}&cbz=1"
     
     # 设置请求头，模拟浏览器访问
@@ -27,10 +37,12 @@ def fetch_webpage(keyword, page_num):
     }
     
     try:
-        response = requests.get(url, headers=headers)
+        http = get_http_client()
+        response = http.get(url, headers=headers, source='yaanGov')
         response.raise_for_status()  # 检查请求是否成功
         
-        return response.text
+        # 不在此处解码，由解析进程解码并解析（见 parse_page）
+        return response.content, http.get_declared_encoding(response)
     except requests.exceptions.RequestException as e:
         print(f"获取网页失败: {e}")
         return None
@@ -74,6 +86,11 @@ def extract_information(html_content):
     
     return results
 
+def parse_page(raw, encoding=None):
+    """解析阶段（在解析进程池中执行）：解码原始响应并提取信息，返回结果元组列表（字段顺序见 RESULT_FIELDS）"""
+    results = extract_information(decode_html(raw, encoding))
+    return [tuple(result[field] for field in RESULT_FIELDS) for result in results]
+
 def save_to_json(data, keyword, page_num):
     """将提取的信息保存为JSON文件"""
     if not data:
@@ -95,7 +112,7 @@ def save_to_json(data, keyword, page_num):
     except Exception as e:
         print(f"保存文件失败: {e}")
 
-def main(keyword, max_pages):
+def main(keyword, max_pages, cancel_event=None):
     
     # 验证输入
     if not keyword:
@@ -111,17 +128,23 @@ def main(keyword, max_pages):
     result = []
 
     for page_num in range(1, max_pages + 1):
+        # 搜索已取消时不再请求后续页面
+        if cancel_event is not None and cancel_event.is_set():
+            print("搜索已取消")
+            break
+        
         # 爬取网页
         print(f"正在爬取关键词: {keyword}, 页码: {page_num}")
-        html_content = fetch_webpage(keyword, page_num)
+        page = fetch_webpage(keyword, page_num)
         
-        if not html_content:
+        if not page:
             print("爬取失败，无法继续")
             break
         
-        # 提取信息
+        # 提取信息（在共享的解析进程池中解析）
         print("正在提取信息...")
-        extracted_data = extract_information(html_content)
+        raw, encoding = page
+        extracted_data = [dict(zip(RESULT_FIELDS, row)) for row in parse_in_pool(__file__, raw, encoding)]
         
         if not extracted_data:
             print("没有提取到任何信息")
@@ -1,5 +1,62 @@
+import contextvars
 import json
 
+# 安装了 orjson 时使用更快的序列化实现
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 安装了 msgpack 时支持二进制 MessagePack 传输格式
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+SUPPORTED_WIRE_FORMATS = ('json', 'msgpack') if msgpack is not None else ('json',)
+
+# 当前连接协商的传输格式，由服务端在处理每个连接的消息前设置
+wire_format = contextvars.ContextVar('wire_format', default='json')
+
+# 当前处理的客户端请求ID，设置后回显在该请求的所有响应和进度数据包中
+request_id = contextvars.ContextVar('request_id', default=None)
+
+
+def dumps(package):
+    """
+    将数据包序列化为紧凑的UTF-8 JSON字符串（中文不转义为 \\uXXXX）
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(package, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+        except TypeError:
+            # orjson 不支持的类型（如超过64位的整数）交给标准库处理
+            pass
+    return json.dumps(package, ensure_ascii=False, separators=(',', ':'))
+
+
+def encode(package, fmt='json'):
+    """
+    按传输格式编码数据包
+
+    Returns:
+        str | bytes: JSON文本帧（str）或 MessagePack 二进制帧（bytes）
+    """
+    if fmt == 'msgpack' and msgpack is not None:
+        return msgpack.packb(package, use_bin_type=True, default=str)
+    return dumps(package)
+
+
+def splice_request_id(frame, fmt, rid):
+    """
+    在预先序列化的数据包（只含 type 和 data 两个键）末尾追加 request_id，无需重新序列化
+    """
+    if fmt == 'msgpack' and msgpack is not None:
+        # fixmap 的键数在首字节低4位，键值对依次排列，直接追加一对即可
+        return bytes([frame[0] + 1]) + frame[1:] + msgpack.packb('request_id') + msgpack.packb(rid, default=str)
+    return frame[:-1] + ',"request_id":' + dumps(rid) + '}'
+
+
 class C2SPackageHelper:
     @staticmethod
     def create_package(package_type, data=None):
@@ -11,24 +68,70 @@ class C2SPackageHelper:
             data (dict, optional): 数据包内容
             
         Returns:
-            str: 序列化后的JSON数据包
+            str | bytes: 按当前连接的传输格式序列化后的数据包，
+                默认为JSON字符串，协商为 msgpack 时为 MessagePack 字节；
+                正在处理带 request_id 的请求时数据包中回显该ID
         """
         package = {
             'type': package_type,
             'data': data or {}
         }
-        return json.dumps(package)
+        rid = request_id.get()
+        if rid is not None:
+            package['request_id'] = rid
+        return encode(package, wire_format.get())
+    
+    @staticmethod
+    def negotiate_wire_format(requested):
+        """
+        协商传输格式，不支持的格式回退为 json
+        """
+        return requested if requested in SUPPORTED_WIRE_FORMATS else 'json'
+    
+    @staticmethod
+    def set_wire_format(fmt):
+        """
+        设置当前上下文（连接）的传输格式
+        """
+        wire_format.set(fmt)
+    
+    @staticmethod
+    def set_request_id(rid):
+        """
+        设置当前上下文（请求）的请求ID
+        """
+        request_id.set(rid)
+    
+    @staticmethod
+    def static_package(name):
+        fmt = wire_format.get()
+        frame = STATIC_PACKAGES[name][fmt]
+        rid = request_id.get()
+        return frame if rid is None else splice_request_id(frame, fmt, rid)
+    
+    # 协议协商数据包（始终以JSON发送，客户端据此切换解码方式）
+    @staticmethod
+    def protocol_negotiated(fmt):
+        package = {'type': 'protocol_negotiated', 'data': {'wire_format': fmt}}
+        rid = request_id.get()
+        if rid is not None:
+            package['request_id'] = rid
+        return encode(package)
     
     # 登录相关数据包
     @staticmethod
-    def login_success(username, permission_level):
-        return C2SPackageHelper.create_package('login_response', {
+    def login_success(username, permission_level, token=None):
+        data = {
             'status': 'success',
             'user': {
                 'username': username,
                 'permission_level': permission_level
             }
-        })
+        }
+        # 会话令牌只在用户名密码登录时下发，页面的新连接凭令牌恢复登录（见 resume_session）
+        if token:
+            data['token'] = token
+        return C2SPackageHelper.create_package('login_response', data)
     
     @staticmethod
     def login_failure(message='用户名或密码错误'):
@@ -40,7 +143,7 @@ class C2SPackageHelper:
     # 数据搜索相关数据包
     @staticmethod
     def searching(): 
-        return C2SPackageHelper.create_package('searching')
+        return C2SPackageHelper.static_package('searching')
     
     @staticmethod
     def search_completed(data_list):
@@ -48,21 +151,66 @@ class C2SPackageHelper:
             'data_list': data_list
         })
     
+    @staticmethod
+    def data_sync(mode, version, records, deleted_ids=None):
+        """
+        数据记录同步数据包
+
+        Args:
+            mode (str): 'snapshot' 全量（records 为全部记录）或 'delta' 增量
+            version (int): 同步到的版本号，客户端下次同步时提交
+            records (list): 新增或修改的记录
+            deleted_ids (list, optional): 删除的记录ID
+        """
+        return C2SPackageHelper.create_package('data_sync', {
+            'mode': mode,
+            'version': version,
+            'records': records,
+            'deleted': deleted_ids or []
+        })
+    
+    # 数据变更广播数据包（只包含增量）
+    @staticmethod
+    def records_added(topic, records):
+        return C2SPackageHelper.create_package('records_added', {
+            'topic': topic,
+            'records': records
+        })
+    
+    @staticmethod
+    def records_deleted(topic, record_ids):
+        return C2SPackageHelper.create_package('records_deleted', {
+            'topic': topic,
+            'ids': record_ids
+        })
+    
+    @staticmethod
+    def search_queued(job_id, position, queue_length):
+        return C2SPackageHelper.create_package('search_queued', {
+            'job_id': job_id,
+            'position': position,
+            'queue_length': queue_length
+        })
+    
+    @staticmethod
+    def search_cancelled(job_id):
+        return C2SPackageHelper.create_package('search_cancelled', {
+            'job_id': job_id
+        })
+    
     # 数据筛选相关数据包
     @staticmethod
     def filter_received(): 
-        return C2SPackageHelper.create_package('filter_received')
+        return C2SPackageHelper.static_package('filter_received')
     
     @staticmethod
     def filter_completed(): 
-        return C2SPackageHelper.create_package('filter_completed')
+        return C2SPackageHelper.static_package('filter_completed')
     
     # 数据管理相关数据包
     @staticmethod
     def reading_data(): 
-        return C2SPackageHelper.create_package('data_management_response', {
-            'status': 'reading'
-        })
+        return C2SPackageHelper.static_package('reading_data')
     
     @staticmethod
     def data_read_completed(data_list):
@@ -73,16 +221,16 @@ class C2SPackageHelper:
     
     @staticmethod
     def deleting_data(): 
-        return C2SPackageHelper.create_package('deleting_data')
+        return C2SPackageHelper.static_package('deleting_data')
     
     @staticmethod
     def data_deleted(): 
-        return C2SPackageHelper.create_package('data_deleted')
+        return C2SPackageHelper.static_package('data_deleted')
     
     # 搜索源管理相关数据包
     @staticmethod
     def finding_search_sources(): 
-        return C2SPackageHelper.create_package('finding_search_sources')
+        return C2SPackageHelper.static_package('finding_search_sources')
     
     @staticmethod
     def search_sources_found(source_list):
@@ -92,7 +240,7 @@ class C2SPackageHelper:
     
     @staticmethod
     def disabling_search_source(): 
-        return C2SPackageHelper.create_package('disabling_search_source')
+        return C2SPackageHelper.static_package('disabling_search_source')
     
     @staticmethod
     def search_source_status_updated(source_list):
@@ -100,6 +248,48 @@ class C2SPackageHelper:
             'source_list': source_list
         })
     
+    # 嗅探任务相关数据包
+    @staticmethod
+    def sniff_progress(job_id, stage, percent, message=''):
+        return C2SPackageHelper.create_package('sniff_progress', {
+            'job_id': job_id,
+            'stage': stage,
+            'percent': percent,
+            'message': message
+        })
+    
+    @staticmethod
+    def sniff_cancelled(job_id):
+        return C2SPackageHelper.create_package('sniff_cancelled', {
+            'job_id': job_id
+        })
+    
+    @staticmethod
+    def sniff_batch_item(job_id, source_url, rules=None, error=None):
+        return C2SPackageHelper.create_package('sniff_batch_item', {
+            'job_id': job_id,
+            'source_url': source_url,
+            'success': rules is not None,
+            'rules': rules,
+            'error': error
+        })
+    
+    # 正文提取任务相关数据包
+    @staticmethod
+    def extract_progress(job_id, stage, percent, message=''):
+        return C2SPackageHelper.create_package('extract_progress', {
+            'job_id': job_id,
+            'stage': stage,
+            'percent': percent,
+            'message': message
+        })
+    
+    @staticmethod
+    def extract_cancelled(job_id):
+        return C2SPackageHelper.create_package('extract_cancelled', {
+            'job_id': job_id
+        })
+    
     # 成功相关数据包
     @staticmethod
     def success(package_type, data=None):
@@ -114,4 +304,21 @@ class C2SPackageHelper:
         return C2SPackageHelper.create_package('error', {
             'message': message
         })
-    
+
+
+# 预先序列化的固定状态数据包（内容不变，每种传输格式只序列化一次）
+def prebuild_package(package_type, data=None):
+    package = {'type': package_type, 'data': data or {}}
+    return {fmt: encode(package, fmt) for fmt in SUPPORTED_WIRE_FORMATS}
+
+
+STATIC_PACKAGES = {
+    'searching': prebuild_package('searching'),
+    'filter_received': prebuild_package('filter_received'),
+    'filter_completed': prebuild_package('filter_completed'),
+    'reading_data': prebuild_package('data_management_response', {'status': 'reading'}),
+    'deleting_data': prebuild_package('deleting_data'),
+    'data_deleted': prebuild_package('data_deleted'),
+    'finding_search_sources': prebuild_package('finding_search_sources'),
+    'disabling_search_source': prebuild_package('disabling_search_source'),
+}
@@ -46,6 +46,14 @@ def reset_data_records_database():
         conn.commit()
         log(f"数据记录表重新创建成功")
         
+        # 清空变更日志并推进版本号，客户端下次同步时改为全量同步
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'data_record_changes'")
+        if cursor.fetchone():
+            cursor.execute("INSERT INTO data_record_changes (record_id, op) VALUES (0, 'reset')")
+            cursor.execute('DELETE FROM data_record_changes')
+            conn.commit()
+            log(f"数据记录变更日志已清空")
+        
         # 关闭数据库连接
         conn.close()
         log(f"数据库连接已关闭")
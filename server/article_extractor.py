@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+正文批量提取引擎
+按已嗅探的爬虫规则（spider_rules）批量抓取文章页面，提取完整的标题、正文和图片。
+规则来自规则缓存（XPath已预编译），页面并发抓取，每个页面只解析一次
+"""
+
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from urllib.parse import urljoin
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from server.http_client import get_http_client, DEFAULT_MAX_BYTES
+from server.html_document import ParsedDocument
+from server.page_archive import get_page_archive
+from server.rule_cache import compile_xpath
+
+
+# 默认配置
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# 正文节点下的文本片段，跳过脚本和样式
+CONTENT_TEXT = compile_xpath('.//text()[not(ancestor::script) and not(ancestor::style)]')
+
+
+def normalize_text(text):
+    """
+    合并连续空白
+    """
+    return ' '.join(text.split())
+
+
+class ArticleExtractor:
+    """
+    正文批量提取引擎
+    """
+
+    def __init__(self, http_client=None, max_workers=DEFAULT_MAX_WORKERS, archive=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.http = http_client or get_http_client()
+        self.max_bytes = max_bytes
+        self.archive = archive or get_page_archive()
+        self.max_workers = max_workers
+
+    def log(self, message, level='INFO'):
+        """
+        日志记录函数
+        """
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        print(f"[{timestamp}] [EXTRACT] [{level}] {message}")
+
+    def extract_document(self, document, rule, base_url):
+        """
+        按规则从已解析的文档中提取标题、正文和图片
+
+        Args:
+            document (ParsedDocument): 已解析的文档
+            rule (CompiledRule): 编译后的爬虫规则
+            base_url (str): 页面URL，用于补全相对图片地址
+
+        Returns:
+            dict: {'title', 'content', 'image_url'}
+        """
+        article = {'title': '', 'content': '', 'image_url': ''}
+        if document.root is None:
+            return article
+
+        if rule.title is not None:
+            for node in rule.title(document.root):
+                text = normalize_text(node if isinstance(node, str) else node.xpath('string()'))
+                if text:
+                    article['title'] = text
+                    break
+
+        if rule.content is not None:
+            paragraphs = []
+            for node in rule.content(document.root):
+                if isinstance(node, str):
+                    text = normalize_text(node)
+                    if text:
+                        paragraphs.append(text)
+                    continue
+                # 按块级文本片段拆分段落，跳过脚本和样式
+                for text in CONTENT_TEXT(node):
+                    text = normalize_text(text)
+                    if text:
+                        paragraphs.append(text)
+            article['content'] = '\n'.join(paragraphs)
+
+        if rule.image is not None:
+            for node in rule.image(document.root):
+                src = node if isinstance(node, str) else (node.get('src') or node.get('data-src'))
+                if src:
+                    article['image_url'] = urljoin(base_url, src.strip())
+                    break
+
+        return article
+
+    def extract_article(self, url, rule):
+        """
+        抓取单个页面并按规则提取
+
+        Returns:
+            dict: 提取结果，包含 url、success、title、content、image_url 或 error
+        """
+        try:
+            response = self.http.open_stream(url, headers=rule.headers or DEFAULT_HEADERS, source='article_extractor')
+            response.raise_for_status()
+            # 边下载边解析，同时把原始字节写入存档（供规则健康检查离线回放），不额外保留整页副本
+            encoding = self.http.get_declared_encoding(response)
+            chunks = self.http.iter_content(response, source='article_extractor', max_bytes=self.max_bytes)
+            document = ParsedDocument.from_chunks(self.archive.save_chunks(url, chunks, encoding), encoding=encoding)
+            article = self.extract_document(document, rule, response.url)
+            article['url'] = url
+            article['success'] = bool(article['title'] or article['content'])
+            if not article['success']:
+                article['error'] = '规则未匹配到任何内容'
+            return article
+        except Exception as e:
+            self.log(f"正文提取失败: URL={url}, 错误: {str(e)}", 'ERROR')
+            return {'url': url, 'success': False, 'error': str(e)}
+
+    def extract_articles(self, items, progress=None):
+        """
+        批量并发提取
+
+        Args:
+            items (list): 待提取项列表，每项为 {'url': ..., 'rule': CompiledRule, 其他字段原样保留}
+            progress (callable, optional): 进度回调 progress(stage, percent, message)，
+                每完成一项调用一次，回调抛出的异常（如任务取消）会中止剩余提取
+
+        Returns:
+            list: 与 items 顺序一致的结果列表
+        """
+        report = progress or (lambda stage, percent, message='': None)
+        results = [None] * len(items)
+        if not items:
+            return results
+
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(items)), thread_name_prefix='extract')
+        try:
+            futures = {executor.submit(self.extract_article, item['url'], item['rule']): index
+                       for index, item in enumerate(items)}
+            done = 0
+            for future in as_completed(futures):
+                index = futures[future]
+                result = future.result()
+                result.update({key: value for key, value in items[index].items() if key not in ('url', 'rule')})
+                results[index] = result
+                done += 1
+                report('extracting', int(done * 100 / len(items)), f"{done}/{len(items)}")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        succeeded = sum(1 for result in results if result and result['success'])
+        self.log(f"批量正文提取完成: 总数={len(items)}, 成功={succeeded}", 'INFO')
+        return results
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+数据变更广播
+连接可以订阅主题（如 data_records），某个连接写入或删除数据后，只把增量（新增的记录 / 删除的ID）
+推送给其他订阅者，而不是让它们重新下载整张表。短时间内的多次变更合并为一个数据包发送
+"""
+
+import asyncio
+from datetime import datetime
+
+from websockets.exceptions import ConnectionClosed
+
+from .C2SPackageHelper import C2SPackageHelper
+
+
+# 默认配置
+COALESCE_DELAY = 0.2  # 合并变更的时间窗口（秒）
+TOPICS = ('data_records',)
+
+
+class Broadcaster:
+    """
+    按主题的发布/订阅广播器（只在事件循环线程中使用）
+    """
+
+    def __init__(self, get_wire_format=None, coalesce_delay=COALESCE_DELAY):
+        """
+        Args:
+            get_wire_format (callable, optional): 根据连接返回其协商的传输格式，默认为 json
+            coalesce_delay (float): 合并变更的时间窗口（秒）
+        """
+        self.get_wire_format = get_wire_format or (lambda websocket: 'json')
+        self.coalesce_delay = coalesce_delay
+        self.subscribers = {topic: set() for topic in TOPICS}
+        # 每个主题待发送的变更: [(来源连接, 'added' / 'deleted', 记录或ID), ...]
+        self.pending = {topic: [] for topic in TOPICS}
+        self.flush_tasks = {}
+        self.stats = {'published': 0, 'packets': 0, 'bytes': 0}
+
+    def log(self, message, level='INFO'):
+        """
+        日志记录函数
+        """
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        print(f"[{timestamp}] [BROADCAST] [{level}] {message}")
+
+    def subscribe(self, websocket, topics):
+        """
+        订阅主题
+
+        Returns:
+            list: 实际订阅的主题（忽略未知主题）
+        """
+        subscribed = [topic for topic in topics if topic in self.subscribers]
+        for topic in subscribed:
+            self.subscribers[topic].add(websocket)
+        return subscribed
+
+    def unsubscribe(self, websocket, topics=None):
+        """
+        取消订阅，topics 为 None 时取消该连接的所有订阅（连接断开时）
+        """
+        for topic in topics or TOPICS:
+            if topic in self.subscribers:
+                self.subscribers[topic].discard(websocket)
+
+    def publish_added(self, topic, records, origin=None):
+        """
+        发布新增的记录
+
+        Args:
+            topic (str): 主题
+            records (list): 新增的记录（已格式化为客户端使用的字典）
+            origin (optional): 发起变更的连接，它不会收到这次变更
+        """
+        self.publish(topic, [(origin, 'added', record) for record in records])
+
+    def publish_deleted(self, topic, record_ids, origin=None):
+        """
+        发布删除的记录ID
+        """
+        self.publish(topic, [(origin, 'deleted', record_id) for record_id in record_ids])
+
+    def publish(self, topic, changes):
+        if not changes or not self.subscribers.get(topic):
+            return
+        self.pending[topic].extend(changes)
+        self.stats['published'] += len(changes)
+        # 时间窗口内的后续变更并入同一次发送
+        if topic not in self.flush_tasks:
+            self.flush_tasks[topic] = asyncio.get_running_loop().create_task(self.flush_later(topic))
+
+    async def flush_later(self, topic):
+        try:
+            await asyncio.sleep(self.coalesce_delay)
+        finally:
+            self.flush_tasks.pop(topic, None)
+        await self.flush(topic)
+
+    @staticmethod
+    def merge_changes(changes, exclude=None):
+        """
+        合并一批变更：窗口内新增后又删除的记录不再发送
+
+        Returns:
+            tuple: (新增记录列表, 删除ID列表)
+        """
+        added = {}
+        deleted = []
+        for origin, kind, value in changes:
+            if origin is exclude and exclude is not None:
+                continue
+            if kind == 'added':
+                added[value['id']] = value
+            elif value in added:
+                del added[value]
+            else:
+                deleted.append(value)
+        return list(added.values()), deleted
+
+    async def flush(self, topic):
+        """
+        将待发送的变更推送给订阅者（发起变更的连接不会收到自己的变更）
+        """
+        changes, self.pending[topic] = self.pending[topic], []
+        subscribers = list(self.subscribers[topic])
+        if not changes or not subscribers:
+            return
+
+        origins = {origin for origin, _, _ in changes if origin is not None}
+        # 大多数订阅者收到的数据包相同，按（传输格式，排除的连接）只序列化一次
+        C2SPackageHelper.set_request_id(None)
+        packets = {}
+        sends = []
+        for websocket in subscribers:
+            exclude = websocket if websocket in origins else None
+            fmt = self.get_wire_format(websocket)
+            key = (fmt, exclude)
+            if key not in packets:
+                C2SPackageHelper.set_wire_format(fmt)
+                added, deleted = self.merge_changes(changes, exclude)
+                packets[key] = []
+                if added:
+                    packets[key].append(C2SPackageHelper.records_added(topic, added))
+                if deleted:
+                    packets[key].append(C2SPackageHelper.records_deleted(topic, deleted))
+            for packet in packets[key]:
+                self.stats['packets'] += 1
+                self.stats['bytes'] += len(packet) if isinstance(packet, bytes) else len(packet.encode('utf-8'))
+                sends.append(self.send(websocket, packet))
+
+        await asyncio.gather(*sends)
+        self.log(f"广播变更: 主题={topic}, 变更数={len(changes)}, 订阅者={len(subscribers)}, 数据包={len(sends)}", 'DEBUG')
+
+    async def send(self, websocket, packet):
+        try:
+            await websocket.send(packet)
+        except ConnectionClosed:
+            self.unsubscribe(websocket)
+
+    def get_stats(self):
+        return dict(self.stats, subscribers={topic: len(sockets) for topic, sockets in self.subscribers.items()})
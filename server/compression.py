@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+WebSocket 消息压缩
+协商 permessage-deflate（RFC 7692），只压缩不小于阈值的消息：搜索结果、记录列表等大数据包
+压缩后通常只有原来的 1/5 ~ 1/10，而登录、进度等小状态包压缩收益很小，直接发送（RSV1 不置位），
+省去压缩的CPU开销
+"""
+
+from websockets.extensions.permessage_deflate import PerMessageDeflate, ServerPerMessageDeflateFactory
+from websockets.frames import CTRL_OPCODES, Opcode
+
+
+# 默认配置
+COMPRESSION_MIN_SIZE = 1024   # 小于该字节数的消息不压缩
+WINDOW_BITS = 12              # 压缩窗口大小（2^12 = 4KB），越大压缩率越高、每个连接占用的内存越多
+MEM_LEVEL = 5                 # zlib memLevel（1-9），越大压缩越快、占用内存越多
+COMPRESSION_LEVEL = 6         # zlib 压缩级别（1-9）
+
+
+class CompressionStats:
+    """
+    所有连接共享的压缩统计（只在事件循环线程中更新）
+    """
+
+    def __init__(self):
+        self.connections = 0
+        self.compressed = 0
+        self.skipped = 0
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+
+    def to_dict(self):
+        return {
+            'connections': self.connections,
+            'compressed': self.compressed,
+            'skipped': self.skipped,
+            'raw_bytes': self.raw_bytes,
+            'compressed_bytes': self.compressed_bytes,
+            'ratio': round(self.raw_bytes / self.compressed_bytes, 2) if self.compressed_bytes else 0.0
+        }
+
+
+class ThresholdPerMessageDeflate(PerMessageDeflate):
+    """
+    只压缩不小于 min_size 字节的消息的 permessage-deflate 扩展
+
+    RFC 7692 允许协商后按消息选择是否压缩：未压缩的消息不设置 RSV1，客户端原样接收
+    """
+
+    def __init__(self, *args, min_size=COMPRESSION_MIN_SIZE, stats=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.min_size = min_size
+        self.stats = stats or CompressionStats()
+        self.skip_message = False
+
+    def encode(self, frame):
+        if frame.opcode in CTRL_OPCODES:
+            return frame
+        # 是否压缩在消息的第一帧决定，分片消息的后续帧沿用该决定（分片消息总是压缩）
+        if frame.opcode is not Opcode.CONT:
+            self.skip_message = frame.fin and len(frame.data) < self.min_size
+        if self.skip_message:
+            self.stats.skipped += frame.fin
+            return frame
+        encoded = super().encode(frame)
+        self.stats.raw_bytes += len(frame.data)
+        self.stats.compressed_bytes += len(encoded.data)
+        self.stats.compressed += frame.fin
+        return encoded
+
+
+class ThresholdDeflateFactory(ServerPerMessageDeflateFactory):
+    """
+    服务端 permessage-deflate 协商，协商成功后使用 ThresholdPerMessageDeflate
+    """
+
+    def __init__(self, min_size=COMPRESSION_MIN_SIZE, window_bits=WINDOW_BITS, mem_level=MEM_LEVEL,
+                 level=COMPRESSION_LEVEL, stats=None):
+        """
+        Args:
+            min_size (int): 小于该字节数的消息不压缩
+            window_bits (int): 服务端和客户端的压缩窗口位数（9-15）
+            mem_level (int): zlib memLevel（1-9）
+            level (int): zlib 压缩级别（1-9）
+            stats (CompressionStats, optional): 压缩统计
+        """
+        super().__init__(
+            server_max_window_bits=window_bits,
+            client_max_window_bits=window_bits,
+            compress_settings={'memLevel': mem_level, 'level': level}
+        )
+        self.min_size = min_size
+        self.stats = stats or CompressionStats()
+
+    def process_request_params(self, params, accepted_extensions):
+        response_params, extension = super().process_request_params(params, accepted_extensions)
+        self.stats.connections += 1
+        return response_params, ThresholdPerMessageDeflate(
+            extension.remote_no_context_takeover,
+            extension.local_no_context_takeover,
+            extension.remote_max_window_bits,
+            extension.local_max_window_bits,
+            self.compress_settings,
+            min_size=self.min_size,
+            stats=self.stats
+        )
@@ -1,17 +1,39 @@
 import sqlite3
 import os
+import re
+import json
+import secrets
 from datetime import datetime
+from urllib.parse import urlparse
+
+# 查询时显式指定列顺序，避免新旧表结构（ALTER TABLE追加列）导致元组下标不一致
+DATA_RECORD_COLUMNS = 'id, title, summary, image_url, source_url, data_source, created_at, search_term'
+SPIDER_RULE_COLUMNS = 'id, source_url, domain, title_xpath, content_xpath, image_xpath, created_at, updated_at, request_headers'
+# 前9列与 SPIDER_RULE_COLUMNS 对应（url_pattern 对应 source_url），可直接按爬虫规则使用
+DOMAIN_RULE_COLUMNS = 'id, url_pattern, domain, title_xpath, content_xpath, image_xpath, created_at, updated_at, request_headers, confidence, sample_count'
+
+# 多个工作进程共享同一个数据库文件：WAL模式下读不阻塞写，写锁冲突时最多等待 BUSY_TIMEOUT 秒
+JOURNAL_MODE = 'WAL'
+BUSY_TIMEOUT = 10
+
+# 登录会话令牌有效期（天），页面打开新连接时凭令牌恢复登录状态
+SESSION_TTL_DAYS = 7
 
 class Database:
-    def __init__(self):
-        self.db_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'telescope.db')
+    def __init__(self, db_path=None):
+        # 默认使用项目 data 目录下的 telescope.db（测试时可指定其他数据库文件）
+        self.db_path = db_path or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'telescope.db')
         self.log(f"数据库初始化: 路径={self.db_path}", 'INFO')
         
+        # 爬虫规则变化监听器，回调参数为域名（如规则缓存失效）
+        self.rule_listeners = []
+        
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
         self.log(f"数据库目录检查完成: 目录={os.path.dirname(self.db_path)}", 'DEBUG')
         
         try:
-            self.conn = sqlite3.connect(self.db_path)
+            self.conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT)
+            self.conn.execute(f"PRAGMA journal_mode={JOURNAL_MODE}")
             self.cursor = self.conn.cursor()
             self.log(f"数据库连接成功: 路径={self.db_path}", 'INFO')
             
@@ -42,6 +64,16 @@ class Database:
             ''')
             self.log(f"用户表检查/创建完成", 'DEBUG')
             
+            # 创建登录会话表（存放在数据库中，多进程模式下各工作进程都能验证令牌）
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS user_sessions (
+                    token TEXT PRIMARY KEY,
+                    username TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            self.log(f"登录会话表检查/创建完成", 'DEBUG')
+            
             # 创建数据记录表
             self.cursor.execute('''
                 CREATE TABLE IF NOT EXISTS data_records (
@@ -84,7 +116,61 @@ class Database:
             ''')
             self.log(f"爬虫规则表检查/创建完成", 'DEBUG')
             
-
+            # 创建域名级归纳规则表（url_pattern 为空表示整个域名通用）
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS spider_domain_rules (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    domain TEXT NOT NULL,
+                    url_pattern TEXT NOT NULL DEFAULT '',
+                    title_xpath TEXT,
+                    content_xpath TEXT,
+                    image_xpath TEXT,
+                    request_headers TEXT,
+                    confidence REAL NOT NULL DEFAULT 0,
+                    sample_count INTEGER NOT NULL DEFAULT 0,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE(domain, url_pattern)
+                )
+            ''')
+            self.log(f"域名规则表检查/创建完成", 'DEBUG')
+            
+            # 创建规则健康检查结果表
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS rule_health (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    rule_id INTEGER NOT NULL,
+                    pages INTEGER NOT NULL,
+                    matched INTEGER NOT NULL,
+                    yield_rate REAL NOT NULL,
+                    avg_content_length REAL NOT NULL,
+                    elapsed_ms REAL NOT NULL,
+                    flagged INTEGER NOT NULL DEFAULT 0,
+                    checked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            self.log(f"规则健康检查表检查/创建完成", 'DEBUG')
+            
+            # 创建数据记录变更日志表（供数据管理页面增量同步，version 单调递增且不复用）
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS data_record_changes (
+                    version INTEGER PRIMARY KEY AUTOINCREMENT,
+                    record_id INTEGER NOT NULL,
+                    op TEXT NOT NULL,
+                    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            for op, event, row in (('insert', 'INSERT', 'NEW'), ('update', 'UPDATE', 'NEW'), ('delete', 'DELETE', 'OLD')):
+                self.cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS data_records_{op}_log AFTER {event} ON data_records
+                    BEGIN
+                        INSERT INTO data_record_changes (record_id, op) VALUES ({row}.id, '{op}');
+                    END
+                ''')
+            self.log(f"数据记录变更日志表检查/创建完成", 'DEBUG')
+            
+            # 为旧版本数据库补齐新增的列
+            self.migrate_tables()
             
             self.conn.commit()
             self.log(f"数据库表结构提交完成", 'DEBUG')
@@ -93,6 +179,24 @@ class Database:
             self.log(f"数据库表结构创建失败: {str(e)}", 'ERROR')
             raise
     
+    def migrate_tables(self):
+        """
+        为旧版本数据库补齐缺失的列
+        """
+        migrations = [
+            ('data_records', 'search_term', 'TEXT'),
+            ('data_records', 'content', 'TEXT'),
+            ('spider_rules', 'request_headers', 'TEXT'),
+            ('rule_health', 'sample_key', 'TEXT'),
+        ]
+        
+        for table, column, column_type in migrations:
+            self.cursor.execute(f'PRAGMA table_info({table})')
+            columns = [row[1] for row in self.cursor.fetchall()]
+            if column not in columns:
+                self.cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {column_type}')
+                self.log(f"数据表迁移完成: 表={table}, 新增列={column}", 'INFO')
+    
     # 用户相关操作
     def add_user(self, username, password, permission_level=0):
         self.log(f"开始添加用户: 用户名={username}, 权限等级={permission_level}", 'INFO')
@@ -133,6 +237,52 @@ class Database:
             self.log(f"用户查询失败: 用户名={username} - 错误: {str(e)}", 'ERROR')
             return None
     
+    # 登录会话相关操作
+    def create_session(self, username):
+        """
+        为登录成功的用户创建会话令牌（同时清理过期的令牌）
+        
+        Returns:
+            str: 会话令牌，失败时返回 None
+        """
+        token = secrets.token_urlsafe(32)
+        try:
+            self.cursor.execute("DELETE FROM user_sessions WHERE created_at < datetime('now', ?)",
+                                (f'-{SESSION_TTL_DAYS} days',))
+            self.cursor.execute('INSERT INTO user_sessions (token, username) VALUES (?, ?)', (token, username))
+            self.conn.commit()
+            return token
+        
+        except Exception as e:
+            self.log(f"创建登录会话失败: 用户名={username} - 错误: {str(e)}", 'ERROR')
+            return None
+    
+    def get_session_user(self, token):
+        """
+        根据会话令牌查询用户
+        
+        Returns:
+            tuple: 用户记录，令牌无效或已过期时返回 None
+        """
+        try:
+            self.cursor.execute('''
+                SELECT users.* FROM user_sessions JOIN users ON users.username = user_sessions.username
+                WHERE user_sessions.token = ? AND user_sessions.created_at >= datetime('now', ?)
+            ''', (token, f'-{SESSION_TTL_DAYS} days'))
+            return self.cursor.fetchone()
+        
+        except Exception as e:
+            self.log(f"查询登录会话失败: 错误: {str(e)}", 'ERROR')
+            return None
+    
+    def delete_session(self, token):
+        try:
+            self.cursor.execute('DELETE FROM user_sessions WHERE token = ?', (token,))
+            self.conn.commit()
+        
+        except Exception as e:
+            self.log(f"删除登录会话失败: 错误: {str(e)}", 'ERROR')
+    
     # 数据记录相关操作
     def add_data_record(self, title, summary, image_url, source_url, data_source, search_term=None):
         self.log(f"开始添加数据记录: 标题={title}, 数据源={data_source}", 'DEBUG')
@@ -159,13 +309,13 @@ class Database:
             
             try:
                 if search_field == 'title':
-                    self.cursor.execute('SELECT * FROM data_records WHERE title LIKE ? ORDER BY created_at DESC', 
+                    self.cursor.execute(f'SELECT {DATA_RECORD_COLUMNS} FROM data_records WHERE title LIKE ? ORDER BY created_at DESC', 
                                         ('%' + search_content + '%',))
                 elif search_field == 'summary':
-                    self.cursor.execute('SELECT * FROM data_records WHERE summary LIKE ? ORDER BY created_at DESC', 
+                    self.cursor.execute(f'SELECT {DATA_RECORD_COLUMNS} FROM data_records WHERE summary LIKE ? ORDER BY created_at DESC', 
                                         ('%' + search_content + '%',))
                 elif search_field == 'data_source':
-                    self.cursor.execute('SELECT * FROM data_records WHERE data_source LIKE ? ORDER BY created_at DESC', 
+                    self.cursor.execute(f'SELECT {DATA_RECORD_COLUMNS} FROM data_records WHERE data_source LIKE ? ORDER BY created_at DESC', 
                                         ('%' + search_content + '%',))
                 
                 records = self.cursor.fetchall()
@@ -181,7 +331,7 @@ class Database:
             self.log(f"开始查询所有数据记录", 'DEBUG')
             
             try:
-                self.cursor.execute('SELECT * FROM data_records ORDER BY created_at DESC')
+                self.cursor.execute(f'SELECT {DATA_RECORD_COLUMNS} FROM data_records ORDER BY created_at DESC')
                 records = self.cursor.fetchall()
                 
                 self.log(f"所有数据记录查询完成: 结果数量={len(records)}", 'DEBUG')
@@ -192,6 +342,51 @@ class Database:
                 self.log(f"所有数据记录查询失败: 错误: {str(e)}", 'ERROR')
                 return []
     
+    def get_data_records_by_ids(self, record_ids):
+        self.log(f"开始按ID查询数据记录: 数量={len(record_ids)}", 'DEBUG')
+        
+        if not record_ids:
+            return []
+        
+        try:
+            placeholders = ', '.join('?' for _ in record_ids)
+            self.cursor.execute(f'SELECT {DATA_RECORD_COLUMNS} FROM data_records WHERE id IN ({placeholders})', tuple(record_ids))
+            records = self.cursor.fetchall()
+            
+            self.log(f"按ID查询数据记录完成: 结果数量={len(records)}", 'DEBUG')
+            
+            return records
+        
+        except Exception as e:
+            self.log(f"按ID查询数据记录失败: 错误: {str(e)}", 'ERROR')
+            return []
+    
+    def update_data_record_articles(self, articles):
+        """
+        批量写回正文提取结果（单个事务）
+        
+        Args:
+            articles (list): (记录ID, 标题, 正文, 图片URL) 元组列表，标题或图片为空时保留原值
+        """
+        self.log(f"开始写回正文提取结果: 数量={len(articles)}", 'INFO')
+        
+        try:
+            with self.conn:
+                self.conn.executemany('''
+                    UPDATE data_records
+                    SET title = COALESCE(NULLIF(?, ''), title),
+                        content = ?,
+                        image_url = COALESCE(NULLIF(?, ''), image_url)
+                    WHERE id = ?
+                ''', [(title, content, image_url, record_id) for record_id, title, content, image_url in articles])
+            
+            self.log(f"正文提取结果写回成功: 数量={len(articles)}", 'INFO')
+            return True
+        
+        except Exception as e:
+            self.log(f"正文提取结果写回失败: 错误: {str(e)}", 'ERROR')
+            return False
+    
     def delete_data_record(self, record_id):
         self.log(f"开始删除数据记录: 记录ID={record_id}", 'INFO')
         
@@ -210,6 +405,79 @@ class Database:
             self.log(f"数据记录删除失败: 记录ID={record_id} - 错误: {str(e)}", 'ERROR')
             return False
     
+    # 数据记录增量同步相关操作
+    def get_data_version(self):
+        """
+        获取数据记录的当前版本号（最后一条变更日志的版本，压缩后也不会回退）
+        """
+        self.cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'data_record_changes'")
+        row = self.cursor.fetchone()
+        return row[0] if row else 0
+    
+    def get_data_changes(self, since_version):
+        """
+        获取某个版本之后的数据记录变更
+        
+        Args:
+            since_version (int): 客户端最后同步到的版本号
+            
+        Returns:
+            tuple: (当前版本号, 新增或修改的记录列表, 删除的记录ID列表)；
+                变更日志已被压缩到该版本之后（或版本号无效）时返回 None，需要全量同步
+        """
+        self.log(f"开始查询数据记录变更: 起始版本={since_version}", 'DEBUG')
+        
+        try:
+            version = self.get_data_version()
+            if since_version > version:
+                return None
+            
+            # 压缩删除了最早的日志，起始版本早于保留的最早版本时无法给出完整增量
+            self.cursor.execute('SELECT MIN(version) FROM data_record_changes')
+            oldest = self.cursor.fetchone()[0]
+            if since_version < (oldest - 1 if oldest is not None else version):
+                return None
+            
+            # 同一记录的多次变更只取最后一次
+            self.cursor.execute('''
+                SELECT record_id, op FROM data_record_changes
+                WHERE version IN (
+                    SELECT MAX(version) FROM data_record_changes
+                    WHERE version > ? AND version <= ? GROUP BY record_id
+                )
+            ''', (since_version, version))
+            changes = self.cursor.fetchall()
+            
+            deleted_ids = [record_id for record_id, op in changes if op == 'delete']
+            changed_ids = [record_id for record_id, op in changes if op != 'delete']
+            records = self.get_data_records_by_ids(changed_ids)
+            
+            self.log(f"数据记录变更查询完成: 当前版本={version}, 变更={len(records)}, 删除={len(deleted_ids)}", 'DEBUG')
+            return version, records, deleted_ids
+        
+        except Exception as e:
+            self.log(f"数据记录变更查询失败: 起始版本={since_version} - 错误: {str(e)}", 'ERROR')
+            return None
+    
+    def compact_data_changes(self, keep=10000):
+        """
+        压缩变更日志，只保留最近 keep 条；落后更多的客户端将改为全量同步
+        
+        Returns:
+            int: 删除的日志条数
+        """
+        try:
+            with self.conn:
+                self.cursor.execute('DELETE FROM data_record_changes WHERE version <= ?',
+                                    (self.get_data_version() - keep,))
+            if self.cursor.rowcount > 0:
+                self.log(f"数据记录变更日志压缩完成: 删除={self.cursor.rowcount}", 'INFO')
+            return self.cursor.rowcount
+        
+        except Exception as e:
+            self.log(f"数据记录变更日志压缩失败: {str(e)}", 'ERROR')
+            return 0
+    
     # 搜索源黑名单相关操作
     def add_to_blacklist(self, source_id):
         self.log(f"开始添加搜索源到黑名单: 源ID={source_id}", 'INFO')
@@ -284,6 +552,9 @@ class Database:
     def add_spider_rule(self, source_url, domain, title_xpath=None, content_xpath=None, image_xpath=None, request_headers=None):
         self.log(f"开始添加爬虫规则: 源URL={source_url}, 域名={domain}", 'DEBUG')
         
+        if isinstance(request_headers, dict):
+            request_headers = json.dumps(request_headers, ensure_ascii=False)
+        
         try:
             self.cursor.execute('''
                 INSERT OR REPLACE INTO spider_rules (source_url, domain, title_xpath, content_xpath, image_xpath, request_headers, updated_at)
@@ -294,17 +565,55 @@ class Database:
             rule_id = self.cursor.lastrowid
             self.log(f"爬虫规则添加/更新成功: 规则ID={rule_id}, 源URL={source_url}", 'DEBUG')
             
+            self.notify_rule_changed(domain)
             return rule_id
         
         except Exception as e:
             self.log(f"爬虫规则添加/更新失败: 源URL={source_url} - 错误: {str(e)}", 'ERROR')
             return None
     
+    def add_spider_rules(self, rules):
+        """
+        批量添加或更新爬虫规则（单个事务）
+        
+        Args:
+            rules (list): 规则字典列表，包含 source_url、domain、title_xpath、content_xpath、image_xpath、request_headers
+        
+        Returns:
+            int: 写入的规则数，失败时返回 0
+        """
+        self.log(f"开始批量添加爬虫规则: 数量={len(rules)}", 'DEBUG')
+        
+        rows = []
+        for rule in rules:
+            request_headers = rule.get('request_headers')
+            if isinstance(request_headers, dict):
+                request_headers = json.dumps(request_headers, ensure_ascii=False)
+            rows.append((rule['source_url'], rule['domain'], rule.get('title_xpath'), rule.get('content_xpath'),
+                         rule.get('image_xpath'), request_headers))
+        
+        try:
+            with self.conn:
+                self.conn.executemany('''
+                    INSERT OR REPLACE INTO spider_rules (source_url, domain, title_xpath, content_xpath, image_xpath, request_headers, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ''', rows)
+            
+            self.log(f"批量添加爬虫规则成功: 数量={len(rows)}", 'DEBUG')
+            
+            for domain in {rule['domain'] for rule in rules}:
+                self.notify_rule_changed(domain)
+            return len(rows)
+        
+        except Exception as e:
+            self.log(f"批量添加爬虫规则失败: 错误: {str(e)}", 'ERROR')
+            return 0
+    
     def get_spider_rule(self, source_url):
         self.log(f"开始查询爬虫规则: 源URL={source_url}", 'DEBUG')
         
         try:
-            self.cursor.execute('SELECT * FROM spider_rules WHERE source_url = ?', (source_url,))
+            self.cursor.execute(f'SELECT {SPIDER_RULE_COLUMNS} FROM spider_rules WHERE source_url = ?', (source_url,))
             rule = self.cursor.fetchone()
             
             if rule:
@@ -318,11 +627,26 @@ class Database:
             self.log(f"爬虫规则查询失败: 源URL={source_url} - 错误: {str(e)}", 'ERROR')
             return None
     
+    def get_spider_rules(self):
+        self.log(f"开始查询所有爬虫规则", 'DEBUG')
+        
+        try:
+            self.cursor.execute(f'SELECT {SPIDER_RULE_COLUMNS} FROM spider_rules ORDER BY domain, updated_at DESC')
+            rules = self.cursor.fetchall()
+            
+            self.log(f"所有爬虫规则查询完成: 结果数量={len(rules)}", 'DEBUG')
+            
+            return rules
+        
+        except Exception as e:
+            self.log(f"所有爬虫规则查询失败: 错误: {str(e)}", 'ERROR')
+            return []
+    
     def get_spider_rules_by_domain(self, domain):
         self.log(f"开始按域名查询爬虫规则: 域名={domain}", 'DEBUG')
         
         try:
-            self.cursor.execute('SELECT * FROM spider_rules WHERE domain = ? ORDER BY updated_at DESC', (domain,))
+            self.cursor.execute(f'SELECT {SPIDER_RULE_COLUMNS} FROM spider_rules WHERE domain = ? ORDER BY updated_at DESC', (domain,))
             rules = self.cursor.fetchall()
             
             self.log(f"按域名查询爬虫规则完成: 域名={domain}, 结果数量={len(rules)}", 'DEBUG')
@@ -333,8 +657,138 @@ class Database:
             self.log(f"按域名查询爬虫规则失败: 域名={domain} - 错误: {str(e)}", 'ERROR')
             return []
     
+    def add_rule_listener(self, callback):
+        """
+        注册爬虫规则变化监听器
+        
+        Args:
+            callback (callable): 回调函数 callback(domain)
+        """
+        self.rule_listeners.append(callback)
+    
+    def notify_rule_changed(self, domain):
+        for callback in self.rule_listeners:
+            try:
+                callback(domain)
+            except Exception as e:
+                self.log(f"爬虫规则变化通知失败: 域名={domain} - 错误: {str(e)}", 'ERROR')
+    
+    def replace_domain_rules(self, domain, rules):
+        """
+        替换某个域名的全部归纳规则（单个事务）
+        
+        Args:
+            domain (str): 域名
+            rules (list): 归纳规则字典列表，见 RuleGeneralizer.generalize
+        """
+        self.log(f"开始保存域名规则: 域名={domain}, 数量={len(rules)}", 'DEBUG')
+        
+        try:
+            with self.conn:
+                self.conn.execute('DELETE FROM spider_domain_rules WHERE domain = ?', (domain,))
+                self.conn.executemany('''
+                    INSERT INTO spider_domain_rules (domain, url_pattern, title_xpath, content_xpath, image_xpath, request_headers, confidence, sample_count, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ''', [(domain, rule['url_pattern'], rule['title_xpath'], rule['content_xpath'], rule['image_xpath'],
+                       rule['request_headers'], rule['confidence'], rule['sample_count']) for rule in rules])
+            
+            self.log(f"域名规则保存成功: 域名={domain}, 数量={len(rules)}", 'DEBUG')
+            
+            self.notify_rule_changed(domain)
+            return True
+        
+        except Exception as e:
+            self.log(f"域名规则保存失败: 域名={domain} - 错误: {str(e)}", 'ERROR')
+            return False
+    
+    def get_domain_rules(self, domain):
+        self.log(f"开始查询域名规则: 域名={domain}", 'DEBUG')
+        
+        try:
+            self.cursor.execute(f'SELECT {DOMAIN_RULE_COLUMNS} FROM spider_domain_rules WHERE domain = ? ORDER BY confidence DESC, sample_count DESC', (domain,))
+            rules = self.cursor.fetchall()
+            
+            self.log(f"域名规则查询完成: 域名={domain}, 结果数量={len(rules)}", 'DEBUG')
+            
+            return rules
+        
+        except Exception as e:
+            self.log(f"域名规则查询失败: 域名={domain} - 错误: {str(e)}", 'ERROR')
+            return []
+    
+    def add_rule_health_results(self, results):
+        """
+        批量保存规则健康检查结果（单个事务）
+        """
+        self.log(f"开始保存规则健康检查结果: 数量={len(results)}", 'DEBUG')
+        
+        try:
+            with self.conn:
+                self.conn.executemany('''
+                    INSERT INTO rule_health (rule_id, pages, matched, yield_rate, avg_content_length, elapsed_ms, flagged, sample_key)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', [(result['rule_id'], result['pages'], result['matched'], result['yield_rate'],
+                       result['avg_content_length'], result['elapsed_ms'], int(result['flagged']),
+                       result.get('sample_key')) for result in results])
+            
+            self.log(f"规则健康检查结果保存成功: 数量={len(results)}", 'DEBUG')
+            return True
+        
+        except Exception as e:
+            self.log(f"规则健康检查结果保存失败: 错误: {str(e)}", 'ERROR')
+            return False
+    
+    def get_rule_health_baselines(self):
+        """
+        获取每条规则的健康检查基准：最近一次未被标记为产出下降的结果
+        （产出下降后基准保持不变，规则在修复或重新嗅探前会持续被标记）
+        
+        Returns:
+            dict: 规则ID -> (pages, matched, yield_rate, avg_content_length)
+        """
+        try:
+            self.cursor.execute('''
+                SELECT rule_id, pages, matched, yield_rate, avg_content_length FROM rule_health
+                WHERE id IN (SELECT MAX(id) FROM rule_health WHERE flagged = 0 GROUP BY rule_id)
+            ''')
+            return {row[0]: row[1:] for row in self.cursor.fetchall()}
+        
+        except Exception as e:
+            self.log(f"规则健康检查结果查询失败: 错误: {str(e)}", 'ERROR')
+            return {}
+    
+    def find_spider_rule(self, source_url):
+        """
+        查找适用于某个URL的爬虫规则，依次回退：
+        精确URL规则 -> 匹配URL路径模式的归纳规则 -> 域名通用归纳规则
+        不会套用同域名其他页面的规则：没有归纳规则说明该域名的页面模板不一致
+        """
+        rule = self.get_spider_rule(source_url)
+        if rule:
+            return rule
+        
+        parsed = urlparse(source_url)
+        return self.match_domain_rule(self.get_domain_rules(parsed.netloc), source_url)
+    
 
     
+    @staticmethod
+    def match_domain_rule(domain_rules, source_url):
+        """
+        在同一域名的规则中查找适用于该URL的规则：优先URL模式匹配路径的规则，其次整个域名通用的规则（模式为空）
+        
+        Returns:
+            tuple: 域名规则（DOMAIN_RULE_COLUMNS 顺序），没有适用的规则时返回 None
+        """
+        path = urlparse(source_url).path or '/'
+        for domain_rule in domain_rules:
+            if domain_rule[1] and re.fullmatch(domain_rule[1], path):
+                return domain_rule
+        for domain_rule in domain_rules:
+            if not domain_rule[1]:
+                return domain_rule
+        return None
+    
     def close(self):
         try:
             self.conn.close()
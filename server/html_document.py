@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+解析后的HTML文档
+每次抓取只解析一次，由标题、正文、图片等提取器共享同一棵lxml树；
+仅在确实需要时才惰性构建BeautifulSoup视图
+"""
+
+import re
+from collections import Counter
+
+import lxml.etree as ET
+
+
+# 推断字符集时至少读取的开头字节数
+ENCODING_SNIFF_BYTES = 4096
+
+# 在页面开头查找 <meta charset> 声明
+META_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w-]+)', re.IGNORECASE)
+
+
+def detect_encoding(head):
+    """
+    根据页面开头的字节推断字符集：<meta charset> 声明 -> 能否按UTF-8解码 -> charset_normalizer 检测
+
+    Args:
+        head (bytes): 页面开头的字节
+
+    Returns:
+        str: 字符集名称，无法判断时返回 None
+    """
+    match = META_CHARSET.search(head)
+    if match:
+        return match.group(1).decode('ascii')
+    try:
+        # 末尾可能截断了一个多字节字符
+        head[:len(head) - 3].decode('utf-8')
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+    try:
+        from charset_normalizer import from_bytes
+        best = from_bytes(head).best()
+        return best.encoding if best else None
+    except ImportError:
+        return None
+
+
+class ParsedDocument:
+    """
+    一次解析、多处复用的HTML文档
+    """
+
+    def __init__(self, root, html_content=None):
+        """
+        Args:
+            root: lxml根元素
+            html_content (str, optional): 原始HTML，用于惰性构建BeautifulSoup视图
+        """
+        self.root = root
+        self.html_content = html_content
+        self._soup = None
+        self._elements = None
+        self._order = None
+        self._paths = None
+        self._attribute_counts = {}
+
+    @classmethod
+    def from_html(cls, html_content):
+        """
+        从HTML字符串（或字节）解析文档
+
+        Returns:
+            ParsedDocument: 解析后的文档，内容为空或无法解析时根元素为 None
+        """
+        if not html_content:
+            return cls(None, html_content)
+        try:
+            root = ET.HTML(html_content)
+        except ValueError:
+            # 带有XML编码声明的Unicode字符串无法直接解析，转为UTF-8字节
+            root = ET.HTML(html_content.encode('utf-8'), ET.HTMLParser(encoding='utf-8'))
+        return cls(root, html_content)
+
+    @classmethod
+    def from_chunks(cls, chunks, encoding=None):
+        """
+        将HTML字节块逐块送入增量解析器，边下载边解析，无需在内存中保留完整的原始HTML
+
+        Args:
+            chunks (iterable): bytes 块
+            encoding (str, optional): 响应头声明的字符集，为 None 时根据第一个块推断（见 detect_encoding）
+
+        Returns:
+            ParsedDocument: 解析后的文档，没有任何内容时根元素为 None
+        """
+        parser = None
+        head = b''
+        for chunk in chunks:
+            if parser is None:
+                # 积累足够的开头字节后再推断字符集并创建解析器
+                head += chunk
+                if len(head) < ENCODING_SNIFF_BYTES:
+                    continue
+                parser = cls.create_parser(encoding or detect_encoding(head))
+                chunk, head = head, b''
+            parser.feed(chunk)
+        if parser is None:
+            if not head:
+                return cls(None)
+            parser = cls.create_parser(encoding or detect_encoding(head))
+            parser.feed(head)
+        try:
+            root = parser.close()
+        except ET.XMLSyntaxError:
+            root = None
+        return cls(root)
+
+    @staticmethod
+    def create_parser(encoding):
+        try:
+            return ET.HTMLParser(encoding=encoding)
+        except LookupError:
+            return ET.HTMLParser()
+
+    def to_html(self):
+        """
+        原始HTML，流式解析的文档由解析树重新序列化
+        """
+        if self.html_content is not None:
+            return self.html_content
+        if self.root is None:
+            return ''
+        return ET.tostring(self.root, encoding='unicode', method='html')
+
+    @property
+    def soup(self):
+        """
+        BeautifulSoup视图（惰性构建，只应在lxml无法满足时使用）
+        """
+        if self._soup is None:
+            from bs4 import BeautifulSoup
+            self._soup = BeautifulSoup(self.to_html(), 'html.parser')
+        return self._soup
+
+    def elements(self):
+        """
+        按文档先序排列的所有节点（首次调用时一次性建立）
+        """
+        if self._elements is None:
+            self._elements = [] if self.root is None else list(self.root.iter())
+        return self._elements
+
+    def document_order(self, element):
+        """
+        获取元素在文档中的先序位置（首次调用时一次性建立索引）
+        """
+        if self._order is None:
+            self._order = {el: index for index, el in enumerate(self.elements())}
+        return self._order.get(element, -1)
+
+    def element_path(self, element):
+        """
+        获取元素的绝对位置路径（与 getroottree().getpath() 格式一致，如 /html/body/div[2]/h1）
+        首次调用时一次遍历为所有元素建立路径表，之后每次查询为O(1)
+        """
+        if self._paths is None:
+            self._paths = {}
+            if self.root is not None:
+                self._paths[self.root] = '/' + self.root.tag
+            # 先序遍历保证父元素的路径先于子元素确定
+            for parent in self.elements():
+                parent_path = self._paths.get(parent)
+                if parent_path is None:
+                    continue
+                children = [child for child in parent if isinstance(child.tag, str)]
+                totals = Counter(child.tag for child in children)
+                positions = Counter()
+                for child in children:
+                    if totals[child.tag] > 1:
+                        positions[child.tag] += 1
+                        self._paths[child] = f"{parent_path}/{child.tag}[{positions[child.tag]}]"
+                    else:
+                        self._paths[child] = f"{parent_path}/{child.tag}"
+        return self._paths.get(element)
+
+    def attribute_count(self, tag, name, value):
+        """
+        统计文档中 name 属性等于 value 的 tag 元素个数（每个属性名首次查询时一次遍历建立计数）
+        """
+        if name not in self._attribute_counts:
+            self._attribute_counts[name] = Counter(
+                (el.tag, el.get(name)) for el in self.elements()
+                if isinstance(el.tag, str) and el.get(name) is not None
+            )
+        return self._attribute_counts[name][(tag, value)]
+
+    def text_nodes(self):
+        """
+        遍历文档中所有文本节点及其所属元素
+
+        Yields:
+            tuple: (文本, 所属元素)；tail文本归属于父元素，与BeautifulSoup的parent语义一致
+        """
+        if self.root is None:
+            return
+        for text in self.root.xpath('//text()'):
+            owner = text.getparent()
+            if owner is not None and text.is_tail:
+                owner = owner.getparent()
+            if owner is None or not isinstance(owner.tag, str) or owner.tag in ('script', 'style'):
+                continue
+            yield text, owner
@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+共享HTTP客户端
+为所有搜索源、嗅探器和爬虫工具提供统一的抓取通道：
+按主机划分的连接池、令牌桶限速、带退避的重试、全局并发上限以及按主机统计的延迟/字节数。
+请求统一声明 gzip/deflate（安装 brotli 后追加 br）压缩传输，由 urllib3 透明解压，
+并按主机和按搜索源分别记录线上字节数与解压后字节数。
+网页抓取可使用流式读取（open_stream + iter_content），按内容类型过滤并限制最大字节数
+"""
+
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# 默认配置
+DEFAULT_TIMEOUT = 10
+DEFAULT_MAX_IN_FLIGHT = 32
+DEFAULT_HOST_CONNECTIONS = 6
+DEFAULT_HOST_RATE = 2.0      # 每秒请求数
+DEFAULT_HOST_BURST = 4       # 令牌桶容量
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5        # 秒，按 2^n 递增
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024    # 流式读取的最大解压后字节数
+STREAM_CHUNK_SIZE = 64 * 1024
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+
+
+class UnsupportedContentType(requests.RequestException):
+    """
+    响应的内容类型不在允许范围内（如PDF、附件下载）
+    """
+
+
+def get_accept_encoding():
+    """
+    根据当前环境可用的解码器生成 Accept-Encoding
+
+    只声明 urllib3 能够透明解压的编码，避免服务端返回无法解码的内容
+    """
+    encodings = ['gzip', 'deflate']
+    try:
+        import brotli  # noqa: F401
+        encodings.append('br')
+    except ImportError:
+        try:
+            import brotlicffi  # noqa: F401
+            encodings.append('br')
+        except ImportError:
+            pass
+    return ', '.join(encodings)
+
+
+ACCEPT_ENCODING = get_accept_encoding()
+
+
+class TokenBucket:
+    """
+    令牌桶限速器（线程安全）
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """
+        获取令牌，令牌不足时阻塞等待
+
+        Returns:
+            float: 本次等待的秒数
+        """
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return waited
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+class HostStats:
+    """
+    单个主机的请求统计
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.wire_bytes = 0
+        self.decoded_bytes = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.throttled_time = 0.0
+        self.in_flight = 0
+        self.lock = threading.Lock()
+
+    def add(self, **deltas):
+        """
+        原子地累加若干计数器
+        """
+        with self.lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    def record_request(self, latency):
+        with self.lock:
+            self.requests += 1
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+
+    def to_dict(self):
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'retries': self.retries,
+            'wire_bytes': self.wire_bytes,
+            'decoded_bytes': self.decoded_bytes,
+            'avg_latency': self.total_latency / self.requests if self.requests else 0.0,
+            'max_latency': self.max_latency,
+            'throttled_time': self.throttled_time,
+            'in_flight': self.in_flight
+        }
+
+
+class SourceStats:
+    """
+    单个调用方（搜索源、嗅探器等）的传输统计
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.wire_bytes = 0
+        self.decoded_bytes = 0
+        self.lock = threading.Lock()
+
+    def add(self, wire_bytes, decoded_bytes):
+        with self.lock:
+            self.requests += 1
+            self.wire_bytes += wire_bytes
+            self.decoded_bytes += decoded_bytes
+
+    def to_dict(self):
+        return {
+            'requests': self.requests,
+            'wire_bytes': self.wire_bytes,
+            'decoded_bytes': self.decoded_bytes,
+            'compression_ratio': self.decoded_bytes / self.wire_bytes if self.wire_bytes else 0.0
+        }
+
+
+class HostState:
+    """
+    单个主机的连接池、限速器、并发信号量和统计信息
+    """
+
+    def __init__(self, connections, rate, burst):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=connections, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.bucket = TokenBucket(rate, burst)
+        self.semaphore = threading.BoundedSemaphore(connections)
+        self.stats = HostStats()
+
+
+class HttpClient:
+    """
+    共享HTTP客户端
+
+    所有对外请求都应通过该类发出，以便按主机复用连接并统一限速和重试
+    """
+
+    def __init__(self, max_in_flight=DEFAULT_MAX_IN_FLIGHT, host_connections=DEFAULT_HOST_CONNECTIONS,
+                 host_rate=DEFAULT_HOST_RATE, host_burst=DEFAULT_HOST_BURST, retries=DEFAULT_RETRIES,
+                 backoff=DEFAULT_BACKOFF, timeout=DEFAULT_TIMEOUT, host_overrides=None):
+        """
+        Args:
+            max_in_flight (int): 全局同时进行的请求上限
+            host_connections (int): 每个主机的连接池大小（同时也是每个主机的并发上限）
+            host_rate (float): 每个主机每秒允许的请求数
+            host_burst (int): 每个主机令牌桶容量
+            retries (int): 失败后的最大重试次数
+            backoff (float): 重试退避基数（秒）
+            timeout (float): 默认超时时间（秒）
+            host_overrides (dict, optional): 按主机覆盖的配置，如 {'www.baidu.com': {'rate': 1, 'burst': 2}}
+        """
+        self.host_connections = host_connections
+        self.host_rate = host_rate
+        self.host_burst = host_burst
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.host_overrides = host_overrides or {}
+
+        self.in_flight = threading.BoundedSemaphore(max_in_flight)
+        self.hosts = {}
+        self.hosts_lock = threading.Lock()
+        self.sources = {}
+        self.sources_lock = threading.Lock()
+
+    def log(self, message, level='INFO'):
+        """
+        日志记录函数
+        """
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        print(f"[{timestamp}] [HTTP] [{level}] {message}")
+
+    def get_host_state(self, host):
+        """
+        获取（必要时创建）主机状态
+        """
+        with self.hosts_lock:
+            state = self.hosts.get(host)
+            if state is None:
+                override = self.host_overrides.get(host, {})
+                state = HostState(
+                    override.get('connections', self.host_connections),
+                    override.get('rate', self.host_rate),
+                    override.get('burst', self.host_burst)
+                )
+                self.hosts[host] = state
+            return state
+
+    def get_source_stats(self, source):
+        """
+        获取（必要时创建）调用方的传输统计
+        """
+        with self.sources_lock:
+            stats = self.sources.get(source)
+            if stats is None:
+                stats = SourceStats()
+                self.sources[source] = stats
+            return stats
+
+    def build_headers(self, headers):
+        """
+        合并调用方请求头并统一设置 Accept-Encoding
+        """
+        final_headers = {key: value for key, value in (headers or {}).items() if key.lower() != 'accept-encoding'}
+        final_headers['Accept-Encoding'] = ACCEPT_ENCODING
+        return final_headers
+
+    def record_transfer(self, state, source, response):
+        """
+        记录一次响应的线上字节数（压缩后）和解压后字节数
+        """
+        decoded_bytes = len(response.content)
+        try:
+            wire_bytes = response.raw.tell() or decoded_bytes
+        except Exception:
+            wire_bytes = decoded_bytes
+        state.stats.add(wire_bytes=wire_bytes, decoded_bytes=decoded_bytes)
+        self.get_source_stats(source).add(wire_bytes, decoded_bytes)
+
+    def get_retry_delay(self, attempt, response=None):
+        """
+        计算第 attempt 次重试前的等待时间，优先使用服务端的 Retry-After
+        """
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), 60.0)
+        return self.backoff * (2 ** attempt)
+
+    def get(self, url, headers=None, timeout=None, source=None, **kwargs):
+        """
+        发送GET请求
+
+        Args:
+            url (str): 请求URL
+            headers (dict, optional): 请求头（Accept-Encoding 由客户端统一设置）
+            timeout (float, optional): 超时时间，默认使用客户端配置
+            source (str, optional): 调用方名称，用于按搜索源统计字节数，默认使用主机名
+            **kwargs: 透传给 requests 的其他参数
+
+        Returns:
+            requests.Response: 最后一次尝试的响应（调用方自行 raise_for_status）
+
+        Raises:
+            requests.RequestException: 所有重试均因网络错误失败时抛出
+        """
+        host = urlparse(url).netloc
+        state = self.get_host_state(host)
+        timeout = timeout if timeout is not None else self.timeout
+        headers = self.build_headers(headers)
+        source = source or host
+
+        attempt = 0
+        while True:
+            state.stats.add(throttled_time=state.bucket.acquire())
+
+            with state.semaphore, self.in_flight:
+                state.stats.add(in_flight=1)
+                started = time.monotonic()
+                try:
+                    response = state.session.get(url, headers=headers, timeout=timeout, **kwargs)
+                    error = None
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    response = None
+                    error = e
+                finally:
+                    latency = time.monotonic() - started
+                    state.stats.add(in_flight=-1)
+
+            state.stats.record_request(latency)
+
+            # 流式响应的字节数在读取完成后由 iter_content 记录
+            stream = kwargs.get('stream', False)
+            retryable = error is not None or response.status_code in RETRY_STATUS_CODES
+            if not retryable:
+                if not stream:
+                    self.record_transfer(state, source, response)
+                return response
+
+            state.stats.add(errors=1)
+            if attempt >= self.retries:
+                if error is not None:
+                    raise error
+                if not stream:
+                    self.record_transfer(state, source, response)
+                return response
+
+            if response is not None:
+                response.close()
+
+            delay = self.get_retry_delay(attempt, response)
+            reason = str(error) if error is not None else f"状态码={response.status_code}"
+            self.log(f"请求失败，{delay:.1f}秒后重试({attempt + 1}/{self.retries}): URL={url}, 原因: {reason}", 'WARNING')
+            state.stats.add(retries=1)
+            attempt += 1
+            time.sleep(delay)
+
+    def open_stream(self, url, headers=None, timeout=None, source=None, content_types=HTML_CONTENT_TYPES):
+        """
+        以流式方式发送GET请求，此时只读取响应头
+
+        Args:
+            content_types (tuple, optional): 允许的内容类型前缀，为 None 时不检查；
+                响应未声明 Content-Type 时视为允许
+
+        Returns:
+            requests.Response: 未读取正文的响应，需配合 iter_content 读取（调用方自行 raise_for_status）
+
+        Raises:
+            UnsupportedContentType: 响应的内容类型不在允许范围内
+        """
+        response = self.get(url, headers=headers, timeout=timeout, source=source, stream=True)
+        content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_types and content_type and not content_type.startswith(content_types):
+            response.close()
+            raise UnsupportedContentType(f"不支持的内容类型: {content_type}", response=response)
+        return response
+
+    def iter_content(self, response, source=None, max_bytes=DEFAULT_MAX_BYTES, chunk_size=STREAM_CHUNK_SIZE):
+        """
+        逐块读取流式响应的正文（已解压），超过 max_bytes 时截断并设置 response.truncated
+
+        Yields:
+            bytes: 响应正文块
+        """
+        host = urlparse(response.url).netloc
+        state = self.get_host_state(host)
+        response.truncated = False
+        decoded_bytes = 0
+        try:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                if max_bytes and decoded_bytes + len(chunk) > max_bytes:
+                    chunk = chunk[:max_bytes - decoded_bytes]
+                    response.truncated = True
+                decoded_bytes += len(chunk)
+                if chunk:
+                    yield chunk
+                if response.truncated:
+                    self.log(f"响应超过{max_bytes}字节，已截断: URL={response.url}", 'WARNING')
+                    break
+        finally:
+            try:
+                wire_bytes = response.raw.tell() or decoded_bytes
+            except Exception:
+                wire_bytes = decoded_bytes
+            state.stats.add(wire_bytes=wire_bytes, decoded_bytes=decoded_bytes)
+            self.get_source_stats(source or host).add(wire_bytes, decoded_bytes)
+            response.close()
+
+    @staticmethod
+    def get_declared_encoding(response):
+        """
+        获取响应头中声明的字符集，未声明时返回 None（交由解析器按 <meta charset> 检测）
+        """
+        content_type = response.headers.get('Content-Type', '')
+        return response.encoding if 'charset' in content_type.lower() else None
+
+    def get_stats(self):
+        """
+        获取按主机统计的请求指标
+
+        Returns:
+            dict: {主机: 统计字典}
+        """
+        with self.hosts_lock:
+            return {host: state.stats.to_dict() for host, state in self.hosts.items()}
+
+    def get_transfer_stats(self):
+        """
+        获取按调用方（搜索源）统计的传输字节数
+
+        Returns:
+            dict: {调用方: 统计字典}
+        """
+        with self.sources_lock:
+            return {source: stats.to_dict() for source, stats in self.sources.items()}
+
+
+# 进程内共享的默认客户端
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """
+    获取进程内共享的HTTP客户端
+    """
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = HttpClient()
+        return _default_client
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+后台任务管理器
+将阻塞的网络抓取和页面解析放到工作线程池中执行，避免阻塞WebSocket事件循环。
+每个任务有唯一ID、进度回调、取消标志，并按用户限制同时运行的任务数
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+
+# 默认配置
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_PER_USER_LIMIT = 2
+
+
+class JobCancelled(Exception):
+    """
+    任务已被取消
+    """
+
+
+class JobLimitExceeded(Exception):
+    """
+    用户同时运行的任务数超过上限
+    """
+
+
+class Job:
+    """
+    后台任务
+
+    工作线程通过 report_progress 汇报进度；若任务已被取消，report_progress 会抛出 JobCancelled，
+    从而在下一个检查点中止任务
+    """
+
+    def __init__(self, kind, owner, loop, on_progress=None, connection=None):
+        self.job_id = uuid.uuid4().hex
+        self.kind = kind
+        self.owner = owner
+        self.connection = connection
+        self.status = 'pending'
+        self.created_at = datetime.now()
+        self.cancel_event = threading.Event()
+        self.loop = loop
+        self.on_progress = on_progress
+        self.task = None
+        # 取消时在事件循环中调用的回调（如从调度队列中移除）
+        self.cancel_callbacks = []
+        # 提交任务时的上下文（包括连接的传输格式），工作线程回调事件循环时沿用
+        self.context = contextvars.copy_context()
+
+    def cancel(self):
+        self.cancel_event.set()
+        for callback in self.cancel_callbacks:
+            self.loop.call_soon_threadsafe(callback)
+
+    def is_cancelled(self):
+        return self.cancel_event.is_set()
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise JobCancelled(self.job_id)
+
+    def report_progress(self, stage, percent, message=''):
+        """
+        汇报进度（可在工作线程中调用）
+
+        Args:
+            stage (str): 当前阶段
+            percent (int): 完成百分比
+            message (str, optional): 附加说明
+        """
+        self.check_cancelled()
+        if self.on_progress:
+            self.schedule(self.on_progress(self, stage, percent, message))
+
+    def schedule(self, coro):
+        """
+        在事件循环中执行协程（可在工作线程中调用），协程在提交任务时的上下文中运行
+        """
+        # 同一上下文不能在多个线程中同时进入，每次使用副本
+        return self.context.copy().run(asyncio.run_coroutine_threadsafe, coro, self.loop)
+
+
+class JobManager:
+    """
+    后台任务管理器
+    """
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, per_user_limit=DEFAULT_PER_USER_LIMIT):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self.per_user_limit = per_user_limit
+        self.jobs = {}
+
+    def log(self, message, level='INFO'):
+        """
+        日志记录函数
+        """
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        print(f"[{timestamp}] [JOB] [{level}] {message}")
+
+    def get_active_jobs(self, owner=None, kind=None):
+        """
+        获取未结束的任务
+        """
+        return [job for job in self.jobs.values()
+                if job.status in ('pending', 'running')
+                and (owner is None or job.owner == owner)
+                and (kind is None or job.kind == kind)]
+
+    def submit(self, kind, owner, func, *args, on_progress=None, on_done=None, connection=None, admission=None):
+        """
+        提交后台任务（必须在事件循环中调用）
+
+        Args:
+            kind (str): 任务类型，如 'sniff'
+            owner (str): 任务所属用户，用于并发限制
+            func (callable): 在工作线程中执行的函数，签名为 func(job, *args)
+            *args: 传给 func 的参数
+            on_progress (coroutine function, optional): 进度回调 on_progress(job, stage, percent, message)
+            on_done (coroutine function, optional): 结束回调 on_done(job, result, error)，
+                取消时 error 为 JobCancelled
+            connection (optional): 发起任务的连接，连接断开时可据此取消任务
+            admission (callable, optional): admission(job) 返回异步上下文管理器，任务在进入后才开始执行、
+                结束后退出（如搜索调度的排队），排队期间取消时应抛出 JobCancelled
+
+        Returns:
+            Job: 新建的任务
+
+        Raises:
+            JobLimitExceeded: 该用户未取消的同类任务数已达上限
+        """
+        # 已请求取消的任务（如被新搜索取代）在工作线程返回前仍未结束，但不再占用名额
+        running = [job for job in self.get_active_jobs(owner, kind) if not job.is_cancelled()]
+        if len(running) >= self.per_user_limit:
+            raise JobLimitExceeded(f"同时运行的任务数已达上限({self.per_user_limit})")
+
+        loop = asyncio.get_running_loop()
+        job = Job(kind, owner, loop, on_progress, connection)
+        self.jobs[job.job_id] = job
+        job.task = loop.create_task(self.run(job, func, args, on_done, admission))
+        self.log(f"任务已提交: 任务ID={job.job_id}, 类型={kind}, 用户={owner}", 'INFO')
+        return job
+
+    async def run(self, job, func, args, on_done, admission=None):
+        """
+        在线程池中执行任务（有准入控制时先等待准入）并在结束后调用结束回调
+        """
+        loop = asyncio.get_running_loop()
+        result, error = None, None
+
+        def call():
+            job.check_cancelled()
+            job.status = 'running'
+            return func(job, *args)
+
+        try:
+            async with admission(job) if admission else contextlib.nullcontext():
+                result = await loop.run_in_executor(self.executor, call)
+            job.status = 'done'
+        except JobCancelled as e:
+            job.status = 'cancelled'
+            error = e
+        except Exception as e:
+            job.status = 'failed'
+            error = e
+            self.log(f"任务执行失败: 任务ID={job.job_id}, 错误: {str(e)}", 'ERROR')
+
+        self.jobs.pop(job.job_id, None)
+        self.log(f"任务结束: 任务ID={job.job_id}, 状态={job.status}", 'INFO')
+
+        if on_done:
+            await on_done(job, result, error)
+
+    def cancel(self, job_id, owner=None):
+        """
+        取消任务
+
+        Args:
+            job_id (str): 任务ID
+            owner (str, optional): 指定时只允许取消该用户的任务
+
+        Returns:
+            bool: 是否找到并取消了任务
+        """
+        job = self.jobs.get(job_id)
+        if not job or (owner is not None and job.owner != owner):
+            return False
+        job.cancel()
+        self.log(f"任务已请求取消: 任务ID={job_id}", 'INFO')
+        return True
+
+    def cancel_connection_jobs(self, connection):
+        """
+        取消某个连接发起的所有任务（如连接断开时）
+        """
+        for job in self.get_active_jobs():
+            if job.connection is connection:
+                job.cancel()
+
+    def shutdown(self):
+        for job in list(self.jobs.values()):
+            job.cancel()
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+连接发送队列
+每个连接的数据包先进入有界队列，由独立的发送任务依次写入套接字，处理函数和广播无需等待慢速客户端。
+进度类数据包可按键合并（队列中只保留最新的一条）；队列超过高水位时丢弃可合并的数据包，
+其余数据包无法入队时断开该慢速客户端
+"""
+
+import asyncio
+import time
+from collections import deque
+from datetime import datetime
+
+from websockets.exceptions import ConnectionClosed
+
+
+# 默认配置
+DEFAULT_MAX_PACKETS = 1000              # 队列中最多的数据包数
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024    # 队列中最多的字节数（高水位）
+SLOW_CONSUMER_CLOSE_CODE = 1008
+SLOW_CONSUMER_CLOSE_REASON = 'slow consumer'
+WRITER_ERROR_CLOSE_CODE = 1011         # Internal Error
+
+
+class OutboundQueue:
+    """
+    带发送队列的连接
+
+    send 与 websocket.send 用法相同但立即返回；其他属性（remote_address、close 等）转发给底层连接，
+    服务端在处理消息、会话、任务和广播中统一使用该对象代表连接
+    """
+
+    def __init__(self, websocket, max_packets=DEFAULT_MAX_PACKETS, max_bytes=DEFAULT_MAX_BYTES):
+        self.websocket = websocket
+        self.max_packets = max_packets
+        self.max_bytes = max_bytes
+        # 队列项: [合并键, 数据包, 字节数, 入队时间]
+        self.entries = deque()
+        self.coalescable = {}
+        self.queued_bytes = 0
+        self.ready = asyncio.Event()
+        self.closed = False
+        self.stats = {
+            'sent': 0,
+            'sent_bytes': 0,
+            'coalesced': 0,
+            'dropped': 0,
+            'max_depth': 0,
+            'latency_total_ms': 0.0,
+            'latency_max_ms': 0.0,
+            'slow_consumer': False
+        }
+        self.writer = asyncio.get_running_loop().create_task(self.run())
+
+    def __getattr__(self, name):
+        return getattr(self.websocket, name)
+
+    def log(self, message, level='INFO'):
+        """
+        日志记录函数
+        """
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        print(f"[{timestamp}] [OUTBOUND] [{level}] {message}")
+
+    async def send(self, packet, coalesce_key=None):
+        """
+        将数据包加入发送队列（不等待实际发送）
+
+        Args:
+            packet (str | bytes): 数据包
+            coalesce_key (hashable, optional): 合并键，队列中尚未发送的同键数据包会被替换为最新的一条，
+                超过高水位时此类数据包直接丢弃
+
+        Returns:
+            bool: 是否已入队（或合并）
+        """
+        if self.closed:
+            return False
+
+        size = len(packet) if isinstance(packet, bytes) else len(packet.encode('utf-8'))
+        if coalesce_key is not None and coalesce_key in self.coalescable:
+            entry = self.coalescable[coalesce_key]
+            self.queued_bytes += size - entry[2]
+            entry[1], entry[2] = packet, size
+            self.stats['coalesced'] += 1
+            return True
+
+        # 队列为空时总是允许入队，单个大数据包不会被当作慢速客户端
+        if self.entries and (len(self.entries) >= self.max_packets or self.queued_bytes + size > self.max_bytes):
+            if coalesce_key is not None:
+                self.stats['dropped'] += 1
+                return False
+            self.close_slow_consumer()
+            return False
+
+        entry = [coalesce_key, packet, size, time.perf_counter()]
+        self.entries.append(entry)
+        if coalesce_key is not None:
+            self.coalescable[coalesce_key] = entry
+        self.queued_bytes += size
+        self.stats['max_depth'] = max(self.stats['max_depth'], len(self.entries))
+        self.ready.set()
+        return True
+
+    async def run(self):
+        """
+        发送任务：依次将队列中的数据包写入套接字
+        """
+        try:
+            while True:
+                await self.ready.wait()
+                while self.entries:
+                    key, packet, size, enqueued_at = self.entries.popleft()
+                    if key is not None:
+                        self.coalescable.pop(key, None)
+                    self.queued_bytes -= size
+                    await self.websocket.send(packet)
+                    latency = (time.perf_counter() - enqueued_at) * 1000
+                    self.stats['sent'] += 1
+                    self.stats['sent_bytes'] += size
+                    self.stats['latency_total_ms'] += latency
+                    self.stats['latency_max_ms'] = max(self.stats['latency_max_ms'], latency)
+                self.ready.clear()
+        except ConnectionClosed:
+            self.closed = True
+        except Exception as e:
+            # 发送任务意外退出后数据包不会再被发送，关闭连接让客户端重连，而不是让数据包一直留在队列中
+            self.log(f"发送任务异常，关闭连接: {self.websocket.remote_address} - 错误: {type(e).__name__}: {e}", 'ERROR')
+            self.closed = True
+            self.stats['dropped'] += len(self.entries)
+            self.entries.clear()
+            self.coalescable.clear()
+            self.queued_bytes = 0
+            try:
+                await self.websocket.close(code=WRITER_ERROR_CLOSE_CODE, reason='internal error')
+            except Exception:
+                pass
+
+    def close_slow_consumer(self):
+        """
+        队列超过高水位，丢弃未发送的数据包并断开连接
+        """
+        self.log(f"客户端接收过慢，断开连接: {self.websocket.remote_address}, "
+                 f"队列={len(self.entries)}个/{self.queued_bytes}字节", 'WARNING')
+        self.closed = True
+        self.stats['slow_consumer'] = True
+        self.stats['dropped'] += len(self.entries)
+        self.entries.clear()
+        self.coalescable.clear()
+        self.queued_bytes = 0
+        asyncio.get_running_loop().create_task(
+            self.websocket.close(code=SLOW_CONSUMER_CLOSE_CODE, reason=SLOW_CONSUMER_CLOSE_REASON))
+
+    async def aclose(self):
+        """
+        停止发送任务（连接关闭后调用）
+        """
+        self.closed = True
+        self.writer.cancel()
+        try:
+            await self.writer
+        except asyncio.CancelledError:
+            pass
+
+    def get_stats(self):
+        """
+        获取队列深度和发送延迟统计
+        """
+        sent = self.stats['sent']
+        return {
+            'depth': len(self.entries),
+            'queued_bytes': self.queued_bytes,
+            'max_depth': self.stats['max_depth'],
+            'sent': sent,
+            'sent_bytes': self.stats['sent_bytes'],
+            'coalesced': self.stats['coalesced'],
+            'dropped': self.stats['dropped'],
+            'latency_avg_ms': round(self.stats['latency_total_ms'] / sent, 2) if sent else 0.0,
+            'latency_max_ms': round(self.stats['latency_max_ms'], 2),
+            'slow_consumer': self.stats['slow_consumer']
+        }
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+网页存档
+嗅探和正文提取抓取到的页面按域名保存在 data/page_archive/ 下，
+供规则健康检查离线回放（无需联网）。每个域名只保留最近的若干页面。
+页面在下载过程中逐块写入存档文件（原始字节及响应声明的字符集），不需要在内存中保留完整页面
+
+存档索引保存在 SQLite（index.db）中，多进程模式下多个工作进程同时存档也不会丢失索引项；
+规则健康检查按URL模式使用样本页面，样本页面不参与淘汰，连续使用若干次后换成最近存档的页面，
+网站改版后的新页面会进入样本
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import datetime
+from urllib.parse import urlparse
+
+
+# 默认配置
+DEFAULT_ARCHIVE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'page_archive')
+DEFAULT_MAX_PAGES_PER_DOMAIN = 50
+INDEX_DB = 'index.db'
+LEGACY_INDEX_FILE = 'index.json'   # 旧版本每个域名目录下的索引文件，首次打开时导入（旧版本页面文件为UTF-8文本）
+BUSY_TIMEOUT = 10
+SAMPLE_REFRESH_RUNS = 5            # 健康检查样本连续使用该次数后换成最近存档的页面
+
+
+class PageArchive:
+    """
+    按域名组织的网页存档
+
+    目录结构：<archive_dir>/<域名>/<URL的sha1>.html，索引（URL、存档时间、字符集、健康检查样本）在 <archive_dir>/index.db
+    """
+
+    def __init__(self, archive_dir=DEFAULT_ARCHIVE_DIR, max_pages_per_domain=DEFAULT_MAX_PAGES_PER_DOMAIN,
+                 sample_refresh_runs=SAMPLE_REFRESH_RUNS):
+        self.archive_dir = archive_dir
+        self.max_pages_per_domain = max_pages_per_domain
+        self.sample_refresh_runs = sample_refresh_runs
+        self.lock = threading.Lock()
+        self.initialized = False
+
+    def log(self, message, level='INFO'):
+        """
+        日志记录函数
+        """
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        print(f"[{timestamp}] [ARCHIVE] [{level}] {message}")
+
+    def domain_dir(self, domain):
+        # 端口号中的冒号在部分文件系统中不可用
+        return os.path.join(self.archive_dir, domain.replace(':', '_'))
+
+    def page_path(self, domain, key):
+        return os.path.join(self.domain_dir(domain), key + '.html')
+
+    def connect(self):
+        """
+        打开索引数据库（每次操作使用独立连接，可在多个线程和进程中同时使用）
+        """
+        os.makedirs(self.archive_dir, exist_ok=True)
+        conn = sqlite3.connect(os.path.join(self.archive_dir, INDEX_DB), timeout=BUSY_TIMEOUT, isolation_level=None)
+        with self.lock:
+            if not self.initialized:
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS archived_pages (
+                        key TEXT PRIMARY KEY,
+                        domain TEXT NOT NULL,
+                        url TEXT NOT NULL,
+                        archived_at TEXT NOT NULL,
+                        encoding TEXT
+                    )
+                ''')
+                # 没有 encoding 列的索引中的页面都是以UTF-8文本保存的
+                columns = {row[1] for row in conn.execute('PRAGMA table_info(archived_pages)')}
+                if 'encoding' not in columns:
+                    conn.execute("ALTER TABLE archived_pages ADD COLUMN encoding TEXT DEFAULT 'utf-8'")
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_archived_pages_domain ON archived_pages (domain, archived_at)')
+                # 健康检查样本：每个域名的每个URL模式一组页面，runs 为该组样本已使用的次数
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS health_samples (
+                        domain TEXT NOT NULL,
+                        url_pattern TEXT NOT NULL,
+                        runs INTEGER NOT NULL DEFAULT 0,
+                        PRIMARY KEY (domain, url_pattern)
+                    )
+                ''')
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS health_sample_pages (
+                        domain TEXT NOT NULL,
+                        url_pattern TEXT NOT NULL,
+                        key TEXT NOT NULL,
+                        PRIMARY KEY (domain, url_pattern, key)
+                    )
+                ''')
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_health_sample_pages_key ON health_sample_pages (key)')
+                self.import_legacy_indexes(conn)
+                self.initialized = True
+        return conn
+
+    def import_legacy_indexes(self, conn):
+        """
+        导入旧版本的 index.json（导入后删除）
+        """
+        for name in os.listdir(self.archive_dir):
+            legacy = os.path.join(self.archive_dir, name, LEGACY_INDEX_FILE)
+            if not os.path.isfile(legacy):
+                continue
+            try:
+                with open(legacy, 'r', encoding='utf-8') as f:
+                    index = json.load(f)
+                conn.executemany('''
+                    INSERT OR IGNORE INTO archived_pages (key, domain, url, archived_at, encoding) VALUES (?, ?, ?, ?, 'utf-8')
+                ''', [(key, urlparse(entry['url']).netloc, entry['url'], entry['archived_at']) for key, entry in index.items()])
+                os.remove(legacy)
+            except (OSError, ValueError, KeyError) as e:
+                self.log(f"导入旧存档索引失败: 文件={legacy}, 错误: {str(e)}", 'WARNING')
+
+    def save_chunks(self, url, chunks, encoding=None):
+        """
+        边读取边存档：原样产出 chunks，同时把原始字节写入临时文件，全部读取完成后替换存档文件并登记索引。
+        同一URL覆盖旧版本，超出上限时删除最早的页面（健康检查样本页面除外）。
+        存档失败不影响调用方读取；调用方未读取完（如解析出错）时丢弃不完整的页面
+
+        Args:
+            url (str): 页面URL
+            chunks (iterable): 页面原始字节块
+            encoding (str, optional): 响应声明的字符集，回放时用于解析；为 None 时按页面内容推断
+
+        Yields:
+            bytes: 与 chunks 相同的字节块
+        """
+        domain = urlparse(url).netloc
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        path = self.page_path(domain, key)
+        # 先写临时文件再替换，回放时不会读到写了一半的页面
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        f = None
+        size = 0
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            f = open(temp_path, 'wb')
+        except OSError as e:
+            self.log(f"页面存档失败: URL={url}, 错误: {str(e)}", 'WARNING')
+
+        try:
+            for chunk in chunks:
+                if f is not None:
+                    try:
+                        f.write(chunk)
+                        size += len(chunk)
+                    except OSError as e:
+                        self.log(f"页面存档失败: URL={url}, 错误: {str(e)}", 'WARNING')
+                        self.discard(f, temp_path)
+                        f = None
+                yield chunk
+            if f is not None:
+                f.close()
+                f = None
+                if size:
+                    self.register(url, domain, key, temp_path, encoding)
+                else:
+                    os.remove(temp_path)
+        finally:
+            if f is not None:
+                self.discard(f, temp_path)
+
+    def save(self, url, html_content):
+        """
+        存档已在内存中的HTML字符串（以UTF-8保存）
+        """
+        if html_content:
+            for _ in self.save_chunks(url, [html_content.encode('utf-8')], encoding='utf-8'):
+                pass
+
+    @staticmethod
+    def discard(f, temp_path):
+        f.close()
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+
+    def register(self, url, domain, key, temp_path, encoding):
+        """
+        将写好的临时文件替换为存档文件并登记索引，淘汰超出上限的最早页面
+        """
+        try:
+            os.replace(temp_path, self.page_path(domain, key))
+            with closing(self.connect()) as conn:
+                conn.execute('BEGIN IMMEDIATE')
+                conn.execute('''
+                    INSERT INTO archived_pages (key, domain, url, archived_at, encoding) VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(key) DO UPDATE SET archived_at = excluded.archived_at, encoding = excluded.encoding
+                ''', (key, domain, url, datetime.now().isoformat(timespec='microseconds'), encoding))
+                stale = [row[0] for row in conn.execute('''
+                    SELECT key FROM archived_pages
+                    WHERE domain = ? AND key NOT IN (SELECT key FROM health_sample_pages)
+                    ORDER BY archived_at DESC, key LIMIT -1 OFFSET ?
+                ''', (domain, self.max_pages_per_domain))]
+                conn.executemany('DELETE FROM archived_pages WHERE key = ?', [(k,) for k in stale])
+                conn.execute('COMMIT')
+
+            for stale_key in stale:
+                try:
+                    os.remove(self.page_path(domain, stale_key))
+                except OSError:
+                    pass
+        except (OSError, sqlite3.Error) as e:
+            self.log(f"页面存档失败: URL={url}, 错误: {str(e)}", 'WARNING')
+
+    def pages(self, domain):
+        """
+        获取某个域名的存档页面
+
+        Returns:
+            list: (URL, 文件路径, 字符集) 列表，按存档时间倒序
+        """
+        with closing(self.connect()) as conn:
+            rows = conn.execute('SELECT key, url, encoding FROM archived_pages WHERE domain = ? ORDER BY archived_at DESC, key',
+                                (domain,)).fetchall()
+        return [(url, self.page_path(domain, key), encoding) for key, url, encoding in rows]
+
+    def sample(self, domain, url_pattern, size):
+        """
+        获取某个域名下匹配URL模式的健康检查样本页面。
+        同一组样本在连续 sample_refresh_runs 次检查中保持不变（不被淘汰），之后换成最近存档的匹配页面，
+        使网站改版后存档的新页面进入样本；样本不足 size 个时用最近存档的匹配页面补充
+
+        Args:
+            domain (str): 域名
+            url_pattern (str): 用于 re.fullmatch 匹配URL路径的正则（见 rule_generalizer.url_pattern），为空时匹配所有页面
+            size (int): 样本页面数上限
+
+        Returns:
+            list: (URL, 文件路径, 字符集) 列表，按URL排序
+        """
+        matcher = re.compile(url_pattern) if url_pattern else None
+        with closing(self.connect()) as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('SELECT runs FROM health_samples WHERE domain = ? AND url_pattern = ?',
+                               (domain, url_pattern)).fetchone()
+            refresh = row is None or row[0] >= self.sample_refresh_runs
+            if refresh:
+                conn.execute('DELETE FROM health_sample_pages WHERE domain = ? AND url_pattern = ?', (domain, url_pattern))
+            current = conn.execute('''
+                SELECT p.key, p.url, p.encoding FROM health_sample_pages s JOIN archived_pages p ON p.key = s.key
+                WHERE s.domain = ? AND s.url_pattern = ?
+            ''', (domain, url_pattern)).fetchall()
+
+            added = []
+            if len(current) < size:
+                in_sample = {row[0] for row in current}
+                for key, url, encoding in conn.execute(
+                        'SELECT key, url, encoding FROM archived_pages WHERE domain = ? ORDER BY archived_at DESC, key', (domain,)):
+                    if len(current) + len(added) >= size:
+                        break
+                    if key not in in_sample and (matcher is None or matcher.fullmatch(urlparse(url).path or '/')):
+                        added.append((key, url, encoding))
+                conn.executemany('INSERT INTO health_sample_pages (domain, url_pattern, key) VALUES (?, ?, ?)',
+                                 [(domain, url_pattern, row[0]) for row in added])
+
+            conn.execute('''
+                INSERT INTO health_samples (domain, url_pattern, runs) VALUES (?, ?, 1)
+                ON CONFLICT(domain, url_pattern) DO UPDATE SET runs = CASE WHEN ? THEN 1 ELSE runs + 1 END
+            ''', (domain, url_pattern, refresh))
+            conn.execute('COMMIT')
+
+        if refresh or added:
+            self.log(f"更新健康检查样本页面: 域名={domain}, URL模式={url_pattern or '*'}, "
+                     f"{'重新选取' if refresh else '补充'}={len(added)}, 样本数={len(current) + len(added)}", 'INFO')
+        return sorted((url, self.page_path(domain, key), encoding) for key, url, encoding in current + added)
+
+
+_archive = None
+_archive_lock = threading.Lock()
+
+
+def get_page_archive():
+    """
+    获取全局共享的网页存档
+    """
+    global _archive
+    with _archive_lock:
+        if _archive is None:
+            _archive = PageArchive()
+        return _archive
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+搜索结果解析进程池
+搜索源分为两个阶段：抓取（网络I/O，在搜索任务的线程中执行）和解析（BeautifulSoup 解析，CPU密集且持有GIL）。
+解析阶段提交到所有搜索共享的进程池：传入原始响应字节，返回紧凑的结果元组，多个搜索的解析可以同时占用多个CPU核心
+
+搜索源模块提供 parse_page(raw, encoding=None) -> list[tuple]，抓取后调用 parse_in_pool(__file__, raw, encoding)
+"""
+
+import importlib.util
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+from .html_document import detect_encoding, ENCODING_SNIFF_BYTES
+
+
+# 默认配置
+DEFAULT_PARSE_WORKERS = os.cpu_count() or 1   # 0 表示不使用进程池，在调用线程中解析
+
+_pool = None
+_pool_lock = threading.Lock()
+_max_workers = DEFAULT_PARSE_WORKERS
+
+# 解析进程中已加载的搜索源模块：文件路径 -> 模块
+_source_modules = {}
+
+
+def log(message, level='INFO'):
+    """
+    日志记录函数
+    """
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    print(f"[{timestamp}] [PARSE_POOL] [{level}] {message}")
+
+
+def configure(max_workers):
+    """
+    设置进程池大小（在第一次解析之前调用；多进程服务时每个工作进程各有一个进程池）
+
+    Args:
+        max_workers (int): 解析进程数，0 表示在调用线程中解析
+    """
+    global _max_workers
+    shutdown()
+    _max_workers = max_workers
+
+
+def get_parse_pool():
+    """
+    获取共享的解析进程池（首次使用时创建，进程按需启动）
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None and _max_workers > 0:
+            import multiprocessing
+            # 使用 spawn 启动解析进程：调用方通常是有多个线程的服务进程
+            _pool = ProcessPoolExecutor(max_workers=_max_workers, mp_context=multiprocessing.get_context('spawn'))
+            log(f"解析进程池已创建: 进程数={_max_workers}", 'INFO')
+        return _pool
+
+
+def shutdown():
+    """
+    关闭解析进程池
+    """
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def decode_html(raw, encoding=None):
+    """
+    将响应字节解码为HTML字符串：优先使用响应头声明的字符集，未声明时按页面开头推断（见 detect_encoding）
+    """
+    if isinstance(raw, str):
+        return raw
+    if not encoding or encoding.lower() == 'iso-8859-1':
+        encoding = detect_encoding(raw[:ENCODING_SNIFF_BYTES]) or 'utf-8'
+    try:
+        return raw.decode(encoding, errors='replace')
+    except LookupError:
+        return raw.decode('utf-8', errors='replace')
+
+
+def load_source_module(source_file):
+    """
+    按文件路径加载搜索源模块（每个进程只加载一次）
+    """
+    module = _source_modules.get(source_file)
+    if module is None:
+        name = 'search_source_' + os.path.splitext(os.path.basename(source_file))[0]
+        spec = importlib.util.spec_from_file_location(name, source_file)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _source_modules[source_file] = module
+    return module
+
+
+def parse_source_page(source_file, raw, encoding=None):
+    """
+    调用搜索源的 parse_page（在解析进程中执行）
+    """
+    return load_source_module(source_file).parse_page(raw, encoding)
+
+
+def parse_in_pool(source_file, raw, encoding=None):
+    """
+    在共享进程池中解析一个搜索结果页面，阻塞直到解析完成（在搜索任务的线程中调用）
+
+    Args:
+        source_file (str): 搜索源模块文件路径（模块的 __file__）
+        raw (bytes): 原始响应内容
+        encoding (str, optional): 响应头声明的字符集
+
+    Returns:
+        list: 搜索源 parse_page 返回的结果元组列表
+    """
+    pool = get_parse_pool()
+    if pool is None:
+        return parse_source_page(source_file, raw, encoding)
+    try:
+        return pool.submit(parse_source_page, source_file, raw, encoding).result()
+    except BrokenProcessPool:
+        # 解析进程异常退出（如内存不足被结束），重建进程池，本次在当前线程中解析
+        log(f"解析进程池已损坏，重建进程池: 搜索源={os.path.basename(source_file)}", 'WARNING')
+        shutdown()
+        return parse_source_page(source_file, raw, encoding)
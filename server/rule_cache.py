@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+已编译爬虫规则缓存
+在 spider_rules 查询前加一层进程内LRU缓存，缓存的是编译后的规则对象：
+XPath已预编译、请求头JSON已解码，按URL和域名两种键缓存，规则变化时按域名失效
+"""
+
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from urllib.parse import urlparse
+
+import lxml.etree as ET
+
+
+# 默认配置
+DEFAULT_CAPACITY = 1024
+
+# 已编译的XPath缓存：表达式 -> etree.XPath（编译失败时为 None）
+_compiled_xpaths = {}
+_compiled_xpaths_lock = threading.Lock()
+
+
+def compile_xpath(expression):
+    """
+    编译XPath表达式，同一表达式只编译一次
+
+    Returns:
+        etree.XPath: 编译后的XPath，表达式为空或非法时返回 None
+    """
+    if not expression:
+        return None
+    with _compiled_xpaths_lock:
+        if expression not in _compiled_xpaths:
+            try:
+                _compiled_xpaths[expression] = ET.XPath(expression)
+            except ET.XPathSyntaxError:
+                _compiled_xpaths[expression] = None
+        return _compiled_xpaths[expression]
+
+
+class CompiledRule:
+    """
+    编译后的爬虫规则
+    """
+
+    def __init__(self, row):
+        """
+        Args:
+            row (tuple): 数据库规则元组，SPIDER_RULE_COLUMNS 或 DOMAIN_RULE_COLUMNS 顺序
+        """
+        self.rule_id = row[0]
+        self.source_url = row[1]
+        self.domain = row[2]
+        self.title_xpath = row[3]
+        self.content_xpath = row[4]
+        self.image_xpath = row[5]
+        self.created_at = row[6]
+        self.updated_at = row[7]
+        self.request_headers = row[8]
+        # 域名归纳规则额外带有置信度和样本数
+        self.is_domain_rule = len(row) > 9
+        self.confidence = row[9] if self.is_domain_rule else None
+        self.sample_count = row[10] if self.is_domain_rule else None
+
+        self.title = compile_xpath(self.title_xpath)
+        self.content = compile_xpath(self.content_xpath)
+        self.image = compile_xpath(self.image_xpath)
+        self.headers = self.decode_headers(self.request_headers)
+
+    @staticmethod
+    def decode_headers(request_headers):
+        """
+        解码保存的请求头JSON，无效时返回 None
+        """
+        if isinstance(request_headers, str) and request_headers:
+            try:
+                request_headers = json.loads(request_headers)
+            except ValueError:
+                return None
+        return request_headers if isinstance(request_headers, dict) and request_headers else None
+
+    def to_dict(self):
+        rule = {
+            'id': self.rule_id,
+            'source_url': self.source_url,
+            'domain': self.domain,
+            'title_xpath': self.title_xpath,
+            'content_xpath': self.content_xpath,
+            'image_xpath': self.image_xpath,
+            'request_headers': self.request_headers,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
+        }
+        if self.is_domain_rule:
+            rule['url_pattern'] = rule.pop('source_url')
+            rule['confidence'] = self.confidence
+            rule['sample_count'] = self.sample_count
+        return rule
+
+
+class RuleCache:
+    """
+    爬虫规则LRU缓存
+
+    必须与数据库在同一线程中使用（未命中时会查询数据库）。
+    未找到规则的URL同样会被缓存，直到该域名的规则发生变化
+    """
+
+    def __init__(self, db, capacity=DEFAULT_CAPACITY):
+        self.db = db
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+        # 规则写入（嗅探、归纳）后按域名失效
+        db.add_rule_listener(self.invalidate_domain)
+
+    def log(self, message, level='INFO'):
+        """
+        日志记录函数
+        """
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        print(f"[{timestamp}] [RULE_CACHE] [{level}] {message}")
+
+    def lookup(self, key, load):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+
+        value = load()
+
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+        return value
+
+    def find(self, url):
+        """
+        查找适用于URL的规则（回退顺序同 Database.find_spider_rule）
+
+        Returns:
+            CompiledRule: 编译后的规则，不存在时返回 None
+        """
+        domain = urlparse(url).netloc
+
+        def load():
+            row = self.db.find_spider_rule(url)
+            return CompiledRule(row) if row else None
+
+        return self.lookup(('url', domain, url), load)
+
+    def by_domain(self, domain):
+        """
+        获取某个域名下已嗅探的全部规则
+
+        Returns:
+            list: CompiledRule 列表，按更新时间倒序
+        """
+        return self.lookup(('domain', domain, None),
+                           lambda: [CompiledRule(row) for row in self.db.get_spider_rules_by_domain(domain)])
+
+    def invalidate_domain(self, domain):
+        """
+        使某个域名的所有缓存项失效
+        """
+        with self.lock:
+            stale = [key for key in self.entries if key[1] == domain]
+            for key in stale:
+                del self.entries[key]
+            self.invalidations += 1
+        self.log(f"规则缓存已失效: 域名={domain}, 清除条目={len(stale)}", 'DEBUG')
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def get_stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self.entries),
+                'capacity': self.capacity,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 3) if total else 0.0,
+                'invalidations': self.invalidations
+            }
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+域名级爬虫规则归纳
+同一站点的文章页通常共用一套模板，将同一域名下多条已嗅探的规则归纳为URL模式规则和域名规则，
+新文章无需逐个嗅探即可直接套用。每条归纳规则附带置信度（参与归纳的规则中与其一致的比例）
+"""
+
+import re
+from collections import Counter
+from datetime import datetime
+from urllib.parse import urlparse
+
+
+# 默认配置
+MIN_SAMPLES = 2        # 至少需要的已嗅探规则数
+MIN_CONFIDENCE = 0.5   # 低于该置信度的归纳规则不保存
+HIGH_CONFIDENCE = 0.8  # 达到该置信度的域名无需再逐个嗅探
+
+# 位置谓词，如 div[2] 中的 [2]
+POSITION_PREDICATE = re.compile(r'\[\d+\]$')
+DIGITS = re.compile(r'\d+')
+
+
+def split_xpath(xpath):
+    """
+    将XPath按 / 拆分为步骤，忽略谓词和引号内的 /
+
+    Returns:
+        list: 步骤列表，// 拆分后对应空步骤
+    """
+    steps = []
+    current = ''
+    depth = 0
+    quote = None
+    for char in xpath:
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in ('"', "'"):
+            quote = char
+        elif char == '[':
+            depth += 1
+        elif char == ']':
+            depth -= 1
+        elif char == '/' and depth == 0:
+            steps.append(current)
+            current = ''
+            continue
+        current += char
+    steps.append(current)
+    return steps
+
+
+def generalize_xpath(xpaths):
+    """
+    归纳多条XPath
+
+    按去掉位置谓词后的结构分组，取最大的一组；组内位置谓词不一致的步骤去掉位置谓词
+
+    Args:
+        xpaths (list): 各规则中的同一字段XPath，未嗅探到的为空
+
+    Returns:
+        tuple: (归纳后的XPath, 置信度)，没有可用XPath时为 (None, 0.0)
+    """
+    groups = {}
+    for xpath in xpaths:
+        if not xpath:
+            continue
+        steps = split_xpath(xpath)
+        skeleton = tuple(POSITION_PREDICATE.sub('', step) for step in steps)
+        groups.setdefault(skeleton, []).append(steps)
+
+    if not groups:
+        return None, 0.0
+
+    skeleton, members = max(groups.items(), key=lambda item: len(item[1]))
+    steps = []
+    for index, bare_step in enumerate(skeleton):
+        variants = {member[index] for member in members}
+        steps.append(variants.pop() if len(variants) == 1 else bare_step)
+
+    return '/'.join(steps), len(members) / len(xpaths)
+
+
+def url_pattern(url):
+    """
+    由URL路径生成模式：数字串替换为 \\d+，其余部分转义
+
+    Returns:
+        str: 用于 re.fullmatch 匹配URL路径的正则
+    """
+    path = urlparse(url).path or '/'
+    parts = DIGITS.split(path)
+    return r'\d+'.join(re.escape(part) for part in parts)
+
+
+class RuleGeneralizer:
+    """
+    域名级爬虫规则归纳器
+    """
+
+    def __init__(self, min_samples=MIN_SAMPLES, min_confidence=MIN_CONFIDENCE):
+        self.min_samples = min_samples
+        self.min_confidence = min_confidence
+
+    def log(self, message, level='INFO'):
+        """
+        日志记录函数
+        """
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        print(f"[{timestamp}] [GENERALIZE] [{level}] {message}")
+
+    def merge_rules(self, rules, pattern):
+        """
+        将一组规则合并为一条归纳规则
+
+        Args:
+            rules (list): 爬虫规则元组（SPIDER_RULE_COLUMNS 顺序）
+            pattern (str): URL路径模式，域名规则为空字符串
+
+        Returns:
+            dict: 归纳规则；标题或正文置信度过低时返回 None
+        """
+        title_xpath, title_confidence = generalize_xpath([rule[3] for rule in rules])
+        content_xpath, content_confidence = generalize_xpath([rule[4] for rule in rules])
+        image_xpath, image_confidence = generalize_xpath([rule[5] for rule in rules])
+
+        # 图片是可选字段，不参与整体置信度，只在多数页面一致时保留
+        confidence = min(title_confidence, content_confidence)
+        if confidence < self.min_confidence:
+            return None
+        if image_confidence < self.min_confidence:
+            image_xpath = None
+
+        headers = Counter(rule[8] for rule in rules if rule[8])
+        return {
+            'url_pattern': pattern,
+            'title_xpath': title_xpath,
+            'content_xpath': content_xpath,
+            'image_xpath': image_xpath,
+            'request_headers': headers.most_common(1)[0][0] if headers else None,
+            'confidence': round(confidence, 3),
+            'sample_count': len(rules)
+        }
+
+    def generalize(self, rules):
+        """
+        归纳同一域名下的规则
+
+        Args:
+            rules (list): 爬虫规则元组列表（SPIDER_RULE_COLUMNS 顺序，通常来自 get_spider_rules_by_domain）
+
+        Returns:
+            list: 归纳规则列表，包括各URL模式规则以及 url_pattern 为空的域名规则
+        """
+        if len(rules) < self.min_samples:
+            return []
+
+        by_pattern = {}
+        for rule in rules:
+            by_pattern.setdefault(url_pattern(rule[1]), []).append(rule)
+
+        generalized = []
+        for pattern, members in by_pattern.items():
+            if len(members) >= self.min_samples:
+                merged = self.merge_rules(members, pattern)
+                if merged:
+                    generalized.append(merged)
+
+        domain_rule = self.merge_rules(rules, '')
+        if domain_rule:
+            generalized.append(domain_rule)
+
+        self.log(f"规则归纳完成: 样本数={len(rules)}, URL模式数={len(by_pattern)}, 归纳规则数={len(generalized)}", 'INFO')
+        return generalized
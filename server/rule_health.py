@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+爬虫规则健康检查
+将 spider_rules 中的每条规则在本地存档页面（data/page_archive）上离线回放，
+统计提取产出和耗时，与该规则的基准（最近一次未标记的检查结果）比较，标记产出明显下降的规则（通常是网站改版）。
+每条规则只在与其源页面URL模式相同的存档页面上回放，样本定期换成最近存档的页面（见 PageArchive.sample）。
+回放按规则分发到多进程并行执行，不访问网络
+
+用法: python server/rule_health.py [--workers N] [--domain 域名] [--max-pages N]
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from server.database import Database
+from server.page_archive import get_page_archive
+from server.html_document import ParsedDocument
+from server.rule_cache import CompiledRule
+from server.rule_generalizer import url_pattern
+
+
+# 默认配置
+DEFAULT_MAX_PAGES = 20          # 每条规则最多回放的存档页面数
+YIELD_DROP_THRESHOLD = 0.3      # 产出率下降超过该比例时标记
+CONTENT_DROP_THRESHOLD = 0.5    # 平均正文长度下降超过该比例时标记
+CHUNKS_PER_WORKER = 4
+
+_extractor = None
+
+
+def replay_rule(task):
+    """
+    在存档页面上回放一条规则（在子进程中执行）
+
+    Args:
+        task (tuple): (规则元组, [(URL, 存档文件路径, 字符集), ...])
+
+    Returns:
+        dict: rule_id、pages、matched、yield_rate、avg_content_length、elapsed_ms、sample_key
+    """
+    global _extractor
+    if _extractor is None:
+        from server.article_extractor import ArticleExtractor
+        _extractor = ArticleExtractor()
+
+    row, pages = task
+    started = time.perf_counter()
+    rule = CompiledRule(row)
+    checked = matched = content_length = 0
+
+    for url, path, encoding in pages:
+        try:
+            with open(path, 'rb') as f:
+                document = ParsedDocument.from_chunks([f.read()], encoding=encoding)
+        except OSError:
+            continue
+        checked += 1
+        article = _extractor.extract_document(document, rule, url)
+        if article['title'] and article['content']:
+            matched += 1
+        content_length += len(article['content'])
+
+    return {
+        'rule_id': rule.rule_id,
+        'pages': checked,
+        'matched': matched,
+        'yield_rate': round(matched / checked, 3) if checked else 0.0,
+        'avg_content_length': round(content_length / checked, 1) if checked else 0.0,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 2),
+        'sample_key': sample_key(pages)
+    }
+
+
+def sample_key(pages):
+    """
+    样本页面集合的标识（记录每次检查使用的是哪一组样本）
+    """
+    return hashlib.sha1('\n'.join(sorted(page[0] for page in pages)).encode('utf-8')).hexdigest()[:16]
+
+
+class RuleHealthChecker:
+    """
+    爬虫规则健康检查器
+    """
+
+    def __init__(self, db=None, archive=None, max_workers=None, max_pages=DEFAULT_MAX_PAGES):
+        self.db = db or Database()
+        self.archive = archive or get_page_archive()
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pages = max_pages
+
+    def log(self, message, level='INFO'):
+        """
+        日志记录函数
+        """
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        print(f"[{timestamp}] [RULE_HEALTH] [{level}] {message}")
+
+    def build_tasks(self, rules):
+        """
+        为每条规则挑选存档页面：同域名下与规则源页面URL模式相同的样本页面（同一模板的页面），
+        其他模板的页面不适用于该规则，不参与回放
+        """
+        groups = {(row[2], url_pattern(row[1])) for row in rules}
+        samples = {(domain, pattern): self.archive.sample(domain, pattern, self.max_pages) for domain, pattern in groups}
+        return [(row, samples[(row[2], url_pattern(row[1]))]) for row in rules]
+
+    def is_degraded(self, result, baseline):
+        """
+        判断规则产出是否下降。样本页面会轮换，基准可能来自另一组页面，
+        比较的是规则在当前（较新的）页面上的产出与其正常时的产出
+
+        Args:
+            result (dict): 本次检查结果
+            baseline (tuple): 该规则最近一次未标记的检查结果 (pages, matched, yield_rate, avg_content_length)，没有时为 None
+        """
+        if not result['pages']:
+            return False
+        if result['matched'] == 0:
+            return True
+        if baseline is None or not baseline[0]:
+            return False
+        _, _, baseline_yield, baseline_length = baseline
+        if result['yield_rate'] < baseline_yield * (1 - YIELD_DROP_THRESHOLD):
+            return True
+        return baseline_length > 0 and result['avg_content_length'] < baseline_length * (1 - CONTENT_DROP_THRESHOLD)
+
+    def run(self, domain=None):
+        """
+        执行一次健康检查并保存结果
+
+        Args:
+            domain (str, optional): 只检查该域名的规则
+
+        Returns:
+            list: 检查结果列表，每项额外包含 flagged
+        """
+        rules = self.db.get_spider_rules_by_domain(domain) if domain else self.db.get_spider_rules()
+        tasks = [task for task in self.build_tasks(rules) if task[1]]
+        self.log(f"开始规则健康检查: 规则数={len(rules)}, 有存档页面={len(tasks)}, 进程数={self.max_workers}", 'INFO')
+        if not tasks:
+            return []
+
+        started = time.perf_counter()
+        chunksize = max(1, len(tasks) // (self.max_workers * CHUNKS_PER_WORKER))
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(replay_rule, tasks, chunksize=chunksize))
+
+        baselines = self.db.get_rule_health_baselines()
+        for result in results:
+            result['flagged'] = self.is_degraded(result, baselines.get(result['rule_id']))
+        self.db.add_rule_health_results(results)
+
+        flagged = [result for result in results if result['flagged']]
+        for result in flagged:
+            self.log(f"规则产出下降: 规则ID={result['rule_id']}, 页面数={result['pages']}, "
+                     f"产出率={result['yield_rate']}, 平均正文长度={result['avg_content_length']}", 'WARNING')
+        self.log(f"规则健康检查完成: 检查={len(results)}, 标记={len(flagged)}, "
+                 f"耗时={time.perf_counter() - started:.2f}s", 'INFO')
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='爬虫规则健康检查（离线回放存档页面）')
+    parser.add_argument('--workers', type=int, default=None, help='进程数，默认为CPU核数')
+    parser.add_argument('--domain', default=None, help='只检查该域名的规则')
+    parser.add_argument('--max-pages', type=int, default=DEFAULT_MAX_PAGES, help='每条规则最多回放的页面数')
+    args = parser.parse_args()
+
+    checker = RuleHealthChecker(max_workers=args.workers, max_pages=args.max_pages)
+    results = checker.run(domain=args.domain)
+
+    print(f"{'规则ID':>8}{'页面':>6}{'命中':>6}{'产出率':>8}{'平均正文':>10}{'耗时(ms)':>10}  状态")
+    for result in results:
+        status = '产出下降' if result['flagged'] else '正常'
+        print(f"{result['rule_id']:>8}{result['pages']:>6}{result['matched']:>6}{result['yield_rate']:>8}"
+              f"{result['avg_content_length']:>10}{result['elapsed_ms']:>10}  {status}")
+
+    checker.db.close()
+
+
+if __name__ == '__main__':
+    main()
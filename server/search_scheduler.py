@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+搜索任务调度
+限制同时执行的搜索数，避免多个用户的大量翻页请求同时打到搜索引擎而触发封禁。
+超出上限的搜索按用户分队列等待，空出名额时：
+- 正在执行的搜索少的用户优先（按用户公平分配）；
+- 预计抓取页数少的小搜索排在大搜索之前，权限等级高的用户相当于少抓取若干页；
+- 等待时间越长优先级越高，大搜索不会一直等待。
+排队中的搜索在队列位置变化时收到 search_queued 数据包
+
+多进程模式下执行名额由 supervisor 统一发放（见 SearchPermits），上限对所有工作进程生效，
+每个工作进程只在本进程的等待队列中按上述规则排序
+"""
+
+import asyncio
+import contextlib
+import itertools
+import time
+from collections import Counter
+from datetime import datetime
+
+from .job_manager import JobCancelled
+
+
+# 默认配置
+MAX_CONCURRENT_SEARCHES = 3   # 同时执行的搜索数上限
+PERMISSION_BONUS_PAGES = 5    # 每个权限等级相当于少抓取的页数
+AGING_SECONDS = 10            # 每等待该时间（秒）相当于少抓取一页
+
+
+class SearchTicket:
+    """
+    等待执行的搜索
+    """
+
+    def __init__(self, job, cost, permission_level, seq):
+        self.job = job
+        self.cost = cost
+        self.permission_level = permission_level
+        self.seq = seq
+        self.enqueued_at = time.monotonic()
+        self.future = asyncio.get_running_loop().create_future()
+        self.position = None
+
+    def priority(self, now):
+        """
+        优先级（越小越先执行）
+        """
+        return self.cost - self.permission_level * PERMISSION_BONUS_PAGES - (now - self.enqueued_at) / AGING_SECONDS
+
+
+class SearchPermits:
+    """
+    多进程模式下工作进程持有的执行名额：向 supervisor 申请，搜索结束后归还，
+    supervisor 在所有工作进程间按持有名额最少优先的顺序发放，总数不超过上限。
+    排队的搜索被取消后撤回多申请的名额，supervisor 不再向没有等待者的工作进程发放
+    """
+
+    def __init__(self, publish):
+        """
+        Args:
+            publish (callable): 向 supervisor 发送消息 publish(kind, data)
+        """
+        self.publish = publish
+        self.held = 0
+        self.requested = 0
+
+    def request(self, count):
+        self.requested += count
+        self.publish('search_permit_request', {'count': count})
+
+    def withdraw(self, count):
+        self.requested -= count
+        self.publish('search_permit_withdraw', {'count': count})
+
+    def granted(self, count):
+        self.requested = max(0, self.requested - count)
+        self.held += count
+
+    def release(self, count):
+        self.held -= count
+        self.publish('search_permit_release', {'count': count})
+
+
+class SearchScheduler:
+    """
+    搜索准入控制（只在事件循环线程中使用），通过 JobManager.submit 的 admission 参数接入
+    """
+
+    def __init__(self, max_concurrent=MAX_CONCURRENT_SEARCHES, on_queued=None, on_started=None, permits=None):
+        """
+        Args:
+            max_concurrent (int): 同时执行的搜索数上限
+            on_queued (coroutine function, optional): 队列位置变化回调 on_queued(job, position, queue_length)
+            on_started (coroutine function, optional): 开始执行回调 on_started(job)
+            permits (SearchPermits, optional): 多进程模式下由 supervisor 发放的执行名额，此时 max_concurrent 由 supervisor 执行
+        """
+        self.max_concurrent = max_concurrent
+        self.permits = permits
+        self.on_queued = on_queued
+        self.on_started = on_started
+        # 每个用户等待中的搜索，以及每个用户正在执行的搜索数
+        self.queues = {}
+        self.running = Counter()
+        self.seq = itertools.count()
+        self.stats = {'admitted': 0, 'queued': 0, 'cancelled_in_queue': 0, 'wait_total': 0.0, 'wait_max': 0.0}
+
+    def log(self, message, level='INFO'):
+        """
+        日志记录函数
+        """
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        print(f"[{timestamp}] [SCHEDULER] [{level}] {message}")
+
+    def admission(self, cost, permission_level=0):
+        """
+        创建传给 JobManager.submit 的准入函数
+
+        Args:
+            cost (int): 预计抓取的页数（页数 x 搜索源数）
+            permission_level (int): 发起用户的权限等级
+        """
+        return lambda job: self.slot(job, cost, permission_level)
+
+    @contextlib.asynccontextmanager
+    async def slot(self, job, cost, permission_level=0):
+        """
+        占用一个执行名额，没有空闲名额时排队等待
+
+        Raises:
+            JobCancelled: 搜索在排队期间被取消
+        """
+        await self.acquire(job, cost, permission_level)
+        try:
+            yield
+        finally:
+            await self.release(job)
+
+    def waiting(self):
+        return sum(len(tickets) for tickets in self.queues.values())
+
+    def running_total(self):
+        return sum(self.running.values())
+
+    def capacity(self):
+        """
+        本进程当前可以同时执行的搜索数
+        """
+        return self.max_concurrent if self.permits is None else self.permits.held
+
+    def use_permits(self, permits):
+        """
+        切换为由 supervisor 发放执行名额（多进程模式，在接受连接之前调用）
+        """
+        self.permits = permits
+
+    def on_permits_granted(self, count):
+        """
+        supervisor 发放了执行名额
+        """
+        self.permits.granted(count)
+        self.dispatch()
+        asyncio.get_running_loop().create_task(self.notify_positions())
+
+    async def acquire(self, job, cost, permission_level):
+        job.check_cancelled()
+        ticket = SearchTicket(job, cost, permission_level, next(self.seq))
+        self.queues.setdefault(job.owner, []).append(ticket)
+        job.cancel_callbacks.append(lambda: self.withdraw(ticket))
+        self.dispatch()
+
+        if not ticket.future.done():
+            self.stats['queued'] += 1
+            self.log(f"搜索排队: 任务ID={job.job_id}, 用户={job.owner}, 预计页数={cost}, "
+                     f"执行中={self.running_total()}, 等待中={self.waiting()}", 'INFO')
+            await self.notify_positions()
+        try:
+            await ticket.future
+        except asyncio.CancelledError:
+            # 等待的协程被取消：仍在排队时移出队列，已获得名额时归还
+            if ticket.future.cancelled():
+                if self.remove(ticket) and self.permits is not None:
+                    self.balance_permits()
+            elif ticket.future.exception() is None:
+                self.free(job.owner)
+            raise
+
+        if self.on_started:
+            try:
+                await self.on_started(job)
+            except Exception as e:
+                self.log(f"发送开始执行通知失败: 任务ID={job.job_id} - 错误: {str(e)}", 'WARNING')
+
+    async def release(self, job):
+        self.free(job.owner)
+        await self.notify_positions()
+
+    def free(self, owner):
+        """
+        归还执行名额并调度等待中的搜索
+        """
+        self.running[owner] -= 1
+        if self.running[owner] <= 0:
+            del self.running[owner]
+        if self.permits is not None:
+            # 名额先归还 supervisor，由其在所有工作进程的等待者中重新分配
+            self.permits.release(1)
+        self.dispatch()
+
+    def dispatch_order(self):
+        """
+        按调度规则排列所有等待中的搜索（模拟依次空出名额时的执行顺序）
+        """
+        now = time.monotonic()
+        running = Counter(self.running)
+        queues = {owner: sorted(tickets, key=lambda ticket: (ticket.priority(now), ticket.seq))
+                  for owner, tickets in self.queues.items() if tickets}
+        order = []
+        while queues:
+            owner = min(queues, key=lambda o: (running[o], queues[o][0].priority(now), queues[o][0].seq))
+            ticket = queues[owner].pop(0)
+            if not queues[owner]:
+                del queues[owner]
+            running[owner] += 1
+            order.append(ticket)
+        return order
+
+    def dispatch(self):
+        """
+        有空闲名额时按调度顺序开始执行等待中的搜索
+        """
+        available = self.capacity() - self.running_total()
+        for ticket in self.dispatch_order():
+            if available <= 0:
+                break
+            self.remove(ticket)
+            if ticket.future.done():
+                # 等待的协程已被取消
+                continue
+            available -= 1
+            self.running[ticket.job.owner] += 1
+            waited = time.monotonic() - ticket.enqueued_at
+            self.stats['admitted'] += 1
+            self.stats['wait_total'] += waited
+            self.stats['wait_max'] = max(self.stats['wait_max'], waited)
+            ticket.future.set_result(None)
+
+        if self.permits is not None:
+            self.balance_permits()
+
+    def balance_permits(self):
+        """
+        多进程模式：使申请中的名额数等于等待中的搜索数（不足时申请，多出时撤回），归还没有搜索可用的名额
+        """
+        waiting = self.waiting()
+        idle = self.permits.held - self.running_total()
+        if idle > 0 and not waiting:
+            self.permits.release(idle)
+        shortfall = waiting - self.permits.requested
+        if shortfall > 0:
+            self.permits.request(shortfall)
+        elif shortfall < 0:
+            self.permits.withdraw(-shortfall)
+
+    def remove(self, ticket):
+        tickets = self.queues.get(ticket.job.owner, [])
+        if ticket in tickets:
+            tickets.remove(ticket)
+            if not tickets:
+                del self.queues[ticket.job.owner]
+            return True
+        return False
+
+    def withdraw(self, ticket):
+        """
+        排队中的搜索被取消时移出队列（已开始执行的搜索不受影响）
+
+        Returns:
+            bool: 是否仍在排队并已移出
+        """
+        if not self.remove(ticket):
+            return False
+        self.stats['cancelled_in_queue'] += 1
+        if not ticket.future.done():
+            ticket.future.set_exception(JobCancelled(ticket.job.job_id))
+        if self.permits is not None:
+            self.balance_permits()
+        asyncio.get_running_loop().create_task(self.notify_positions())
+        return True
+
+    async def notify_positions(self):
+        """
+        向队列位置发生变化的搜索发送 search_queued
+        """
+        order = self.dispatch_order()
+        for position, ticket in enumerate(order, 1):
+            if ticket.position == position:
+                continue
+            ticket.position = position
+            if self.on_queued:
+                try:
+                    await self.on_queued(ticket.job, position, len(order))
+                except Exception as e:
+                    self.log(f"发送队列位置失败: 任务ID={ticket.job.job_id} - 错误: {str(e)}", 'WARNING')
+
+    def get_stats(self):
+        admitted = self.stats['admitted']
+        return {
+            'max_concurrent': self.max_concurrent,
+            'permits_held': self.permits.held if self.permits is not None else None,
+            'running': dict(self.running),
+            'waiting': {owner: len(tickets) for owner, tickets in self.queues.items()},
+            'admitted': admitted,
+            'queued': self.stats['queued'],
+            'cancelled_in_queue': self.stats['cancelled_in_queue'],
+            'wait_avg_s': round(self.stats['wait_total'] / admitted, 2) if admitted else 0.0,
+            'wait_max_s': round(self.stats['wait_max'], 2)
+        }
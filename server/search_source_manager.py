@@ -1,5 +1,6 @@
 import os
 import importlib.util
+import inspect
 import hashlib
 import json
 
@@ -68,7 +69,9 @@ class SearchSourceManager:
                             'display_name': source_config.get('name', filename[:-3]),
                             'description': source_config.get('description', ''),
                             'module': module,
-                            'enabled': source_id not in self.blacklist
+                            'enabled': source_id not in self.blacklist,
+                            # main 接受 cancel_event 参数的搜索源可以在翻页之间响应取消
+                            'cancellable': 'cancel_event' in inspect.signature(module.main).parameters
                         })
         
         return search_sources
@@ -82,6 +85,23 @@ class SearchSourceManager:
         """
         return [source for source in self.search_sources if source['enabled']]
     
+    def run_source(self, source, keyword, max_pages, cancel_event=None):
+        """
+        调用搜索源的main函数
+        
+        Args:
+            source (dict): 搜索源
+            keyword (str): 搜索内容
+            max_pages (int): 最大页数
+            cancel_event (threading.Event, optional): 取消标志，搜索源支持时传入
+            
+        Returns:
+            tuple: (是否成功, 数据列表)
+        """
+        if source.get('cancellable') and cancel_event is not None:
+            return source['module'].main(keyword, max_pages, cancel_event=cancel_event)
+        return source['module'].main(keyword, max_pages)
+    
     def get_all_sources(self):
         """
         获取所有搜索源（包括禁用的）
@@ -7,10 +7,7 @@
 """
 
 import requests
-import re
 import json
-from bs4 import BeautifulSoup
-from lxml import etree
 from datetime import datetime
 import os
 import sys
@@ -29,18 +26,22 @@ logger = logging.getLogger('WebSniffer')
 # 导入数据库模块
 try:
     from server.database import Database
+    from server.http_client import get_http_client, ACCEPT_ENCODING, DEFAULT_MAX_BYTES
+    from server.html_document import ParsedDocument
 except ImportError as e:
     logger.error(f"导入数据库模块失败: {str(e)}")
     sys.exit(1)
 
 class WebSniffer:
-    def __init__(self):
-        self.session = requests.Session()
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.http = get_http_client()
+        # 单个页面最多读取的字节数，超出部分截断不解析
+        self.max_bytes = max_bytes
         self.default_headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
             'Accept-Language': 'zh-CN,zh;q=0.8,en;q=0.6',
-            'Accept-Encoding': 'gzip, deflate, br',
+            'Accept-Encoding': ACCEPT_ENCODING,
             'Connection': 'keep-alive',
             'Upgrade-Insecure-Requests': '1',
         }
@@ -65,13 +66,14 @@ class WebSniffer:
     def fetch_page(self, url, headers=None):
         """
         获取网页内容和响应头信息
+        以流式方式下载并增量解析，非HTML内容（PDF、附件等）直接拒绝，超过 max_bytes 的部分截断
         
         参数:
             url: 要获取的网页URL
             headers: 自定义请求头
             
         返回:
-            tuple: (网页内容, 响应头, 最终使用的请求头)
+            tuple: (解析后的 ParsedDocument, 响应头, 最终使用的请求头)
         """
         self.log(f"开始获取网页内容: URL={url}", 'INFO')
         
@@ -81,25 +83,57 @@ class WebSniffer:
             if headers:
                 final_headers.update(headers)
             
-            response = self.session.get(url, headers=final_headers, timeout=10)
+            response = self.http.open_stream(url, headers=final_headers, timeout=10, source='sniffer')
             response.raise_for_status()  # 抛出HTTP错误
             
+            document = ParsedDocument.from_chunks(
+                self.http.iter_content(response, source='sniffer', max_bytes=self.max_bytes),
+                encoding=self.http.get_declared_encoding(response)
+            )
+            
             self.log(f"网页内容获取成功: URL={url}, 状态码={response.status_code}", 'INFO')
             
-            # 返回网页内容、响应头和最终使用的请求头
-            return response.text, dict(response.headers), final_headers
+            # 返回解析后的文档、响应头和最终使用的请求头
+            return document, dict(response.headers), final_headers
         
         except requests.RequestException as e:
             self.log(f"网页内容获取失败: URL={url}, 错误: {str(e)}", 'ERROR')
             return None, None, None
     
+    def get_document(self, html_content):
+        """
+        将HTML字符串转换为解析后的文档，已是 ParsedDocument 时原样返回
+        """
+        if isinstance(html_content, ParsedDocument):
+            return html_content
+        return ParsedDocument.from_html(html_content)
+    
+    def get_text_lengths(self, document):
+        """
+        一次自底向上遍历，计算每个元素去除首尾空白后的文本总长度（不含脚本和样式）
+        
+        返回:
+            dict: 元素 -> 文本长度
+        """
+        lengths = {}
+        for element in reversed(document.elements()):
+            length = 0
+            if isinstance(element.tag, str) and element.tag not in ('script', 'style') and element.text:
+                length += len(element.text.strip())
+            for child in element:
+                length += lengths.get(child, 0)
+                if child.tail:
+                    length += len(child.tail.strip())
+            lengths[element] = length if isinstance(element.tag, str) and element.tag not in ('script', 'style') else 0
+        return lengths
+    
     def extract_xpath(self, html_content, element_type='title'):
         """
         从HTML内容中提取指定类型元素的XPath
         
         参数:
-            html_content: HTML内容
-            element_type: 元素类型 ('title' 或 'content')
+            html_content: HTML内容或已解析的 ParsedDocument（同一页面提取多种元素时应复用同一文档）
+            element_type: 元素类型 ('title'、'content' 或 'image')
             
         返回:
             str: 提取的XPath
@@ -107,42 +141,34 @@ class WebSniffer:
         self.log(f"开始提取XPath: 元素类型={element_type}", 'DEBUG')
         
         try:
-            soup = BeautifulSoup(html_content, 'html.parser')
-            tree = etree.HTML(html_content)
+            document = self.get_document(html_content)
+            if document.root is None:
+                self.log(f"网页内容为空，无法提取XPath", 'WARNING')
+                return None
+            root = document.root
             
             if element_type == 'title':
-                # 首先尝试获取<title>标签
-                title_tag = soup.find('title')
-                if title_tag:
-                    self.log(f"找到<title>标签", 'DEBUG')
-                    return self.get_element_xpath(tree, title_tag)
-                
-                # 如果没有<title>标签，尝试查找h1标签
-                h1_tags = soup.find_all('h1')
-                if h1_tags:
-                    self.log(f"找到{len(h1_tags)}个<h1>标签，使用第一个", 'DEBUG')
-                    return self.get_element_xpath(tree, h1_tags[0])
-                
-                # 尝试查找h2标签
-                h2_tags = soup.find_all('h2')
-                if h2_tags:
-                    self.log(f"找到{len(h2_tags)}个<h2>标签，使用第一个", 'DEBUG')
-                    return self.get_element_xpath(tree, h2_tags[0])
+                # 首先尝试获取<title>标签，其次依次尝试h1、h2标签
+                for tag_name in ('title', 'h1', 'h2'):
+                    element = next(root.iter(tag_name), None)
+                    if element is not None:
+                        self.log(f"找到<{tag_name}>标签", 'DEBUG')
+                        return self.get_element_xpath(document, element)
                 
                 self.log(f"未找到合适的标题元素", 'WARNING')
                 return None
             
             elif element_type == 'content':
                 # 查找可能包含正文内容的元素
+                lengths = self.get_text_lengths(document)
                 content_candidates = []
                 
                 # 尝试查找常见的内容容器标签
                 common_content_tags = ['div', 'article', 'main', 'section']
                 for tag_name in common_content_tags:
-                    elements = soup.find_all(tag_name)
-                    for element in elements:
+                    for element in root.iter(tag_name):
                         # 计算元素的文本长度，选择最长的作为正文
-                        text_length = len(element.get_text(separator='', strip=True))
+                        text_length = lengths.get(element, 0)
                         if text_length > 100:  # 过滤掉过短的内容
                             content_candidates.append((text_length, element))
                 
@@ -152,24 +178,24 @@ class WebSniffer:
                 if content_candidates:
                     longest_content = content_candidates[0][1]
                     self.log(f"找到最长正文内容，长度={content_candidates[0][0]}字符", 'DEBUG')
-                    return self.get_element_xpath(tree, longest_content)
+                    return self.get_element_xpath(document, longest_content)
                 
                 self.log(f"未找到合适的正文内容元素", 'WARNING')
                 return None
             
             elif element_type == 'image':
                 # 查找所有图片标签
-                img_tags = soup.find_all('img')
+                img_tags = list(root.iter('img'))
                 if img_tags:
                     # 尝试选择第一个有src属性且alt属性不为空的图片
                     for img_tag in img_tags:
                         if img_tag.get('src') and img_tag.get('alt'):
                             self.log(f"找到图片标签，src={img_tag.get('src')}", 'DEBUG')
-                            return self.get_element_xpath(tree, img_tag)
+                            return self.get_element_xpath(document, img_tag)
                     
                     # 如果没有找到有alt属性的图片，选择第一个有src属性的图片
                     self.log(f"找到{len(img_tags)}个图片标签，使用第一个", 'DEBUG')
-                    return self.get_element_xpath(tree, img_tags[0])
+                    return self.get_element_xpath(document, img_tags[0])
                 
                 self.log(f"未找到图片元素", 'WARNING')
                 return None
@@ -178,56 +204,39 @@ class WebSniffer:
             self.log(f"提取XPath失败: 元素类型={element_type}, 错误: {str(e)}", 'ERROR')
             return None
     
-    def get_element_xpath(self, tree, element):
+    def get_element_xpath(self, document, element):
         """
         获取元素的XPath
         
+        优先使用在文档中唯一的id或class定位；否则使用绝对位置路径（如 /html/body/div[2]/h1），
+        保证生成的XPath唯一且稳定。路径表和属性计数按文档只建立一次
+        
         参数:
-            tree: lxml树对象
-            element: BeautifulSoup元素对象
+            document: ParsedDocument 对象
+            element: lxml元素
             
         返回:
             str: 元素的XPath
         """
         try:
-            # 获取元素的标签名和属性
-            tag_name = element.name
-            attributes = element.attrs
-            
-            # 使用lxml查找该元素的XPath
-            if attributes:
-                # 如果有id属性，使用id定位
-                if 'id' in attributes:
-                    xpath = f"//{tag_name}[@id='{attributes['id']}']"
-                    return xpath
-                
-                # 如果有class属性，使用class定位
-                if 'class' in attributes:
-                    class_name = ' '.join(attributes['class'])
-                    xpath = f"//{tag_name}[@class='{class_name}']"
-                    return xpath
-            
-            # 如果没有属性，使用标签名和位置定位
-            elements = tree.xpath(f"//{tag_name}")
-            index = None
-            
-            for i, el in enumerate(elements):
-                # 比较文本内容
-                if el.text == element.text:
-                    index = i
-                    break
-            
-            if index is not None:
-                xpath = f"//{tag_name}[{index + 1}]"
-                return xpath
-            
-            # 如果还是找不到，返回简单的XPath
-            self.log(f"无法精确定位元素，返回简单XPath", 'WARNING')
-            return f"//{tag_name}"
+            tag_name = element.tag
+            
+            # 如果有唯一的id属性，使用id定位
+            element_id = element.get('id')
+            if element_id and "'" not in element_id and document.attribute_count(tag_name, 'id', element_id) == 1:
+                return f"//{tag_name}[@id='{element_id}']"
+            
+            # 如果有唯一的class属性，使用class定位
+            class_name = element.get('class')
+            if class_name and "'" not in class_name and document.attribute_count(tag_name, 'class', class_name) == 1:
+                return f"//{tag_name}[@class='{class_name}']"
+            
+            # 否则使用绝对位置路径
+            return document.element_path(element)
             
         except Exception as e:
             self.log(f"获取元素XPath失败: 错误: {str(e)}", 'ERROR')
-            return f"//{element.name}"
+            return document.element_path(element)
     
     def analyze_page(self, url, headers=None):
         """
@@ -244,18 +253,19 @@ class WebSniffer:
         
         try:
             # 获取网页内容
-            html_content, response_headers, final_headers = self.fetch_page(url, headers)
-            if not html_content:
+            # 页面在下载时即已解析，标题、正文、图片共享同一文档
+            document, response_headers, final_headers = self.fetch_page(url, headers)
+            if document is None or document.root is None:
                 return None
             
             # 提取标题XPath
-            title_xpath = self.extract_xpath(html_content, 'title')
+            title_xpath = self.extract_xpath(document, 'title')
             
             # 提取正文内容XPath
-            content_xpath = self.extract_xpath(html_content, 'content')
+            content_xpath = self.extract_xpath(document, 'content')
             
             # 提取图片XPath
-            image_xpath = self.extract_xpath(html_content, 'image')
+            image_xpath = self.extract_xpath(document, 'image')
             
             # 转换请求头为JSON字符串
             headers_json = json.dumps(final_headers, ensure_ascii=False, indent=2)
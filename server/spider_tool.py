@@ -1,18 +1,37 @@
-import requests
-from bs4 import BeautifulSoup
 import lxml.etree as ET
-import re
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from urllib.parse import urlparse
 
+# 添加项目根目录到Python路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from server.http_client import get_http_client, DEFAULT_MAX_BYTES
+from server.html_document import ParsedDocument
+from server.page_archive import get_page_archive
+
+# 批量嗅探默认配置
+BATCH_MAX_WORKERS = 8
+BATCH_PER_DOMAIN = 2
+
 class SpiderTool:
     """
     爬虫工具类，用于网页内容爬取和XPath提取
     """
     
-    def __init__(self):
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Args:
+            max_bytes (int): 单个页面最多读取的字节数，超出部分截断不解析
+        """
+        self.max_bytes = max_bytes
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
+        self.http = get_http_client()
+        self.archive = get_page_archive()
     
     def get_domain(self, url):
         """
@@ -24,39 +43,65 @@ class SpiderTool:
     def fetch_page(self, url):
         """
         获取网页内容和响应信息
+        以流式方式下载并增量解析，非HTML内容（PDF、附件等）直接拒绝，超过 max_bytes 的部分截断
+        
+        Returns:
+            dict: {'content': 解析后的 ParsedDocument, 'headers': 响应头}，失败时返回 None
         """
         try:
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = self.http.open_stream(url, headers=self.headers, timeout=10, source='spider_tool')
             response.raise_for_status()
-            response.encoding = response.apparent_encoding
+            # 边下载边解析，同时把原始字节写入存档（供规则健康检查离线回放），不额外保留整页副本
+            encoding = self.http.get_declared_encoding(response)
+            chunks = self.http.iter_content(response, source='spider_tool', max_bytes=self.max_bytes)
+            document = ParsedDocument.from_chunks(self.archive.save_chunks(url, chunks, encoding), encoding=encoding)
             return {
-                'content': response.text,
+                'content': document,
                 'headers': dict(response.headers)
             }
         except Exception as e:
             print(f"爬取网页失败: {url} - 错误: {str(e)}")
             return None
     
-    def extract_title_xpath(self, html_content, target_title):
+    def get_document(self, document):
+        """
+        将HTML字符串转换为解析后的文档，已是 ParsedDocument 时原样返回
+        """
+        if isinstance(document, ParsedDocument):
+            return document
+        return ParsedDocument.from_html(document)
+    
+    def get_html_tree(self, html_content):
+        """
+        获取HTML的lxml树
+        """
+        return self.get_document(html_content).root
+    
+    def extract_title_xpath(self, document, target_title):
         """
         提取标题的XPath
         使用改进的标题分析逻辑，基于标签优先级、位置和内容特征
+        
+        Args:
+            document: ParsedDocument 或 HTML字符串
+            target_title (str): 目标标题
         """
         try:
-            soup = BeautifulSoup(html_content, 'html.parser')
-            tree = ET.HTML(html_content)
+            document = self.get_document(document)
+            if document.root is None:
+                return None
             
             # 1. 基于target_title的精确匹配
             title_elements = []
-            for element in soup.find_all(text=re.compile(re.escape(target_title))):
-                if target_title in element:
-                    title_elements.append(element.parent)
+            for text, owner in document.text_nodes():
+                if target_title in text and owner not in title_elements:
+                    title_elements.append(owner)
             
             if not title_elements:
                 # 2. 尝试部分匹配（如果精确匹配失败）
-                for element in soup.find_all(text=True):
-                    if target_title[:20] in element and len(element.strip()) < 200:
-                        title_elements.append(element.parent)
+                for text, owner in document.text_nodes():
+                    if target_title[:20] in text and len(text.strip()) < 200 and owner not in title_elements:
+                        title_elements.append(owner)
             
             if not title_elements:
                 return None
@@ -68,9 +113,9 @@ class SpiderTool:
             prioritized_elements = []
             for tag in title_tag_priority:
                 for element in title_elements:
-                    if element.name == tag:
+                    if element.tag == tag:
                         # 计算元素在页面中的位置（越靠前越优先）
-                        position = len(str(element.previous))
+                        position = document.document_order(element)
                         prioritized_elements.append((element, position))
             
             if prioritized_elements:
@@ -80,246 +125,308 @@ class SpiderTool:
             else:
                 # 如果没有优先级标签，选择文本长度最接近标题的
                 title_len = len(target_title)
-                best_element = min(title_elements, 
-                                  key=lambda x: abs(len(x.get_text().strip()) - title_len))
+                best_element = min(title_elements,
+                                  key=lambda x: abs(len(x.xpath('string()').strip()) - title_len))
             
-            # 转换为lxml元素
-            element_text = best_element.get_text().strip()
-            if len(element_text) > 0:
-                # 使用contains进行匹配，避免特殊字符问题
-                lxml_elements = tree.xpath(f"//{best_element.name}[contains(text(), '{element_text[:30]}')]")
-                if lxml_elements:
-                    return self.get_element_xpath(lxml_elements[0])
-            
-            return None
+            return self.get_element_xpath(document, best_element)
             
         except Exception as e:
             print(f"提取标题XPath失败 - 错误: {str(e)}")
             return None
     
-    def get_element_xpath(self, element):
+    def get_element_xpath(self, document, element):
         """
-        获取元素的XPath
+        获取元素的XPath（绝对位置路径，如 /html/body/div[2]/h1），与 WebSniffer 共用 ParsedDocument.element_path
         """
-        path = []
-        current = element
-        
-        while current is not None:
-            if current.tag == 'html':
-                path.append('html')
-                break
-            
-            siblings = current.getparent().findall(current.tag)
-            if len(siblings) == 1:
-                path.append(current.tag)
-            else:
-                index = siblings.index(current) + 1
-                path.append(f"{current.tag}[{index}]")
-            
-            current = current.getparent()
-        
-        return '/' + '/'.join(reversed(path))
+        return document.element_path(element)
     
-    def sniff_rules(self, url, target_title):
+    def sniff_rules(self, url, target_title, progress=None):
         """
         嗅探网页规则
+        
+        Args:
+            url (str): 网页URL
+            target_title (str): 目标标题
+            progress (callable, optional): 进度回调 progress(stage, percent)，
+                在每个阶段开始前调用，回调抛出的异常（如任务取消）会中止嗅探
         """
+        report = progress or (lambda stage, percent: None)
+        
+        report('fetching', 10)
         page_data = self.fetch_page(url)
         if not page_data:
             return None
         
-        html_content = page_data['content']
-        response_headers = page_data['headers']
+        result = self.extract_rules(url, page_data['content'], target_title, progress=report)
+        
+        # 添加request headers信息
+        if page_data['headers']:
+            result['request_headers'] = self.headers
+        
+        return result
+    
+    def sniff_rules_batch(self, items, max_workers=BATCH_MAX_WORKERS, per_domain=BATCH_PER_DOMAIN,
+                          on_result=None, progress=None):
+        """
+        批量并发嗅探，同一域名同时进行的嗅探数不超过 per_domain
+        
+        Args:
+            items (list): 待嗅探项列表，每项为 {'source_url': ..., 'target_title': ...}
+            max_workers (int): 最大并发数
+            per_domain (int): 每个域名的最大并发数
+            on_result (callable, optional): 每完成一项调用 on_result(item, rules)，嗅探失败时 rules 为 None
+            progress (callable, optional): 进度回调 progress(stage, percent, message)，
+                回调抛出的异常（如任务取消）会中止剩余嗅探
+        
+        Returns:
+            list: 成功嗅探的规则列表
+        """
+        report = progress or (lambda stage, percent, message='': None)
+        if not items:
+            return []
+        
+        # 按域名轮流排列，避免所有工作线程都在等待同一个域名
+        by_domain = {}
+        for item in items:
+            by_domain.setdefault(self.get_domain(item['source_url']), []).append(item)
+        queues = list(by_domain.values())
+        ordered = []
+        while queues:
+            ordered += [queue.pop(0) for queue in queues]
+            queues = [queue for queue in queues if queue]
+        
+        domain_slots = {domain: threading.BoundedSemaphore(per_domain) for domain in by_domain}
+        
+        def sniff(item):
+            with domain_slots[self.get_domain(item['source_url'])]:
+                return self.sniff_rules(item['source_url'], item['target_title'])
+        
+        results = []
+        executor = ThreadPoolExecutor(max_workers=min(max_workers, len(ordered)), thread_name_prefix='sniff')
+        try:
+            futures = {executor.submit(sniff, item): item for item in ordered}
+            done = 0
+            for future in as_completed(futures):
+                try:
+                    rules = future.result()
+                except Exception as e:
+                    print(f"批量嗅探失败: {futures[future]['source_url']} - 错误: {str(e)}")
+                    rules = None
+                if rules:
+                    results.append(rules)
+                if on_result:
+                    on_result(futures[future], rules)
+                done += 1
+                report('sniffing', int(done * 100 / len(ordered)), f"{done}/{len(ordered)}")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        return results
+    
+    def extract_rules(self, url, html_content, target_title, progress=None):
+        """
+        从已获取的网页内容中提取标题、内容和图片的XPath
+        页面只解析一次，所有提取器共享同一个文档
+        
+        Args:
+            url (str): 网页URL
+            html_content: HTML字符串或 ParsedDocument
+            target_title (str): 目标标题
+            progress (callable, optional): 进度回调 progress(stage, percent)
+        
+        Returns:
+            dict: 包含source_url、domain和各XPath的规则
+        """
+        report = progress or (lambda stage, percent: None)
+        
+        report('parsing', 30)
+        document = self.get_document(html_content)
         
         domain = self.get_domain(url)
-        title_xpath = self.extract_title_xpath(html_content, target_title)
+        report('title', 40)
+        title_xpath = self.extract_title_xpath(document, target_title)
         
         # 这里可以添加更多XPath提取逻辑，如内容、图片等
-        content_xpath = self.extract_content_xpath(html_content, title_xpath)
-        image_xpath = self.extract_image_xpath(html_content)
+        report('content', 60)
+        content_xpath = self.extract_content_xpath(document, title_xpath)
+        report('image', 85)
+        image_xpath = self.extract_image_xpath(document)
         
         # 准备要返回的数据
-        result = {
+        return {
             'source_url': url,
             'domain': domain,
             'title_xpath': title_xpath,
             'content_xpath': content_xpath,
             'image_xpath': image_xpath
         }
-        
-        # 添加request headers信息
-        if response_headers:
-            result['request_headers'] = self.headers
-        
-        return result
     
-    def extract_content_xpath(self, html_content, title_xpath=None):
+    def extract_content_xpath(self, document, title_xpath=None):
         """
         提取内容的XPath
         使用改进的内容分析逻辑，基于文本密度、标签结构和页面布局
+        
+        Args:
+            document: ParsedDocument 或 HTML字符串
+            title_xpath (str, optional): 已提取的标题XPath，用于优先选择标题附近的内容
         """
         try:
-            soup = BeautifulSoup(html_content, 'html.parser')
-            tree = ET.HTML(html_content)
+            document = self.get_document(document)
+            root = document.root
+            if root is None:
+                return None
             
-            # 1. 排除非内容区域的标签和类名
+            # 1. 排除非内容区域的标签和类名（共享文档不可修改，因此标记排除而不是删除节点）
             exclude_tags = ['header', 'nav', 'aside', 'footer', 'script', 'style', 'iframe']
             exclude_classes = ['header', 'nav', 'aside', 'footer', 'sidebar', 'advertisement', 'ad', 'comment', 'related', 'share', 'social']
             
-            # 移除排除的标签
-            for tag in exclude_tags:
-                for element in soup.find_all(tag):
-                    element.decompose()
+            nodes = document.elements()
+            count = len(nodes)
+            parents = [document.document_order(node.getparent()) if node.getparent() is not None else -1 for node in nodes]
+            
+            # 先序遍历：父节点先于子节点，被排除节点的整棵子树都被排除
+            excluded = [False] * count
+            for i, node in enumerate(nodes):
+                if parents[i] >= 0 and excluded[parents[i]]:
+                    excluded[i] = True
+                elif not isinstance(node.tag, str) or node.tag in exclude_tags:
+                    excluded[i] = True
+                else:
+                    class_name = (node.get('class') or '').lower()
+                    if class_name and any(cls in class_name for cls in exclude_classes):
+                        excluded[i] = True
             
-            # 移除带有排除类的元素
-            for element in soup.find_all(class_=lambda x: x and any(cls in x.lower() for cls in exclude_classes)):
-                element.decompose()
+            # 2. 自底向上一次遍历，累计每个节点的文本长度、链接文本长度、段落数和HTML长度
+            #    逆先序遍历保证处理父节点时所有子节点都已累计完成
+            text_lengths = [0] * count
+            link_lengths = [0] * count
+            p_counts = [0] * count
+            html_lengths = [0] * count
+            for i in range(count - 1, -1, -1):
+                node = nodes[i]
+                parent = parents[i]
+                # 文本片段去除首尾空白后计长，避免缩进空白抬高外层容器的得分
+                tail_length = len(node.tail.strip()) if node.tail else 0
+                
+                if excluded[i]:
+                    # 被排除节点的tail文本仍属于父节点
+                    if parent >= 0 and not excluded[parent]:
+                        text_lengths[parent] += tail_length
+                        html_lengths[parent] += tail_length
+                    continue
+                
+                tag = node.tag
+                own_length = len(node.text.strip()) if node.text else 0
+                text_lengths[i] += own_length
+                html_lengths[i] += own_length + 2 * len(tag) + 5 + sum(len(k) + len(v) + 4 for k, v in node.attrib.items())
+                if tag == 'a':
+                    link_lengths[i] = text_lengths[i]
+                elif tag == 'p':
+                    p_counts[i] += 1
+                
+                if parent >= 0:
+                    text_lengths[parent] += text_lengths[i] + tail_length
+                    link_lengths[parent] += link_lengths[i]
+                    p_counts[parent] += p_counts[i]
+                    html_lengths[parent] += html_lengths[i] + tail_length
             
-            # 2. 识别潜在的内容容器
+            # 3. 识别潜在的内容容器并评分
             content_candidates = []
             content_tags = ['article', 'main', 'section', 'div', 'p']
+            tag_candidates = {tag: [] for tag in content_tags}
+            
+            for i, node in enumerate(nodes):
+                if excluded[i] or node.tag not in tag_candidates:
+                    continue
+                
+                text_length = text_lengths[i]
+                if text_length < 300:  # 内容太短，可能不是主要内容
+                    continue
+                
+                # 计算文本密度（文本长度 / 总HTML长度）
+                html_length = html_lengths[i]
+                text_density = text_length / html_length if html_length > 0 else 0
+                
+                # 计算段落数量（不含节点自身）
+                p_count = p_counts[i] - (1 if node.tag == 'p' else 0)
+                
+                # 计算链接密度（链接文本长度 / 总文本长度）
+                link_density = link_lengths[i] / text_length if text_length > 0 else 0
+                
+                # 内容评分：综合考虑文本长度、文本密度、段落数量和链接密度
+                # 链接密度越低越好（避免导航菜单）
+                score = (text_length * 0.4) + (text_density * 1000 * 0.3) + (p_count * 10 * 0.2) - (link_density * 1000 * 0.1)
+                
+                tag_candidates[node.tag].append((node, score, text_length, p_count, text_density, link_density))
             
             for tag in content_tags:
-                for element in soup.find_all(tag):
-                    # 获取元素文本
-                    text = element.get_text().strip()
-                    text_length = len(text)
-                    
-                    if text_length < 300:  # 内容太短，可能不是主要内容
-                        continue
-                    
-                    # 计算文本密度（文本长度 / 总HTML长度）
-                    html_length = len(str(element))
-                    text_density = text_length / html_length if html_length > 0 else 0
-                    
-                    # 计算段落数量
-                    p_count = len(element.find_all('p'))
-                    
-                    # 计算链接密度（链接文本长度 / 总文本长度）
-                    link_text = ''.join([a.get_text() for a in element.find_all('a')])
-                    link_density = len(link_text) / text_length if text_length > 0 else 0
-                    
-                    # 内容评分：综合考虑文本长度、文本密度、段落数量和链接密度
-                    # 链接密度越低越好（避免导航菜单）
-                    score = (text_length * 0.4) + (text_density * 1000 * 0.3) + (p_count * 10 * 0.2) - (link_density * 1000 * 0.1)
-                    
-                    content_candidates.append((element, score, text_length, p_count, text_density, link_density))
+                content_candidates.extend(tag_candidates[tag])
             
             if not content_candidates:
                 return None
             
-            # 3. 排序候选内容，选择分数最高的
+            # 4. 排序候选内容，选择分数最高的
             content_candidates.sort(key=lambda x: x[1], reverse=True)
             best_candidate = content_candidates[0][0]
             
-            # 4. 如果找到标题XPath，尝试找到标题附近的内容
+            # 5. 如果找到标题XPath，尝试找到标题附近的内容
             if title_xpath and len(content_candidates) > 1:
-                # 将XPath转换为BeautifulSoup元素
-                title_tag = None
                 try:
-                    title_elements = tree.xpath(title_xpath)
-                    if title_elements:
-                        # 尝试找到对应的BeautifulSoup元素
-                        title_text = title_elements[0].xpath('string()').strip()
-                        title_tag = soup.find(text=title_text)
-                        if title_tag:
-                            title_tag = title_tag.parent
-                except:
-                    pass
-                
-                if title_tag:
-                    try:
-                        # 查找标题后面的内容容器
-                        all_descendants = list(soup.descendants)
-                        if title_tag in all_descendants:
-                            title_index = all_descendants.index(title_tag)
-                            
-                            # 查找标题附近的候选内容
-                            nearby_candidates = []
-                            for candidate, score, text_len, p_count, text_density, link_density in content_candidates:
-                                if candidate in all_descendants:
-                                    candidate_index = all_descendants.index(candidate)
-                                    # 只考虑标题后面且距离不太远的内容
-                                    if candidate_index > title_index:
-                                        distance = candidate_index - title_index
-                                        if distance < 100:
-                                            nearby_candidates.append((candidate, score, text_len, p_count, distance))
-                            
-                            if nearby_candidates:
-                                # 选择附近分数最高的，但只有当它的分数与最高分相差不超过20%时才使用
-                                highest_score = content_candidates[0][1]
-                                nearby_candidates.sort(key=lambda x: x[1], reverse=True)
-                                
-                                # 只有当附近元素的分数接近最高分（不低于80%）时才替换
-                                if nearby_candidates[0][1] >= highest_score * 0.8:
-                                    best_candidate = nearby_candidates[0][0]
-                    except:
-                        pass
-            
-            # 转换为lxml元素
-            element_text = best_candidate.get_text().strip()
-            
-            if len(element_text) > 0:
-                # 使用标签和部分文本内容进行匹配
-                tag = best_candidate.name
-                
-                # 清理样本文本，移除换行符和特殊字符，只保留普通文本
-                sample_text = element_text[:50]
-                sample_text = sample_text.replace('\n', ' ').replace('\r', ' ').replace('\t', ' ')
-                # 移除多余的空格
-                sample_text = ' '.join(sample_text.split())
+                    title_elements = root.xpath(title_xpath)
+                except ET.XPathError:
+                    title_elements = []
                 
-                # 使用更可靠的XPath匹配方法
-                # 1. 首先尝试使用完整的文本内容匹配
-                try:
-                    # 使用normalize-space来处理空白字符
-                    xpath_query = f"//{tag}[normalize-space() = normalize-space('{sample_text}')]"
-                    lxml_elements = tree.xpath(xpath_query)
+                if title_elements:
+                    title_index = document.document_order(title_elements[0])
                     
-                    if lxml_elements:
-                        # 如果有多个匹配，选择文本长度最接近的
-                        best_lxml_element = min(lxml_elements,
-                                               key=lambda x: abs(len(x.xpath('string()').strip()) - len(element_text)))
-                        return self.get_element_xpath(best_lxml_element)
-                except:
-                    pass
-                
-                # 2. 如果完整匹配失败，尝试使用contains匹配
-                try:
-                    xpath_query = f"//{tag}[contains(normalize-space(), normalize-space('{sample_text}'))]"
-                    lxml_elements = tree.xpath(xpath_query)
+                    # 查找标题附近的候选内容
+                    nearby_candidates = []
+                    for candidate, score, text_len, p_count, text_density, link_density in content_candidates:
+                        candidate_index = document.document_order(candidate)
+                        # 只考虑标题后面且距离不太远的内容
+                        if candidate_index > title_index:
+                            distance = candidate_index - title_index
+                            if distance < 100:
+                                nearby_candidates.append((candidate, score, text_len, p_count, distance))
                     
-                    if lxml_elements:
-                        # 如果有多个匹配，选择文本长度最接近的
-                        best_lxml_element = min(lxml_elements,
-                                               key=lambda x: abs(len(x.xpath('string()').strip()) - len(element_text)))
-                        return self.get_element_xpath(best_lxml_element)
-                except:
-                    pass
+                    if nearby_candidates:
+                        # 选择附近分数最高的，但只有当它的分数与最高分相差不超过20%时才使用
+                        highest_score = content_candidates[0][1]
+                        nearby_candidates.sort(key=lambda x: x[1], reverse=True)
+                        
+                        # 只有当附近元素的分数接近最高分（不低于80%）时才替换
+                        if nearby_candidates[0][1] >= highest_score * 0.8:
+                            best_candidate = nearby_candidates[0][0]
             
-            return None
+            return self.get_element_xpath(document, best_candidate)
             
         except Exception as e:
             print(f"提取内容XPath失败 - 错误: {str(e)}")
             return None
     
-    def extract_image_xpath(self, html_content):
+    def extract_image_xpath(self, document):
         """
         提取图片的XPath模式
+        
+        Args:
+            document: ParsedDocument 或 HTML字符串
         """
         try:
-            soup = BeautifulSoup(html_content, 'html.parser')
+            document = self.get_document(document)
+            if document.root is None:
+                return None
             
             # 找到所有图片元素
-            images = soup.find_all('img')
+            images = list(document.root.iter('img'))
             if not images:
                 return None
             
             # 分析图片的父容器模式
             parent_patterns = {}
             for img in images:
-                if img.parent:
-                    parent_tag = img.parent.name
+                parent = img.getparent()
+                if parent is not None:
+                    parent_tag = parent.tag
                     parent_patterns[parent_tag] = parent_patterns.get(parent_tag, 0) + 1
             
             # 找到最常见的父容器
@@ -330,4 +437,4 @@ class SpiderTool:
             return "//img"
         except Exception as e:
             print(f"提取图片XPath失败 - 错误: {str(e)}")
-            return None
\ No newline at end of file
+            return None
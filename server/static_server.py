@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+静态文件服务器
+启动时一次性读取 client 目录下的所有文件，计算 ETag 并预先生成 gzip / brotli 压缩版本，
+每个请求在独立线程中处理，不再逐个串行响应。
+
+- css / js 文件额外提供带内容指纹的文件名（如 js/app.3f2a9c1d.js），HTML中的引用改写为指纹文件名，
+  指纹文件长期缓存（内容变化时文件名随之变化）；
+- HTML 等其他文件使用 no-cache，浏览器每次用 If-None-Match / If-Modified-Since 验证，未变化时返回 304
+"""
+
+import email.utils
+import gzip
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+from datetime import datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+# 安装了 brotli（或 brotlicffi）时额外生成 br 压缩版本
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+
+# 默认配置
+COMPRESS_MIN_SIZE = 256                  # 小于该字节数的文件不压缩
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+FINGERPRINT_EXTENSIONS = ('.css', '.js')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+INDEX_FILE = 'index.html'
+
+# HTML 中引用本地资源的属性
+ASSET_REFERENCE = re.compile(r'(\s(?:src|href)=["\'])([^"\':?#]+)(["\'])', re.IGNORECASE)
+
+
+def log(message, level='INFO'):
+    """
+    日志记录函数
+    """
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    print(f"[{timestamp}] [STATIC] [{level}] {message}")
+
+
+class StaticAsset:
+    """
+    一个静态文件及其预压缩版本
+    """
+
+    def __init__(self, path, body, mtime, immutable=False):
+        self.path = path
+        self.content_type = self.guess_type(path)
+        self.last_modified = email.utils.formatdate(mtime, usegmt=True)
+        self.mtime = int(mtime)
+        self.immutable = immutable
+        self.digest = hashlib.sha1(body).hexdigest()
+        # 编码 -> (内容, ETag)，不同编码的表示使用不同的 ETag
+        self.variants = {'identity': (body, f'"{self.digest[:20]}"')}
+        if self.is_compressible(len(body)):
+            self.add_variant('gzip', gzip.compress(body, compresslevel=9, mtime=0))
+            if brotli is not None:
+                self.add_variant('br', brotli.compress(body))
+
+    @staticmethod
+    def guess_type(path):
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type in ('application/javascript', 'application/json'):
+            content_type += '; charset=utf-8'
+        return content_type
+
+    def is_compressible(self, size):
+        return size >= COMPRESS_MIN_SIZE and self.content_type.startswith(COMPRESSIBLE_TYPES)
+
+    def add_variant(self, encoding, compressed):
+        # 压缩后没有变小时不保留
+        if len(compressed) < len(self.variants['identity'][0]):
+            self.variants[encoding] = (compressed, f'"{self.digest[:20]}-{encoding}"')
+
+    @property
+    def cache_control(self):
+        return IMMUTABLE_CACHE_CONTROL if self.immutable else REVALIDATE_CACHE_CONTROL
+
+    def with_body(self, body, immutable, mtime=None):
+        """
+        以相同路径生成新内容的资源（HTML改写引用后使用），默认沿用原修改时间
+        """
+        return StaticAsset(self.path, body, self.mtime if mtime is None else mtime, immutable)
+
+    def select_variant(self, accept_encoding):
+        """
+        按 Accept-Encoding 选择表示（优先 br，其次 gzip）
+
+        Returns:
+            tuple: (编码, 内容, ETag)
+        """
+        accepted = parse_accept_encoding(accept_encoding)
+        for encoding in ('br', 'gzip'):
+            if encoding in self.variants and accepted.get(encoding, accepted.get('*', 0)) > 0:
+                return (encoding,) + self.variants[encoding]
+        return ('identity',) + self.variants['identity']
+
+
+def parse_accept_encoding(header):
+    """
+    解析 Accept-Encoding
+
+    Returns:
+        dict: 编码 -> q 值
+    """
+    accepted = {}
+    for item in (header or '').split(','):
+        name, _, params = item.strip().partition(';')
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    return accepted
+
+
+class StaticAssets:
+    """
+    目录下所有静态文件（启动时加载，之后只读，可在多个请求线程中共享）
+    """
+
+    def __init__(self, directory):
+        self.directory = os.path.abspath(directory)
+        self.assets = {}
+        self.fingerprinted = {}
+        self.load()
+
+    def load(self):
+        """
+        读取目录下的所有文件，生成指纹文件名并改写HTML中的引用
+        """
+        assets = {}
+        fingerprinted = {}
+        for root, _, files in os.walk(self.directory):
+            for filename in files:
+                file_path = os.path.join(root, filename)
+                url_path = '/' + os.path.relpath(file_path, self.directory).replace(os.sep, '/')
+                with open(file_path, 'rb') as f:
+                    body = f.read()
+                asset = StaticAsset(url_path, body, os.path.getmtime(file_path))
+                assets[url_path] = asset
+
+                if url_path.endswith(FINGERPRINT_EXTENSIONS):
+                    base, ext = posixpath.splitext(url_path)
+                    fingerprinted[url_path] = f"{base}.{asset.digest[:8]}{ext}"
+
+        for original, fingerprint_path in fingerprinted.items():
+            assets[fingerprint_path] = assets[original].with_body(assets[original].variants['identity'][0], True)
+
+        for url_path, asset in list(assets.items()):
+            if url_path.endswith(('.html', '.htm')):
+                body = asset.variants['identity'][0].decode('utf-8')
+                rewritten, referenced = self.rewrite_references(url_path, body, fingerprinted)
+                if rewritten != body:
+                    # 改写后的页面随所引用的 css / js 一起变化，修改时间取其中最晚的，
+                    # 只用 If-Modified-Since 验证的浏览器不会保留指向旧指纹文件名的页面
+                    mtime = max([asset.mtime] + [assets[path].mtime for path in referenced])
+                    assets[url_path] = asset.with_body(rewritten.encode('utf-8'), False, mtime)
+
+        self.assets = assets
+        self.fingerprinted = fingerprinted
+        total = sum(len(asset.variants['identity'][0]) for asset in assets.values())
+        compressed = sum(len(asset.variants) > 1 for asset in assets.values())
+        log(f"静态文件已加载: 目录={self.directory}, 文件={len(assets)}, 预压缩={compressed}, "
+            f"总大小={total / 1024:.1f}KB, brotli={'可用' if brotli is not None else '未安装'}", 'INFO')
+
+    @staticmethod
+    def rewrite_references(page_path, body, fingerprinted):
+        """
+        将HTML中对 css / js 的相对或绝对引用改写为指纹文件名（保持原来的相对写法）
+
+        Returns:
+            tuple: (改写后的HTML, 被引用的资源原路径集合)
+        """
+        page_dir = posixpath.dirname(page_path)
+        referenced = set()
+
+        def replace(match):
+            reference = match.group(2)
+            target = posixpath.normpath(reference if reference.startswith('/') else posixpath.join(page_dir, reference))
+            fingerprint_path = fingerprinted.get(target)
+            if fingerprint_path is None:
+                return match.group(0)
+            referenced.add(target)
+            new_reference = posixpath.join(posixpath.dirname(reference), posixpath.basename(fingerprint_path))
+            return match.group(1) + new_reference + match.group(3)
+
+        return ASSET_REFERENCE.sub(replace, body), referenced
+
+    def find(self, request_path):
+        """
+        根据请求路径查找资源，目录请求返回其中的 index.html
+
+        Returns:
+            StaticAsset: 找不到时返回 None
+        """
+        path = posixpath.normpath(unquote(urlsplit(request_path).path))
+        if not path.startswith('/'):
+            return None
+        asset = self.assets.get(path)
+        if asset is None:
+            asset = self.assets.get(posixpath.join(path, INDEX_FILE))
+        return asset
+
+
+class StaticRequestHandler(BaseHTTPRequestHandler):
+    """
+    静态文件请求处理（GET / HEAD）
+    """
+
+    server_version = 'WatchtowerStatic/1.0'
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.send_asset(include_body=True)
+
+    def do_HEAD(self):
+        self.send_asset(include_body=False)
+
+    def send_asset(self, include_body):
+        asset = self.server.assets.find(self.path)
+        if asset is None:
+            self.send_error(HTTPStatus.NOT_FOUND, 'File not found')
+            return
+
+        encoding, body, etag = asset.select_variant(self.headers.get('Accept-Encoding'))
+        if self.is_not_modified(asset, etag):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_common_headers(asset, etag)
+            self.end_headers()
+            return
+
+        self.send_response(HTTPStatus.OK)
+        self.send_common_headers(asset, etag)
+        self.send_header('Content-Type', asset.content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if encoding != 'identity':
+            self.send_header('Content-Encoding', encoding)
+        self.end_headers()
+        if include_body:
+            self.wfile.write(body)
+
+    def send_common_headers(self, asset, etag):
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', asset.last_modified)
+        self.send_header('Cache-Control', asset.cache_control)
+        if len(asset.variants) > 1:
+            self.send_header('Vary', 'Accept-Encoding')
+
+    def is_not_modified(self, asset, etag):
+        """
+        条件请求：If-None-Match 优先，其次 If-Modified-Since
+        """
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            candidates = [tag.strip() for tag in if_none_match.split(',')]
+            return '*' in candidates or any(tag.removeprefix('W/') == etag for tag in candidates)
+
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since:
+            try:
+                since = email.utils.parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            return since is not None and asset.mtime <= since.timestamp()
+        return False
+
+    def log_message(self, format, *args):
+        log(f"{self.address_string()} - {format % args}", 'DEBUG')
+
+
+class StaticHTTPServer(ThreadingHTTPServer):
+    """
+    多线程静态文件服务器，每个连接在独立线程中处理
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, server_address, directory):
+        """
+        Args:
+            server_address (tuple): (地址, 端口)
+            directory (str): 静态文件目录
+        """
+        self.assets = StaticAssets(directory)
+        super().__init__(server_address, StaticRequestHandler)
@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+多进程服务
+supervisor 启动 N 个 WebSocket 工作进程，通过 SO_REUSEPORT 共享同一端口，由内核在进程间分配连接，
+各搜索的HTML解析不再争用同一个GIL。工作进程共享 telescope.db（WAL模式），数据记录变更、
+搜索源启用/禁用和爬虫规则变化经 supervisor 转发给其他工作进程。
+同时执行的搜索数上限由 supervisor 统一发放名额（见 search_scheduler.SearchPermits），对所有工作进程生效。
+
+工作进程异常退出时自动重启（连续启动失败时重启间隔逐次加倍）；
+SIGHUP 滚动重启：先启动新进程，新进程就绪后旧进程平滑下线；SIGTERM / SIGINT 所有进程平滑下线后退出
+"""
+
+import asyncio
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from datetime import datetime
+from multiprocessing.connection import wait
+
+from . import parse_pool
+from .database import Database
+from .search_scheduler import MAX_CONCURRENT_SEARCHES
+from .websocket_server import WebSocketServer, DRAIN_TIMEOUT
+
+
+# 默认配置
+DEFAULT_WORKERS = os.cpu_count() or 1
+KILL_GRACE = 5            # 平滑下线超时后再等待的时间（秒），之后强制结束工作进程
+MIN_UPTIME = 10           # 运行时间短于该值（秒）的退出视为启动失败
+RESTART_DELAY = 1         # 工作进程异常退出后的重启间隔（秒）
+MAX_RESTART_DELAY = 30
+
+
+class WorkerChannel:
+    """
+    工作进程一侧的IPC通道：向 supervisor 发送通知（由其转发给其他工作进程），并分发收到的通知
+
+    publish 可在任意线程调用（爬虫规则变化发生在后台任务线程中），收到的通知在事件循环线程中处理
+    """
+
+    def __init__(self, conn, worker_id):
+        self.conn = conn
+        self.worker_id = worker_id
+        self.handlers = {}
+        self.lock = threading.Lock()
+        self.loop = None
+
+    def log(self, message, level='INFO'):
+        """
+        日志记录函数
+        """
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        print(f"[{timestamp}] [IPC] [{level}] {message}")
+
+    def on(self, kind, handler):
+        """
+        注册通知处理函数 handler(data)；'disconnected' 在与 supervisor 的连接断开时调用
+        """
+        self.handlers[kind] = handler
+
+    def publish(self, kind, data=None):
+        """
+        发送通知给其他工作进程
+        """
+        try:
+            with self.lock:
+                self.conn.send({'kind': kind, 'data': data, 'worker': self.worker_id})
+        except (OSError, ValueError) as e:
+            self.log(f"发送通知失败: 类型={kind} - 错误: {e}", 'WARNING')
+
+    def ready(self):
+        """
+        告知 supervisor 本进程已开始监听
+        """
+        self.publish('ready')
+
+    def attach(self, loop):
+        """
+        在事件循环中接收通知
+        """
+        self.loop = loop
+        loop.add_reader(self.conn.fileno(), self.receive)
+
+    def receive(self):
+        try:
+            message = self.conn.recv()
+        except (EOFError, OSError):
+            self.loop.remove_reader(self.conn.fileno())
+            self.log("与 supervisor 的连接已断开", 'WARNING')
+            message = {'kind': 'disconnected', 'data': None}
+
+        handler = self.handlers.get(message['kind'])
+        if handler is None:
+            return
+        try:
+            handler(message['data'])
+        except Exception as e:
+            self.log(f"处理通知失败: 类型={message['kind']} - 错误: {e}", 'ERROR')
+
+
+def run_worker(worker_id, host, port, conn, server_options, drain_timeout, parse_workers):
+    """
+    工作进程入口（在子进程中执行）
+    """
+    # Ctrl+C 会发给整个进程组，由 supervisor 统一安排平滑下线
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    parse_pool.configure(parse_workers)
+
+    server = WebSocketServer(host=host, port=port, reuse_port=True, **server_options)
+    channel = WorkerChannel(conn, worker_id)
+    server.attach_peers(channel)
+    asyncio.run(serve_worker(server, channel, drain_timeout))
+
+
+async def serve_worker(server, channel, drain_timeout):
+    loop = asyncio.get_running_loop()
+    # SIGTERM（supervisor 要求下线）或 supervisor 退出时平滑下线
+    loop.add_signal_handler(signal.SIGTERM, lambda: loop.create_task(server.drain(drain_timeout)))
+    channel.on('disconnected', lambda data: loop.create_task(server.drain(drain_timeout)))
+    await server.start_server()
+
+
+class WorkerProcess:
+    """
+    supervisor 一侧的工作进程
+
+    转发给该进程的通知由独立线程写入管道，工作进程暂时没有读取时不会阻塞 supervisor
+    """
+
+    def __init__(self, slot, worker_id, process, conn):
+        self.slot = slot
+        self.worker_id = worker_id
+        self.process = process
+        self.conn = conn
+        self.started_at = time.monotonic()
+        self.ready = False
+        self.draining = False
+        self.disconnected = False
+        self.kill_at = None
+        # 持有的和仍在申请的搜索执行名额
+        self.permits_held = 0
+        self.permits_wanted = 0
+        self.outbox = queue.Queue()
+        self.sender = threading.Thread(target=self.send_loop, name=f"ipc-sender-{worker_id}", daemon=True)
+        self.sender.start()
+
+    def send(self, message):
+        self.outbox.put(message)
+
+    def send_loop(self):
+        while True:
+            message = self.outbox.get()
+            if message is None:
+                return
+            try:
+                self.conn.send(message)
+            except (OSError, ValueError):
+                return
+
+    def drain(self, timeout):
+        """
+        要求工作进程平滑下线（SIGTERM），超过 timeout + KILL_GRACE 秒仍未退出时强制结束
+        """
+        if self.draining:
+            return
+        self.draining = True
+        self.kill_at = time.monotonic() + timeout + KILL_GRACE
+        if self.process.is_alive():
+            self.process.terminate()
+
+    def close(self):
+        self.outbox.put(None)
+        self.sender.join(timeout=1)
+        self.conn.close()
+
+
+class Supervisor:
+    """
+    WebSocket 工作进程管理器
+    """
+
+    def __init__(self, host='localhost', port=8000, workers=DEFAULT_WORKERS, drain_timeout=DRAIN_TIMEOUT,
+                 server_options=None):
+        """
+        Args:
+            host (str): 监听地址
+            port (int): 监听端口（所有工作进程共享）
+            workers (int): 工作进程数
+            drain_timeout (float): 工作进程平滑下线时等待后台任务结束的最长时间（秒）
+            server_options (dict, optional): 传给 WebSocketServer 的其他参数
+        """
+        self.host = host
+        self.port = port
+        self.worker_count = workers
+        self.drain_timeout = drain_timeout
+        self.server_options = server_options or {}
+        # 各工作进程的搜索结果解析进程池平分CPU核心
+        self.parse_workers = max(1, parse_pool.DEFAULT_PARSE_WORKERS // workers)
+        # 尚未发放的搜索执行名额（所有工作进程共用同一上限）
+        self.search_permits = self.server_options.get('max_concurrent_searches', MAX_CONCURRENT_SEARCHES)
+        # 使用 spawn 启动工作进程：子进程不继承 supervisor 的线程和锁
+        self.context = multiprocessing.get_context('spawn')
+        self.workers = []
+        self.next_worker_id = 1
+        self.restart_delays = {}
+        self.pending_restarts = {}
+        self.stopping = False
+        self.force_stop = False
+        self.reload_requested = False
+
+    def log(self, message, level='INFO'):
+        """
+        日志记录函数
+        """
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        print(f"[{timestamp}] [SUPERVISOR] [{level}] {message}")
+
+    def start_worker(self, slot):
+        parent_conn, child_conn = self.context.Pipe()
+        worker_id = self.next_worker_id
+        self.next_worker_id += 1
+        process = self.context.Process(
+            target=run_worker,
+            args=(worker_id, self.host, self.port, child_conn, self.server_options, self.drain_timeout,
+                  self.parse_workers),
+            name=f"ws-worker-{worker_id}"
+        )
+        process.start()
+        child_conn.close()
+        worker = WorkerProcess(slot, worker_id, process, parent_conn)
+        self.workers.append(worker)
+        self.log(f"工作进程已启动: 编号={worker_id}, 槽位={slot}, pid={process.pid}", 'INFO')
+        return worker
+
+    def request_stop(self, signum, frame):
+        # 第二次收到停止信号时不再等待平滑下线
+        if self.stopping:
+            self.force_stop = True
+        self.stopping = True
+
+    def request_reload(self, signum, frame):
+        self.reload_requested = True
+
+    def run(self):
+        """
+        启动所有工作进程并持续管理，直到收到停止信号且所有工作进程退出
+        """
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGINT, self.request_stop)
+        if hasattr(signal, 'SIGHUP'):
+            signal.signal(signal.SIGHUP, self.request_reload)
+
+        # 启动工作进程前完成数据库表结构检查和迁移（并切换为WAL模式），避免多个进程同时迁移
+        Database().close()
+        
+        self.log(f"启动 {self.worker_count} 个工作进程，共享地址: ws://{self.host}:{self.port}", 'INFO')
+        for slot in range(self.worker_count):
+            self.start_worker(slot)
+
+        stop_started = False
+        try:
+            while True:
+                if self.stopping and not stop_started:
+                    stop_started = True
+                    self.log(f"正在停止，所有工作进程平滑下线（最长 {self.drain_timeout}s）", 'INFO')
+                    self.pending_restarts.clear()
+                    for worker in self.workers:
+                        worker.drain(self.drain_timeout)
+                if self.force_stop:
+                    for worker in self.workers:
+                        worker.kill_at = 0
+                if stop_started and not self.workers:
+                    break
+                if self.reload_requested and not self.stopping:
+                    self.reload_requested = False
+                    self.rolling_restart()
+
+                self.check_timers()
+                self.poll(timeout=1)
+        finally:
+            for worker in self.workers:
+                if worker.process.is_alive():
+                    worker.process.kill()
+                worker.process.join()
+                worker.close()
+            self.log("所有工作进程已退出", 'INFO')
+
+    def poll(self, timeout):
+        """
+        等待工作进程的通知或退出事件并处理
+        """
+        by_conn = {worker.conn: worker for worker in self.workers if not worker.disconnected}
+        by_sentinel = {worker.process.sentinel: worker for worker in self.workers}
+        for ready in wait(list(by_conn) + list(by_sentinel), timeout):
+            if ready in by_conn:
+                worker = by_conn[ready]
+                try:
+                    message = worker.conn.recv()
+                except (EOFError, OSError):
+                    # 进程已退出，由 sentinel 处理
+                    worker.disconnected = True
+                    continue
+                self.handle_message(worker, message)
+            else:
+                self.handle_exit(by_sentinel[ready])
+
+    def handle_message(self, worker, message):
+        if message['kind'] == 'ready':
+            worker.ready = True
+            self.log(f"工作进程已就绪: 编号={worker.worker_id}, pid={worker.process.pid}", 'INFO')
+            # 滚动重启：新进程就绪后，同一槽位的旧进程平滑下线
+            for other in self.workers:
+                if other is not worker and other.slot == worker.slot and not other.draining:
+                    self.log(f"旧工作进程平滑下线: 编号={other.worker_id}, pid={other.process.pid}", 'INFO')
+                    other.drain(self.drain_timeout)
+            return
+
+        if message['kind'] == 'search_permit_request':
+            worker.permits_wanted += message['data']['count']
+            self.grant_search_permits()
+            return
+
+        if message['kind'] == 'search_permit_withdraw':
+            # 工作进程排队的搜索被取消，不再需要的名额不再发放（已在途的名额由其收到后归还）
+            worker.permits_wanted = max(0, worker.permits_wanted - message['data']['count'])
+            return
+
+        if message['kind'] == 'search_permit_release':
+            count = min(message['data']['count'], worker.permits_held)
+            worker.permits_held -= count
+            self.search_permits += count
+            self.grant_search_permits()
+            return
+
+        # 其他通知转发给其余工作进程（包括正在下线、仍有连接的进程）
+        for other in self.workers:
+            if other is not worker and not other.disconnected:
+                other.send(message)
+
+    def grant_search_permits(self):
+        """
+        发放空闲的搜索执行名额：每次发给仍在申请、持有名额最少的工作进程（持有数相同时先启动的优先）
+        """
+        while self.search_permits > 0:
+            candidates = [worker for worker in self.workers if worker.permits_wanted > 0 and not worker.disconnected]
+            if not candidates:
+                return
+            worker = min(candidates, key=lambda w: (w.permits_held, w.worker_id))
+            worker.permits_wanted -= 1
+            worker.permits_held += 1
+            self.search_permits -= 1
+            worker.send({'kind': 'search_permit_grant', 'data': {'count': 1}})
+
+    def handle_exit(self, worker):
+        worker.process.join()
+        worker.close()
+        self.workers.remove(worker)
+        # 收回退出进程持有的搜索执行名额
+        self.search_permits += worker.permits_held
+        worker.permits_held = worker.permits_wanted = 0
+        self.grant_search_permits()
+        uptime = time.monotonic() - worker.started_at
+        exitcode = worker.process.exitcode
+        if worker.draining or self.stopping:
+            self.log(f"工作进程已下线: 编号={worker.worker_id}, 退出码={exitcode}", 'INFO')
+            return
+
+        # 槽位上已有其他工作进程（滚动重启中新进程启动失败）时由旧进程继续服务
+        if any(other.slot == worker.slot and not other.draining for other in self.workers):
+            self.log(f"工作进程启动失败: 编号={worker.worker_id}, 退出码={exitcode}，槽位{worker.slot}保留原进程", 'ERROR')
+            return
+
+        if uptime < MIN_UPTIME:
+            delay = min(self.restart_delays.get(worker.slot, RESTART_DELAY / 2) * 2, MAX_RESTART_DELAY)
+        else:
+            delay = RESTART_DELAY
+        self.restart_delays[worker.slot] = delay
+        self.pending_restarts[worker.slot] = time.monotonic() + delay
+        self.log(f"工作进程异常退出: 编号={worker.worker_id}, 退出码={exitcode}, 运行{uptime:.1f}s，"
+                 f"{delay}s 后重启", 'ERROR')
+
+    def check_timers(self):
+        now = time.monotonic()
+        for slot, restart_at in list(self.pending_restarts.items()):
+            if now >= restart_at:
+                del self.pending_restarts[slot]
+                self.start_worker(slot)
+        for worker in self.workers:
+            if worker.kill_at is not None and now >= worker.kill_at and worker.process.is_alive():
+                self.log(f"工作进程下线超时，强制结束: 编号={worker.worker_id}, pid={worker.process.pid}", 'WARNING')
+                worker.process.kill()
+                worker.kill_at = None
+
+    def rolling_restart(self):
+        """
+        滚动重启：每个槽位启动一个新进程，新进程就绪后旧进程平滑下线，期间端口始终有进程监听
+        """
+        self.log("滚动重启所有工作进程", 'INFO')
+        for slot in {worker.slot for worker in self.workers if not worker.draining}:
+            self.start_worker(slot)
@@ -1,29 +1,112 @@
 import asyncio
+import os
 import websockets
 import json
 import time
+from collections import Counter
 from datetime import datetime
 from .database import Database
 from .C2SPackageHelper import C2SPackageHelper
 from .search_source_manager import SearchSourceManager
 from .spider_tool import SpiderTool
+from .job_manager import JobManager, JobCancelled, JobLimitExceeded
+from .article_extractor import ArticleExtractor
+from .rule_generalizer import RuleGeneralizer, HIGH_CONFIDENCE
+from .rule_cache import RuleCache
+from .broadcaster import Broadcaster
+from .outbound_queue import OutboundQueue
+from .search_scheduler import SearchScheduler, SearchPermits, MAX_CONCURRENT_SEARCHES
+from .compression import (ThresholdDeflateFactory, CompressionStats, COMPRESSION_MIN_SIZE,
+                          WINDOW_BITS, MEM_LEVEL, COMPRESSION_LEVEL)
+
+
+# 默认配置
+MAX_IN_FLIGHT_PER_CONNECTION = 8  # 每个连接同时处理的请求数上限
+MAX_REQUEST_ID_LENGTH = 64
+DATA_CHANGE_LOG_KEEP = 10000      # 数据记录变更日志保留条数
+COMPACT_INTERVAL = 600            # 变更日志压缩间隔（秒）
+PING_INTERVAL = 20                # 心跳ping间隔（秒）
+PING_TIMEOUT = 20                 # 等待pong的超时（秒），超时视为半开连接并关闭
+MAX_MESSAGE_SIZE = 1024 * 1024    # 客户端单条消息的最大字节数
+MAX_CONNECTIONS = 500             # 同时连接数上限
+MAX_CONNECTIONS_PER_IP = 20       # 每个IP的同时连接数上限
+IDLE_TIMEOUT = 1800               # 客户端超过该时间（秒）未发送消息则断开，None 表示不限制
+REAP_INTERVAL = 60                # 空闲连接检查间隔（秒）
+SERVER_BUSY_CLOSE_CODE = 1013     # Try Again Later
+DRAIN_TIMEOUT = 30                # 平滑下线时等待后台任务结束的最长时间（秒）
+STATS_PERMISSION_LEVEL = 4        # 查看所有连接统计所需的权限等级（系统管理员）
 
 
 class WebSocketServer:
-    def __init__(self, host='localhost', port=8080):
+    def __init__(self, host='localhost', port=8080, max_in_flight=MAX_IN_FLIGHT_PER_CONNECTION,
+                 ping_interval=PING_INTERVAL, ping_timeout=PING_TIMEOUT, max_message_size=MAX_MESSAGE_SIZE,
+                 max_connections=MAX_CONNECTIONS, max_connections_per_ip=MAX_CONNECTIONS_PER_IP,
+                 idle_timeout=IDLE_TIMEOUT, compression=True, compression_min_size=COMPRESSION_MIN_SIZE,
+                 compression_window_bits=WINDOW_BITS, compression_mem_level=MEM_LEVEL,
+                 compression_level=COMPRESSION_LEVEL, reuse_port=False,
+                 max_concurrent_searches=MAX_CONCURRENT_SEARCHES):
         self.host = host
         self.port = port
         self.clients = set()
+        self.max_in_flight = max_in_flight
+        
+        # 连接管理配置
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self.max_message_size = max_message_size
+        self.max_connections = max_connections
+        self.max_connections_per_ip = max_connections_per_ip
+        self.idle_timeout = idle_timeout
+        
+        # 消息压缩配置（permessage-deflate，只压缩不小于 compression_min_size 字节的消息）
+        self.compression = compression
+        self.compression_min_size = compression_min_size
+        self.compression_window_bits = compression_window_bits
+        self.compression_mem_level = compression_mem_level
+        self.compression_level = compression_level
+        self.compression_stats = CompressionStats()
+        
+        # 多进程模式下各工作进程通过 SO_REUSEPORT 共享端口，并通过IPC通道（peers）同步数据变更
+        self.reuse_port = reuse_port
+        self.peers = None
+        self.server = None
+        self.draining = False
+        
+        # 每个IP的连接数、每个连接最后收到消息的时间，以及连接计数器
+        self.connections_per_ip = Counter()
+        self.last_activity = {}
+        self.connection_counters = Counter()
         
         # 初始化数据库和搜索源管理器
         self.db = Database()
         self.search_source_manager = SearchSourceManager(self.db.get_blacklist())
         self.spider_tool = SpiderTool()
+        self.article_extractor = ArticleExtractor()
+        self.rule_generalizer = RuleGeneralizer()
         
-
+        # 编译后的爬虫规则缓存（规则写入时按域名自动失效）
+        self.rule_cache = RuleCache(self.db)
+        
+        # 后台任务管理器（嗅探等阻塞任务在线程池中执行）
+        self.job_manager = JobManager()
         
-        # 保存最后一次搜索的结果
-        self.last_search_results = []
+        # 每个连接的会话信息（登录用户等）
+        self.sessions = {}
+        
+        # 每个连接正在进行的搜索任务（新搜索、取消搜索或断开连接时取消）
+        self.search_jobs = {}
+        
+        # 搜索调度：限制同时执行的搜索数，其余按用户公平排队
+        self.search_scheduler = SearchScheduler(max_concurrent_searches, self.send_search_queued, self.send_searching)
+        
+        # 每个连接协商的传输格式（json / msgpack），未协商的连接使用 json
+        self.wire_formats = {}
+        
+        # 数据变更广播（订阅的连接接收其他连接写入/删除数据的增量）
+        self.broadcaster = Broadcaster(lambda websocket: self.wire_formats.get(websocket, 'json'))
+        
+        # 每个连接最后一次搜索的结果（筛选入库时按ID查找，断开连接时清除）
+        self.last_search_results = {}
         
     def log(self, message, level='INFO'):
         """
@@ -32,52 +115,227 @@ class WebSocketServer:
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         print(f"[{timestamp}] [{level}] {message}")
     
-    async def handle_client(self, websocket):
+    def get_owner(self, websocket):
+        """
+        获取连接所属用户标识（用于任务数限制和搜索排队），未登录的连接使用远端IP（不含端口，同一IP的多个连接视为同一用户）
+        """
+        session = self.sessions.get(websocket, {})
+        return session.get('username') or self.get_client_ip(websocket)
+    
+    def get_client_ip(self, websocket):
+        remote_address = websocket.remote_address
+        return remote_address[0] if remote_address else 'unknown'
+    
+    async def handle_client(self, raw_websocket):
         """
         处理客户端连接
         """
+        # 超过总连接数或单IP连接数上限时直接关闭（客户端稍后自动重连）
+        ip = self.get_client_ip(raw_websocket)
+        if len(self.clients) >= self.max_connections:
+            self.connection_counters['rejected_total_limit'] += 1
+            self.log(f"连接数已达上限({self.max_connections})，拒绝连接: {raw_websocket.remote_address}", 'WARNING')
+            await raw_websocket.close(code=SERVER_BUSY_CLOSE_CODE, reason='too many connections')
+            return
+        if self.connections_per_ip[ip] >= self.max_connections_per_ip:
+            self.connection_counters['rejected_ip_limit'] += 1
+            self.log(f"IP连接数已达上限({self.max_connections_per_ip})，拒绝连接: {raw_websocket.remote_address}", 'WARNING')
+            await raw_websocket.close(code=SERVER_BUSY_CLOSE_CODE, reason='too many connections from this address')
+            return
+        
+        # 发往该连接的数据包经有界队列由独立任务发送，之后统一使用该对象代表连接
+        websocket = OutboundQueue(raw_websocket)
         self.clients.add(websocket)
+        self.connections_per_ip[ip] += 1
+        self.last_activity[websocket] = time.monotonic()
+        self.connection_counters['accepted'] += 1
+        self.connection_counters['peak'] = max(self.connection_counters['peak'], len(self.clients))
         self.log(f"新客户端连接: {websocket.remote_address}", 'INFO')
         
+        # 同一连接的多个请求并发处理（响应通过 request_id 区分），达到上限时暂停读取新消息
+        in_flight = asyncio.Semaphore(self.max_in_flight)
+        tasks = set()
+        
+        def on_task_done(task):
+            tasks.discard(task)
+            in_flight.release()
+        
         try:
-            async for message in websocket:
-                await self.process_message(websocket, message)
+            async for message in raw_websocket:
+                self.last_activity[websocket] = time.monotonic()
+                await in_flight.acquire()
+                task = asyncio.create_task(self.process_message(websocket, message))
+                tasks.add(task)
+                task.add_done_callback(on_task_done)
         
         except websockets.exceptions.ConnectionClosedError as e:
+            self.count_close_error(e)
             self.log(f"客户端连接关闭: {websocket.remote_address} - 错误: {e}", 'WARNING')
         
         except Exception as e:
             self.log(f"客户端连接异常: {websocket.remote_address} - 错误: {e}", 'ERROR')
         
         finally:
+            for task in list(tasks):
+                task.cancel()
             self.clients.remove(websocket)
-            self.log(f"客户端已断开: {websocket.remote_address}", 'INFO')
+            self.connections_per_ip[ip] -= 1
+            if self.connections_per_ip[ip] <= 0:
+                del self.connections_per_ip[ip]
+            self.last_activity.pop(websocket, None)
+            self.sessions.pop(websocket, None)
+            self.wire_formats.pop(websocket, None)
+            self.search_jobs.pop(websocket, None)
+            self.last_search_results.pop(websocket, None)
+            self.broadcaster.unsubscribe(websocket)
+            self.job_manager.cancel_connection_jobs(websocket)
+            await websocket.aclose()
+            self.log(f"客户端已断开: {websocket.remote_address}, 发送队列统计: {websocket.get_stats()}", 'INFO')
+    
+    def count_close_error(self, error):
+        """
+        按关闭原因统计异常关闭的连接（心跳超时、消息过大等）
+        """
+        sent = getattr(error, 'sent', None)
+        code = sent.code if sent is not None else None
+        if code == 1009:
+            self.connection_counters['message_too_big'] += 1
+        elif code == 1011 and 'ping' in (sent.reason or ''):
+            self.connection_counters['keepalive_timeout'] += 1
+        else:
+            self.connection_counters['closed_error'] += 1
+    
+    async def reap_idle_connections(self):
+        """
+        定期断开长时间未发送消息的连接，释放会话、订阅等连接状态
+        """
+        while True:
+            await asyncio.sleep(REAP_INTERVAL)
+            if not self.idle_timeout:
+                continue
+            deadline = time.monotonic() - self.idle_timeout
+            for websocket, last_activity in list(self.last_activity.items()):
+                if last_activity < deadline:
+                    self.last_activity.pop(websocket, None)
+                    self.connection_counters['idle_closed'] += 1
+                    self.log(f"连接空闲超时，断开: {websocket.remote_address}", 'INFO')
+                    asyncio.create_task(websocket.close(code=1000, reason='idle timeout'))
+    
+    def attach_peers(self, channel):
+        """
+        多进程模式：接入与其他工作进程通信的IPC通道（见 supervisor.WorkerChannel）
+        本进程的数据变更、搜索源启用/禁用和爬虫规则变化会通知其他工作进程，并处理它们发来的通知
+        """
+        self.peers = channel
+        channel.on('records_added', lambda data: self.broadcaster.publish_added(data['topic'], data['records']))
+        channel.on('records_deleted', lambda data: self.broadcaster.publish_deleted(data['topic'], data['record_ids']))
+        channel.on('search_sources_changed', lambda data: self.reload_search_sources())
+        channel.on('rule_changed', lambda data: self.rule_cache.invalidate_domain(data['domain']))
+        # 搜索执行名额由 supervisor 统一发放，同时执行的搜索数上限对所有工作进程生效
+        self.search_scheduler.use_permits(SearchPermits(channel.publish))
+        channel.on('search_permit_grant', lambda data: self.search_scheduler.on_permits_granted(data['count']))
+        self.db.add_rule_listener(lambda domain: self.notify_peers('rule_changed', {'domain': domain}))
+    
+    def notify_peers(self, kind, data):
+        """
+        通知其他工作进程（单进程模式下不做任何事）
+        """
+        if self.peers is not None:
+            self.peers.publish(kind, data)
+    
+    def reload_search_sources(self):
+        """
+        按最新的黑名单重新加载搜索源
+        """
+        self.search_source_manager = SearchSourceManager(self.db.get_blacklist())
+    
+    async def drain(self, timeout=DRAIN_TIMEOUT):
+        """
+        平滑下线：立即停止接受新连接，等待正在执行的后台任务结束（最多 timeout 秒），
+        再以 1001 (going away) 关闭现有连接，客户端随后重连到其他工作进程
+        """
+        if self.server is None or self.draining:
+            return
+        self.draining = True
+        self.log(f"开始平滑下线: 连接数={len(self.clients)}, 后台任务数={len(self.job_manager.get_active_jobs())}", 'INFO')
+        
+        # 只关闭监听套接字，现有连接继续服务
+        self.server.server.close()
+        
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while self.job_manager.get_active_jobs() and loop.time() < deadline:
+            await asyncio.sleep(0.5)
+        
+        remaining = len(self.job_manager.get_active_jobs())
+        if remaining:
+            self.log(f"平滑下线等待超时，取消剩余的后台任务: {remaining}个", 'WARNING')
+        self.server.close()
+    
+    def get_connection_summary(self):
+        """
+        连接数和连接计数器（多进程模式下为本工作进程的统计）
+        """
+        return dict(self.connection_counters, current=len(self.clients), ips=len(self.connections_per_ip),
+                    pid=os.getpid())
     
     async def process_message(self, websocket, message):
         """
         处理客户端发送的消息
         """
+        # 本连接发出的数据包（包括后台任务的进度包）按协商的格式序列化
+        C2SPackageHelper.set_wire_format(self.wire_formats.get(websocket, 'json'))
         try:
             self.log(f"接收到客户端消息: {message} from {websocket.remote_address}", 'DEBUG')
             data = json.loads(message)
             message_type = data.get('type')
             message_data = data.get('data', {})
             
+            # 每条消息在独立的任务中处理，请求ID只作用于本请求的响应（包括其后台任务的进度包）
+            request_id = data.get('request_id')
+            if isinstance(request_id, (str, int)) and not isinstance(request_id, bool) \
+                    and len(str(request_id)) <= MAX_REQUEST_ID_LENGTH:
+                C2SPackageHelper.set_request_id(request_id)
+            
             self.log(f"处理消息: 类型={message_type}, 数据={message_data} from {websocket.remote_address}", 'INFO')
             
             # 根据消息类型处理
             if message_type == 'login':
                 await self.handle_login(websocket, message_data)
             
+            elif message_type == 'resume_session':
+                await self.handle_resume_session(websocket, message_data)
+            
+            elif message_type == 'logout':
+                await self.handle_logout(websocket)
+            
+            elif message_type == 'negotiate_protocol':
+                await self.handle_negotiate_protocol(websocket, message_data)
+            
+            elif message_type == 'subscribe':
+                await self.handle_subscribe(websocket, message_data)
+            
+            elif message_type == 'unsubscribe':
+                self.broadcaster.unsubscribe(websocket, message_data.get('topics'))
+            
             elif message_type == 'search_data':
                 await self.handle_search_data(websocket, message_data)
             
+            elif message_type == 'cancel_search':
+                await self.handle_cancel_search(websocket)
+            
             elif message_type == 'filter_data':
                 await self.handle_filter_data(websocket, message_data)
             
             elif message_type == 'refresh_data_management':
                 await self.handle_refresh_data_management(websocket)
             
+            elif message_type == 'get_connection_stats':
+                await self.handle_get_connection_stats(websocket)
+            
+            elif message_type == 'sync_data_records':
+                await self.handle_sync_data_records(websocket, message_data)
+            
             elif message_type == 'delete_data':
                 await self.handle_delete_data(websocket, message_data)
             
@@ -93,9 +351,21 @@ class WebSocketServer:
             elif message_type == 'sniff_rules':
                 await self.handle_sniff_rules(websocket, message_data)
             
+            elif message_type == 'sniff_rules_batch':
+                await self.handle_sniff_rules_batch(websocket, message_data)
+            
+            elif message_type in ('cancel_sniff', 'cancel_extract'):
+                await self.handle_cancel_job(websocket, message_data)
+            
+            elif message_type == 'extract_articles':
+                await self.handle_extract_articles(websocket, message_data)
+            
             elif message_type == 'get_spider_rules':
                 await self.handle_get_spider_rules(websocket, message_data)
             
+            elif message_type == 'generalize_rules':
+                await self.handle_generalize_rules(websocket, message_data)
+            
             else:
                 self.log(f"未知消息类型: {message_type} from {websocket.remote_address}", 'WARNING')
                 await websocket.send(C2SPackageHelper.error("未知消息类型"))
@@ -104,9 +374,16 @@ class WebSocketServer:
             self.log(f"无效的JSON消息: {message} from {websocket.remote_address} - 错误: {e}", 'ERROR')
             await websocket.send(C2SPackageHelper.error("无效的JSON消息"))
         
+        except websockets.exceptions.ConnectionClosed:
+            # 请求在独立任务中处理，连接已关闭时直接丢弃响应
+            self.log(f"连接已关闭，丢弃响应 from {websocket.remote_address}", 'DEBUG')
+        
         except Exception as e:
             self.log(f"处理消息时发生错误: {str(e)} from {websocket.remote_address}", 'ERROR')
-            await websocket.send(C2SPackageHelper.error(f"服务器错误: {str(e)}"))
+            try:
+                await websocket.send(C2SPackageHelper.error(f"服务器错误: {str(e)}"))
+            except websockets.exceptions.ConnectionClosed:
+                pass
     
     # 处理登录
     async def handle_login(self, websocket, data):
@@ -127,15 +404,91 @@ class WebSocketServer:
         
         if user and user[2] == password:  # user[2] 是密码字段
             self.log(f"登录成功: 用户名={username}, 权限等级={user[3]}", 'INFO')
-            response = C2SPackageHelper.login_success(username, user[3])
+            token = self.db.create_session(username)
+            self.sessions[websocket] = {'username': username, 'permission_level': user[3], 'token': token}
+            response = C2SPackageHelper.login_success(username, user[3], token)
             await websocket.send(response)
             self.log(f"发送登录成功响应: {response}", 'DEBUG')
+            # 登录请求可以同时请求传输格式
+            if data.get('wire_format'):
+                await self.handle_negotiate_protocol(websocket, data)
         else:
             self.log(f"登录失败: 用户名或密码错误 - 用户名={username}", 'WARNING')
             response = C2SPackageHelper.login_failure()
             await websocket.send(response)
             self.log(f"发送登录失败响应: {response}", 'DEBUG')
     
+    # 处理凭会话令牌恢复登录（主页面的连接不再发送用户名密码）
+    async def handle_resume_session(self, websocket, data):
+        token = data.get('token')
+        user = self.db.get_session_user(token) if isinstance(token, str) and token else None
+        if not user:
+            self.log(f"恢复登录失败: 会话令牌无效或已过期 from {websocket.remote_address}", 'WARNING')
+            await websocket.send(C2SPackageHelper.login_failure("登录已过期，请重新登录"))
+            return
+        
+        # 先记录会话再发送，同一连接随后并发处理的请求都按该用户处理
+        self.sessions[websocket] = {'username': user[1], 'permission_level': user[3], 'token': token}
+        self.log(f"恢复登录成功: 用户名={user[1]}, 权限等级={user[3]} from {websocket.remote_address}", 'INFO')
+        await websocket.send(C2SPackageHelper.login_success(user[1], user[3]))
+    
+    # 处理退出登录
+    async def handle_logout(self, websocket):
+        session = self.sessions.pop(websocket, None)
+        if session and session.get('token'):
+            self.db.delete_session(session['token'])
+        self.log(f"退出登录: 用户名={session.get('username') if session else None} from {websocket.remote_address}", 'INFO')
+        await websocket.send(C2SPackageHelper.success('logout_response'))
+    
+    # 处理传输格式协商
+    async def handle_negotiate_protocol(self, websocket, data):
+        """
+        协商服务端发往客户端的数据包格式，不支持的格式回退为 json。
+        协商结果以JSON发送，之后本连接的数据包按协商的格式发送（客户端发往服务端的消息始终为JSON）
+        """
+        requested = data.get('wire_format')
+        wire_format = C2SPackageHelper.negotiate_wire_format(requested)
+        # 先记录再发送，之后并发处理的请求都使用新格式（客户端按帧类型解码，不依赖到达顺序）
+        self.wire_formats[websocket] = wire_format
+        C2SPackageHelper.set_wire_format(wire_format)
+        await websocket.send(C2SPackageHelper.protocol_negotiated(wire_format))
+        self.log(f"传输格式协商: 请求={requested}, 使用={wire_format} from {websocket.remote_address}", 'INFO')
+    
+    # 处理连接统计查询（发送队列深度、发送延迟等）
+    async def handle_get_connection_stats(self, websocket):
+        """
+        系统管理员获取服务器和所有连接的统计，其他连接只能获取自己的发送队列统计（不暴露其他用户的地址和用户名）
+        """
+        def connection_stats(client):
+            session = self.sessions.get(client, {})
+            return {
+                'address': str(client.remote_address),
+                'username': session.get('username'),
+                'wire_format': self.wire_formats.get(client, 'json'),
+                'queue': client.get_stats()
+            }
+        
+        if self.sessions.get(websocket, {}).get('permission_level', 0) < STATS_PERMISSION_LEVEL:
+            await websocket.send(C2SPackageHelper.success('connection_stats_response', {
+                'connections': [connection_stats(websocket)]
+            }))
+            return
+        
+        connections = [connection_stats(client) for client in list(self.clients)]
+        await websocket.send(C2SPackageHelper.success('connection_stats_response', {
+            'server': self.get_connection_summary(),
+            'connections': connections,
+            'broadcast': self.broadcaster.get_stats(),
+            'search_scheduler': self.search_scheduler.get_stats(),
+            'compression': self.compression_stats.to_dict() if self.compression else None
+        }))
+    
+    # 处理订阅数据变更
+    async def handle_subscribe(self, websocket, data):
+        topics = self.broadcaster.subscribe(websocket, data.get('topics') or ['data_records'])
+        self.log(f"订阅数据变更: 主题={topics} from {websocket.remote_address}", 'INFO')
+        await websocket.send(C2SPackageHelper.success('subscribe_response', {'topics': topics}))
+    
     # 处理数据搜索
     async def handle_search_data(self, websocket, data):
         search_content = data.get('search_content')
@@ -150,22 +503,73 @@ class WebSocketServer:
             self.log(f"发送搜索失败响应: {response}", 'DEBUG')
             return
         
-        # 发送正在搜索信号
-        searching_response = C2SPackageHelper.searching()
-        await websocket.send(searching_response)
-        self.log(f"发送正在搜索响应: {searching_response}", 'DEBUG')
+        # 同一连接发起新搜索时取消仍在进行的上一次搜索
+        previous = self.search_jobs.get(websocket)
+        if previous is not None and not previous.is_cancelled():
+            self.log(f"新的搜索请求，取消上一次搜索: 任务ID={previous.job_id}", 'INFO')
+            previous.cancel()
         
         # 获取所有启用的搜索源
         enabled_sources = self.search_source_manager.get_enabled_sources()
         self.log(f"获取到启用的搜索源: {[source['name'] for source in enabled_sources]}", 'DEBUG')
         
-        # 调用所有搜索源进行搜索
+        async def on_done(job, all_data, error):
+            await self.finish_search_data(websocket, job, all_data, error)
+        
+        # 按预计抓取的页数和用户权限等级排队，获得执行名额后发送正在搜索信号（见 send_searching）
+        try:
+            pages = max(1, int(max_pages))
+        except (TypeError, ValueError):
+            pages = 1
+        permission_level = self.sessions.get(websocket, {}).get('permission_level', 0)
+        admission = self.search_scheduler.admission(pages * len(enabled_sources), permission_level)
+        
+        # 搜索源在后台线程池中执行，取消时在搜索源之间（以及支持取消的搜索源的翻页之间）中止
+        try:
+            job = self.job_manager.submit(
+                'search', self.get_owner(websocket), self.run_search,
+                enabled_sources, search_content, max_pages,
+                on_done=on_done, connection=websocket, admission=admission
+            )
+        except JobLimitExceeded as e:
+            await websocket.send(C2SPackageHelper.error(f"搜索失败: {str(e)}"))
+            return
+        
+        self.search_jobs[websocket] = job
+    
+    async def send_search_queued(self, job, position, queue_length):
+        """
+        通知排队中的搜索其队列位置（按发起请求时的传输格式和请求ID）
+        """
+        packet = job.context.copy().run(C2SPackageHelper.search_queued, job.job_id, position, queue_length)
+        await job.connection.send(packet, coalesce_key=('queue', job.job_id))
+    
+    async def send_searching(self, job):
+        """
+        搜索获得执行名额，发送正在搜索信号
+        """
+        searching_response = job.context.copy().run(C2SPackageHelper.searching)
+        await job.connection.send(searching_response)
+        self.log(f"发送正在搜索响应: {searching_response}", 'DEBUG')
+    
+    def run_search(self, job, enabled_sources, search_content, max_pages):
+        """
+        依次调用所有启用的搜索源（在工作线程中执行）
+        
+        Returns:
+            list: 所有搜索源返回的数据
+        
+        Raises:
+            JobCancelled: 搜索已被取消
+        """
         all_data = []
         for source in enabled_sources:
+            job.check_cancelled()
             try:
                 self.log(f"调用搜索源: {source['name']} 搜索内容: {search_content}", 'INFO')
                 # 调用搜索源的main函数
-                status, data_list = source['module'].main(search_content, max_pages)
+                status, data_list = self.search_source_manager.run_source(
+                    source, search_content, max_pages, job.cancel_event)
                 if status and data_list:
                     self.log(f"搜索源 {source['name']} 返回数据: {len(data_list)} 条", 'INFO')
                     
@@ -185,36 +589,70 @@ class WebSocketServer:
             except Exception as e:
                 self.log(f"搜索源 {source['name']} 调用失败: {str(e)}", 'ERROR')
         
-        # 发送搜索完成信号和数据
-        self.log(f"所有搜索源完成搜索，总计数据: {len(all_data)} 条", 'INFO')
-        
-        # 为每个结果添加唯一ID和数据源说明，并映射字段名称
-        for i, result in enumerate(all_data):
-            # 添加唯一ID
-            result['id'] = f"{i}_{int(time.time())}"
-            
-            # 映射字段名称：将url和cover_url映射到source_url和image_url
-            if 'url' in result:
-                result['source_url'] = result['url']
-            if 'cover_url' in result:
-                result['image_url'] = result['cover_url']
-            
-            # 添加数据源说明
-            if 'data_source' in result:
-                source = next((s for s in self.search_source_manager.get_all_sources() if s['name'] == result['data_source']), None)
-                if source:
-                    result['data_source_info'] = {
-                        'name': source['display_name'],
-                        'description': source['description'],
-                        'enabled': source['enabled']
-                    }
-        
-        # 保存最后一次搜索的结果
-        self.last_search_results = all_data
-        
-        completed_response = C2SPackageHelper.search_completed(all_data)
-        await websocket.send(completed_response)
-        self.log(f"发送搜索完成响应: {completed_response}", 'DEBUG')
+        # 最后一个搜索源执行期间被取消时丢弃结果
+        job.check_cancelled()
+        return all_data
+    
+    async def finish_search_data(self, websocket, job, all_data, error):
+        """
+        搜索任务结束后整理结果并发送
+        """
+        if self.search_jobs.get(websocket) is job:
+            self.search_jobs.pop(websocket, None)
+        
+        try:
+            if isinstance(error, JobCancelled):
+                self.log(f"搜索已取消: 任务ID={job.job_id}", 'INFO')
+                await websocket.send(C2SPackageHelper.search_cancelled(job.job_id))
+                return
+            
+            if error is not None:
+                await websocket.send(C2SPackageHelper.error(f"搜索失败: {str(error)}"))
+                return
+            
+            # 发送搜索完成信号和数据
+            self.log(f"所有搜索源完成搜索，总计数据: {len(all_data)} 条", 'INFO')
+            
+            # 为每个结果添加唯一ID和数据源说明，并映射字段名称
+            for i, result in enumerate(all_data):
+                # 添加唯一ID（包含任务ID，同时进行的多个搜索的结果ID不会重复）
+                result['id'] = f"{job.job_id}_{i}"
+                
+                # 映射字段名称：将url和cover_url映射到source_url和image_url
+                if 'url' in result:
+                    result['source_url'] = result['url']
+                if 'cover_url' in result:
+                    result['image_url'] = result['cover_url']
+                
+                # 添加数据源说明
+                if 'data_source' in result:
+                    source = next((s for s in self.search_source_manager.get_all_sources() if s['name'] == result['data_source']), None)
+                    if source:
+                        result['data_source_info'] = {
+                            'name': source['display_name'],
+                            'description': source['description'],
+                            'enabled': source['enabled']
+                        }
+            
+            # 保存本连接最后一次搜索的结果（连接已断开时不保存）
+            if websocket in self.clients:
+                self.last_search_results[websocket] = all_data
+            
+            completed_response = C2SPackageHelper.search_completed(all_data)
+            await websocket.send(completed_response)
+            self.log(f"发送搜索完成响应: {completed_response}", 'DEBUG')
+        
+        except websockets.exceptions.ConnectionClosed:
+            self.log(f"搜索结果未发送，客户端已断开: 任务ID={job.job_id}", 'WARNING')
+    
+    # 处理取消搜索
+    async def handle_cancel_search(self, websocket):
+        job = self.search_jobs.get(websocket)
+        if job is None:
+            await websocket.send(C2SPackageHelper.error("没有正在进行的搜索"))
+            return
+        job.cancel()
+        self.log(f"已请求取消搜索: 任务ID={job.job_id} from {websocket.remote_address}", 'INFO')
     
     # 处理数据筛选（入库）
     async def handle_filter_data(self, websocket, data):
@@ -230,7 +668,7 @@ class WebSocketServer:
             return
         
         # 根据选中的ID找到对应的搜索结果数据
-        data_list = [result for result in self.last_search_results if result['id'] in selected_ids]
+        data_list = [result for result in self.last_search_results.get(websocket, []) if result['id'] in selected_ids]
         
         self.log(f"根据选中的ID找到对应的数据: 数据数量={len(data_list)} from {websocket.remote_address}", 'INFO')
         
@@ -248,19 +686,29 @@ class WebSocketServer:
         
         # 将选中的数据入库
         self.log(f"开始将数据入库: 数据数量={len(data_list)}", 'INFO')
+        added_ids = []
         for item in data_list:
             try:
-                self.db.add_data_record(
+                record_id = self.db.add_data_record(
                     item.get('title', ''),
                     item.get('summary', ''),
                     item.get('image_url', ''),
                     item.get('source_url', ''),
                     item.get('data_source', '')
                 )
+                if record_id:
+                    added_ids.append(record_id)
                 self.log(f"数据入库成功: 标题={item.get('title', '')}", 'DEBUG')
             except Exception as e:
                 self.log(f"数据入库失败: 标题={item.get('title', '')} - 错误: {e}", 'ERROR')
         
+        # 向其他订阅的连接推送新增的记录
+        added_records = self.db.get_data_records_by_ids(added_ids)
+        formatted_records = [self.format_data_record(item) for item in added_records]
+        self.broadcaster.publish_added('data_records', formatted_records, origin=websocket)
+        if formatted_records:
+            self.notify_peers('records_added', {'topic': 'data_records', 'records': formatted_records})
+        
         # 发送筛选完成信号
         completed_response = C2SPackageHelper.filter_completed()
         await websocket.send(completed_response)
@@ -275,22 +723,58 @@ class WebSocketServer:
         data_list = self.db.get_data_records()
         
         # 转换数据格式
-        formatted_data = []
-        for item in data_list:
-            formatted_data.append({
-                'id': item[0],
-                'title': item[1],
-                'summary': item[2],
-                'image_url': item[3],
-                'source_url': item[4],
-                'data_source': item[5],
-                'created_at': item[6],
-                'search_term': item[7] if len(item) > 7 else None
-            })
+        formatted_data = [self.format_data_record(item) for item in data_list]
         
         # 发送数据读取完成信号和数据
         await websocket.send(C2SPackageHelper.data_read_completed(formatted_data))
     
+    # 处理数据记录增量同步
+    async def handle_sync_data_records(self, websocket, data):
+        """
+        客户端提交最后同步到的版本号，只返回此后新增/修改和删除的记录；
+        没有版本号、版本号无效或变更日志已被压缩时返回全量快照
+        """
+        since_version = data.get('since_version')
+        changes = None
+        if isinstance(since_version, int) and not isinstance(since_version, bool) and since_version >= 0:
+            changes = self.db.get_data_changes(since_version)
+        
+        if changes is None:
+            # 先取版本号再读数据，读到的数据不会早于该版本，之后的增量可以重复应用
+            version = self.db.get_data_version()
+            records = [self.format_data_record(item) for item in self.db.get_data_records()]
+            self.log(f"数据记录全量同步: 版本={version}, 记录数={len(records)} from {websocket.remote_address}", 'INFO')
+            await websocket.send(C2SPackageHelper.data_sync('snapshot', version, records))
+            return
+        
+        version, records, deleted_ids = changes
+        self.log(f"数据记录增量同步: 版本={since_version}->{version}, 变更={len(records)}, 删除={len(deleted_ids)} from {websocket.remote_address}", 'INFO')
+        await websocket.send(C2SPackageHelper.data_sync(
+            'delta', version, [self.format_data_record(item) for item in records], deleted_ids))
+    
+    async def compact_data_changes_periodically(self):
+        """
+        定期压缩数据记录变更日志
+        """
+        while True:
+            await asyncio.sleep(COMPACT_INTERVAL)
+            self.db.compact_data_changes(DATA_CHANGE_LOG_KEEP)
+    
+    def format_data_record(self, item):
+        """
+        将数据记录元组（DATA_RECORD_COLUMNS 顺序）转换为客户端使用的格式
+        """
+        return {
+            'id': item[0],
+            'title': item[1],
+            'summary': item[2],
+            'image_url': item[3],
+            'source_url': item[4],
+            'data_source': item[5],
+            'created_at': item[6],
+            'search_term': item[7] if len(item) > 7 else None
+        }
+    
     # 处理数据删除
     async def handle_delete_data(self, websocket, data):
         selected_ids = data.get('selected_ids', [])
@@ -303,14 +787,21 @@ class WebSocketServer:
         await websocket.send(C2SPackageHelper.deleting_data())
         
         # 删除选中的数据
-        for record_id in selected_ids:
-            self.db.delete_data_record(record_id)
+        deleted_ids = [record_id for record_id in selected_ids if self.db.delete_data_record(record_id)]
+        
+        # 向其他订阅的连接推送删除的记录ID
+        self.broadcaster.publish_deleted('data_records', deleted_ids, origin=websocket)
+        if deleted_ids:
+            self.notify_peers('records_deleted', {'topic': 'data_records', 'record_ids': deleted_ids})
         
         # 发送删除完成信号
         await websocket.send(C2SPackageHelper.data_deleted())
         
-        # 重新读取数据库并发送数据
-        await self.handle_refresh_data_management(websocket)
+        # 客户端提交了同步版本号时只返回增量，否则重新读取数据库并发送全部数据
+        if 'since_version' in data:
+            await self.handle_sync_data_records(websocket, data)
+        else:
+            await self.handle_refresh_data_management(websocket)
     
     # 处理搜索源管理页面刷新
     async def handle_refresh_search_source_management(self, websocket):
@@ -347,8 +838,9 @@ class WebSocketServer:
         # 将搜索源加入黑名单
         self.db.add_to_blacklist(source_id)
         
-        # 重新加载搜索源
-        self.search_source_manager = SearchSourceManager(self.db.get_blacklist())
+        # 重新加载搜索源（其他工作进程同样重新加载）
+        self.reload_search_sources()
+        self.notify_peers('search_sources_changed', {'source_id': source_id})
         
         # 发送搜索源状态更新信号和数据
         all_sources = self.search_source_manager.get_all_sources()
@@ -377,8 +869,9 @@ class WebSocketServer:
         # 将搜索源从黑名单中移除
         self.db.remove_from_blacklist(source_id)
         
-        # 重新加载搜索源
-        self.search_source_manager = SearchSourceManager(self.db.get_blacklist())
+        # 重新加载搜索源（其他工作进程同样重新加载）
+        self.reload_search_sources()
+        self.notify_peers('search_sources_changed', {'source_id': source_id})
         
         # 发送搜索源状态更新信号和数据
         all_sources = self.search_source_manager.get_all_sources()
@@ -396,6 +889,7 @@ class WebSocketServer:
     async def handle_sniff_rules(self, websocket, data):
         """
         处理嗅探规则请求
+        嗅探在后台线程池中执行，立即返回任务ID，之后推送 sniff_progress，结束时发送 sniff_rules_response
         """
         source_url = data.get('source_url')
         target_title = data.get('target_title')
@@ -404,11 +898,43 @@ class WebSocketServer:
             await websocket.send(C2SPackageHelper.error("缺少源URL或目标标题"))
             return
         
+        self.log(f"开始嗅探规则: 源URL={source_url}, 目标标题={target_title}", 'INFO')
+        
+        async def on_progress(job, stage, percent, message):
+            try:
+                # 未发送的进度包只保留最新的一条
+                await websocket.send(C2SPackageHelper.sniff_progress(job.job_id, stage, percent, message),
+                                     coalesce_key=('progress', job.job_id))
+            except websockets.exceptions.ConnectionClosed:
+                job.cancel()
+        
+        async def on_done(job, rules, error):
+            await self.finish_sniff_rules(websocket, job, source_url, rules, error)
+        
+        try:
+            job = self.job_manager.submit(
+                'sniff', self.get_owner(websocket),
+                lambda job: self.spider_tool.sniff_rules(source_url, target_title, progress=job.report_progress),
+                on_progress=on_progress, on_done=on_done, connection=websocket
+            )
+        except JobLimitExceeded as e:
+            await websocket.send(C2SPackageHelper.error(f"嗅探规则失败: {str(e)}"))
+            return
+        
+        await websocket.send(C2SPackageHelper.sniff_progress(job.job_id, 'queued', 0))
+    
+    async def finish_sniff_rules(self, websocket, job, source_url, rules, error):
+        """
+        嗅探任务结束后保存规则并发送结果
+        """
         try:
-            self.log(f"开始嗅探规则: 源URL={source_url}, 目标标题={target_title}", 'INFO')
+            if isinstance(error, JobCancelled):
+                self.log(f"嗅探规则已取消: 源URL={source_url}", 'INFO')
+                await websocket.send(C2SPackageHelper.sniff_cancelled(job.job_id))
+                return
             
-            # 使用爬虫工具嗅探规则
-            rules = self.spider_tool.sniff_rules(source_url, target_title)
+            if error is not None:
+                raise error
             
             if not rules:
                 await websocket.send(C2SPackageHelper.error("嗅探规则失败，无法获取网页内容"))
@@ -425,17 +951,290 @@ class WebSocketServer:
             )
             
             if rule_id:
+                # 同域名规则变化后重新归纳域名规则
+                self.generalize_domain_rules(rules['domain'])
+                
                 await websocket.send(C2SPackageHelper.success("sniff_rules_response", {
+                    'job_id': job.job_id,
                     'rule_id': rule_id,
                     'rules': rules
                 }))
             else:
                 await websocket.send(C2SPackageHelper.error("保存嗅探规则失败"))
+        
+        except websockets.exceptions.ConnectionClosed:
+            self.log(f"嗅探结果未发送，客户端已断开: 源URL={source_url}", 'WARNING')
                 
         except Exception as e:
             self.log(f"嗅探规则失败: 源URL={source_url} - 错误: {str(e)}", 'ERROR')
             await websocket.send(C2SPackageHelper.error(f"嗅探规则失败: {str(e)}"))
     
+    async def handle_sniff_rules_batch(self, websocket, data):
+        """
+        处理批量嗅探规则请求
+        按 items（[{source_url, target_title}]）或 record_ids（数据记录）批量嗅探，同一域名限制并发；
+        已有适用于该URL的高置信度域名规则时默认跳过（force 为真时不跳过）。
+        每完成一项推送 sniff_batch_item，全部结束后在单个事务中保存规则并发送 sniff_rules_batch_response
+        """
+        items = [item for item in data.get('items', []) if item.get('source_url') and item.get('target_title')]
+        items += [{'source_url': record[4], 'target_title': record[1]}
+                  for record in self.db.get_data_records_by_ids(data.get('record_ids', []))]
+        force = data.get('force', False)
+        
+        # 同一URL只嗅探一次
+        items = list({item['source_url']: item for item in items}.values())
+        if not items:
+            await websocket.send(C2SPackageHelper.error("缺少待嗅探的URL"))
+            return
+        
+        pending = []
+        skipped = []
+        domain_rules = {}
+        for item in items:
+            domain = self.spider_tool.get_domain(item['source_url'])
+            if domain not in domain_rules:
+                domain_rules[domain] = self.db.get_domain_rules(domain)
+            # 只看覆盖该URL的规则（URL模式匹配的规则或域名通用规则），其他路径的规则不影响
+            rule = Database.match_domain_rule(domain_rules[domain], item['source_url'])
+            if not force and rule and rule[9] >= HIGH_CONFIDENCE:
+                skipped.append(item['source_url'])
+            else:
+                pending.append(item)
+        
+        self.log(f"开始批量嗅探规则: 待嗅探={len(pending)}, 已有高置信度规则跳过={len(skipped)}", 'INFO')
+        
+        if not pending:
+            await websocket.send(C2SPackageHelper.success("sniff_rules_batch_response", {
+                'job_id': None, 'total': len(items), 'succeeded': 0, 'failed': 0, 'saved': 0, 'skipped': skipped
+            }))
+            return
+        
+        # 已完成的规则（工作线程追加），任务取消时也会保存已完成的部分
+        collected = []
+        
+        async def send_item(job, item, rules):
+            try:
+                await websocket.send(C2SPackageHelper.sniff_batch_item(
+                    job.job_id, item['source_url'], rules, None if rules else "无法获取网页内容"))
+            except websockets.exceptions.ConnectionClosed:
+                job.cancel()
+        
+        def on_item(job, item, rules):
+            if rules:
+                collected.append(rules)
+            job.schedule(send_item(job, item, rules))
+        
+        async def on_progress(job, stage, percent, message):
+            try:
+                # 未发送的进度包只保留最新的一条
+                await websocket.send(C2SPackageHelper.sniff_progress(job.job_id, stage, percent, message),
+                                     coalesce_key=('progress', job.job_id))
+            except websockets.exceptions.ConnectionClosed:
+                job.cancel()
+        
+        async def on_done(job, results, error):
+            await self.finish_sniff_rules_batch(websocket, job, collected, len(pending), skipped, error)
+        
+        try:
+            job = self.job_manager.submit(
+                'sniff', self.get_owner(websocket),
+                lambda job: self.spider_tool.sniff_rules_batch(
+                    pending, on_result=lambda item, rules: on_item(job, item, rules), progress=job.report_progress),
+                on_progress=on_progress, on_done=on_done, connection=websocket
+            )
+        except JobLimitExceeded as e:
+            await websocket.send(C2SPackageHelper.error(f"批量嗅探规则失败: {str(e)}"))
+            return
+        
+        await websocket.send(C2SPackageHelper.sniff_progress(job.job_id, 'queued', 0, f"0/{len(pending)}"))
+    
+    async def finish_sniff_rules_batch(self, websocket, job, collected, total, skipped, error):
+        """
+        批量嗅探结束后在单个事务中保存规则，并发送汇总结果
+        """
+        try:
+            saved = self.db.add_spider_rules(collected) if collected else 0
+            for domain in {rules['domain'] for rules in collected}:
+                self.generalize_domain_rules(domain)
+            
+            if isinstance(error, JobCancelled):
+                self.log(f"批量嗅探已取消: 已保存规则={saved}", 'INFO')
+                await websocket.send(C2SPackageHelper.sniff_cancelled(job.job_id))
+                return
+            
+            if error is not None:
+                raise error
+            
+            await websocket.send(C2SPackageHelper.success("sniff_rules_batch_response", {
+                'job_id': job.job_id,
+                'total': total + len(skipped),
+                'succeeded': len(collected),
+                'failed': total - len(collected),
+                'saved': saved,
+                'skipped': skipped
+            }))
+        
+        except websockets.exceptions.ConnectionClosed:
+            self.log(f"批量嗅探结果未发送，客户端已断开: 任务ID={job.job_id}", 'WARNING')
+        
+        except Exception as e:
+            self.log(f"批量嗅探规则失败: 任务ID={job.job_id} - 错误: {str(e)}", 'ERROR')
+            await websocket.send(C2SPackageHelper.error(f"批量嗅探规则失败: {str(e)}"))
+    
+    async def handle_cancel_job(self, websocket, data):
+        """
+        处理取消后台任务（嗅探、正文提取）请求
+        """
+        job_id = data.get('job_id')
+        
+        if not job_id:
+            await websocket.send(C2SPackageHelper.error("缺少任务ID"))
+            return
+        
+        if not self.job_manager.cancel(job_id, owner=self.get_owner(websocket)):
+            await websocket.send(C2SPackageHelper.error("未找到该任务"))
+    
+    async def handle_extract_articles(self, websocket, data):
+        """
+        处理批量正文提取请求
+        按 record_ids（数据记录）或 urls 查找适用的爬虫规则，在后台并发抓取并提取，
+        过程中推送 extract_progress，结束后将结果写回数据记录并发送 extract_articles_response
+        """
+        record_ids = data.get('record_ids', [])
+        urls = data.get('urls', [])
+        
+        if not record_ids and not urls:
+            await websocket.send(C2SPackageHelper.error("缺少record_ids或urls参数"))
+            return
+        
+        # 在事件循环线程中查询规则（经规则缓存），工作线程只负责抓取和解析
+        targets = [{'record_id': record[0], 'url': record[4]} for record in self.db.get_data_records_by_ids(record_ids)]
+        targets += [{'url': url} for url in urls]
+        
+        items = []
+        unmatched = []
+        for target in targets:
+            rule = self.rule_cache.find(target['url'])
+            if rule:
+                items.append(dict(target, rule=rule))
+            else:
+                unmatched.append(dict(target, success=False, error='未找到适用的爬虫规则'))
+        
+        self.log(f"开始批量正文提取: 可提取={len(items)}, 无规则={len(unmatched)}, 规则缓存={self.rule_cache.get_stats()}", 'INFO')
+        
+        async def on_progress(job, stage, percent, message):
+            try:
+                # 未发送的进度包只保留最新的一条
+                await websocket.send(C2SPackageHelper.extract_progress(job.job_id, stage, percent, message),
+                                     coalesce_key=('progress', job.job_id))
+            except websockets.exceptions.ConnectionClosed:
+                job.cancel()
+        
+        async def on_done(job, results, error):
+            await self.finish_extract_articles(websocket, job, results, unmatched, error)
+        
+        try:
+            job = self.job_manager.submit(
+                'extract', self.get_owner(websocket),
+                lambda job: self.article_extractor.extract_articles(items, progress=job.report_progress),
+                on_progress=on_progress, on_done=on_done, connection=websocket
+            )
+        except JobLimitExceeded as e:
+            await websocket.send(C2SPackageHelper.error(f"正文提取失败: {str(e)}"))
+            return
+        
+        await websocket.send(C2SPackageHelper.extract_progress(job.job_id, 'queued', 0, f"0/{len(items)}"))
+    
+    async def finish_extract_articles(self, websocket, job, results, unmatched, error):
+        """
+        正文提取任务结束后写回数据库并发送结果
+        """
+        try:
+            if isinstance(error, JobCancelled):
+                self.log(f"正文提取已取消: 任务ID={job.job_id}", 'INFO')
+                await websocket.send(C2SPackageHelper.extract_cancelled(job.job_id))
+                return
+            
+            if error is not None:
+                raise error
+            
+            articles = [(result['record_id'], result['title'], result['content'], result['image_url'])
+                        for result in results if result['success'] and 'record_id' in result]
+            if articles and not self.db.update_data_record_articles(articles):
+                await websocket.send(C2SPackageHelper.error("保存正文提取结果失败"))
+                return
+            
+            await websocket.send(C2SPackageHelper.success("extract_articles_response", {
+                'job_id': job.job_id,
+                'updated': len(articles),
+                'results': results + unmatched
+            }))
+        
+        except websockets.exceptions.ConnectionClosed:
+            self.log(f"正文提取结果未发送，客户端已断开: 任务ID={job.job_id}", 'WARNING')
+        
+        except Exception as e:
+            self.log(f"正文提取失败: 任务ID={job.job_id} - 错误: {str(e)}", 'ERROR')
+            await websocket.send(C2SPackageHelper.error(f"正文提取失败: {str(e)}"))
+    
+    def generalize_domain_rules(self, domain):
+        """
+        归纳并保存某个域名的规则
+        
+        Returns:
+            list: 归纳规则列表，样本不足时为空
+        """
+        generalized = self.rule_generalizer.generalize(self.db.get_spider_rules_by_domain(domain))
+        self.db.replace_domain_rules(domain, generalized)
+        return generalized
+    
+    async def handle_generalize_rules(self, websocket, data):
+        """
+        处理域名规则归纳请求
+        """
+        domain = data.get('domain')
+        
+        if not domain:
+            await websocket.send(C2SPackageHelper.error("缺少domain参数"))
+            return
+        
+        try:
+            self.generalize_domain_rules(domain)
+            await websocket.send(C2SPackageHelper.success("generalize_rules_response", {
+                'domain': domain,
+                'rules': [self.format_domain_rule(rule) for rule in self.db.get_domain_rules(domain)]
+            }))
+        
+        except Exception as e:
+            self.log(f"归纳域名规则失败: 域名={domain} - 错误: {str(e)}", 'ERROR')
+            await websocket.send(C2SPackageHelper.error(f"归纳域名规则失败: {str(e)}"))
+    
+    def format_domain_rule(self, rule):
+        """
+        将域名归纳规则元组转换为字典
+        """
+        formatted = self.format_spider_rule(rule)
+        formatted['url_pattern'] = formatted.pop('source_url')
+        formatted['confidence'] = rule[9]
+        formatted['sample_count'] = rule[10]
+        return formatted
+    
+    def format_spider_rule(self, rule):
+        """
+        将爬虫规则元组转换为字典
+        """
+        return {
+            'id': rule[0],
+            'source_url': rule[1],
+            'domain': rule[2],
+            'title_xpath': rule[3],
+            'content_xpath': rule[4],
+            'image_xpath': rule[5],
+            'request_headers': rule[8],
+            'created_at': rule[6],
+            'updated_at': rule[7]
+        }
+    
     async def handle_get_spider_rules(self, websocket, data):
         """
         处理获取爬虫规则请求
@@ -449,37 +1248,14 @@ class WebSocketServer:
                 rule = self.db.get_spider_rule(source_url)
                 if rule:
                     await websocket.send(C2SPackageHelper.success("get_spider_rules_response", {
-                    'rule': {
-                        'id': rule[0],
-                        'source_url': rule[1],
-                        'domain': rule[2],
-                        'title_xpath': rule[3],
-                        'content_xpath': rule[4],
-                        'image_xpath': rule[5],
-                        'request_headers': rule[8],
-                        'created_at': rule[6],
-                        'updated_at': rule[7]
-                    }
+                    'rule': self.format_spider_rule(rule)
                 }))
                 else:
                     await websocket.send(C2SPackageHelper.error("未找到该URL的爬虫规则"))
                     
             elif domain:
                 # 获取指定域名的所有规则
-                rules = self.db.get_spider_rules_by_domain(domain)
-                formatted_rules = []
-                for rule in rules:
-                    formatted_rules.append({
-                        'id': rule[0],
-                        'source_url': rule[1],
-                        'domain': rule[2],
-                        'title_xpath': rule[3],
-                        'content_xpath': rule[4],
-                        'image_xpath': rule[5],
-                        'request_headers': rule[8],
-                        'created_at': rule[6],
-                        'updated_at': rule[7]
-                    })
+                formatted_rules = [rule.to_dict() for rule in self.rule_cache.by_domain(domain)]
                 await websocket.send(C2SPackageHelper.success("get_spider_rules_response", {
                     'rules': formatted_rules
                 }))
@@ -499,15 +1275,54 @@ class WebSocketServer:
         启动WebSocket服务器
         """
         try:
+            # 使用自定义的 permessage-deflate 扩展代替 websockets 默认的压缩配置
+            extensions = []
+            if self.compression:
+                extensions.append(ThresholdDeflateFactory(
+                    min_size=self.compression_min_size,
+                    window_bits=self.compression_window_bits,
+                    mem_level=self.compression_mem_level,
+                    level=self.compression_level,
+                    stats=self.compression_stats
+                ))
             server = await websockets.serve(
                 self.handle_client,
                 self.host,
-                self.port
+                self.port,
+                ping_interval=self.ping_interval,
+                ping_timeout=self.ping_timeout,
+                max_size=self.max_message_size,
+                compression=None,
+                extensions=extensions,
+                reuse_port=self.reuse_port
             )
+            self.server = server
             
             self.log(f"WebSocket服务器已成功启动，地址: ws://{self.host}:{self.port}", 'INFO')
+            self.log(f"连接配置: 心跳间隔={self.ping_interval}s, 心跳超时={self.ping_timeout}s, "
+                     f"最大消息={self.max_message_size}字节, 最大连接数={self.max_connections}, "
+                     f"单IP最大连接数={self.max_connections_per_ip}, 空闲超时={self.idle_timeout}s", 'INFO')
+            if self.compression:
+                self.log(f"消息压缩: permessage-deflate, 最小压缩大小={self.compression_min_size}字节, "
+                         f"窗口={self.compression_window_bits}位, memLevel={self.compression_mem_level}, "
+                         f"压缩级别={self.compression_level}", 'INFO')
+            else:
+                self.log("消息压缩: 已关闭", 'INFO')
+            
+            # 多进程模式：开始接收其他工作进程的通知，并告知 supervisor 本进程已就绪
+            if self.peers is not None:
+                self.peers.attach(asyncio.get_running_loop())
+                self.peers.ready()
             
-            await server.wait_closed()
+            background_tasks = [
+                asyncio.create_task(self.compact_data_changes_periodically()),
+                asyncio.create_task(self.reap_idle_connections())
+            ]
+            try:
+                await server.wait_closed()
+            finally:
+                for task in background_tasks:
+                    task.cancel()
         
         except Exception as e:
             self.log(f"WebSocket服务器启动失败: {str(e)}", 'CRITICAL')
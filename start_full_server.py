@@ -8,9 +8,8 @@
 
 import sys
 import os
+import argparse
 import asyncio
-import http.server
-import socketserver
 import threading
 
 # 检查是否在虚拟环境中运行
@@ -33,13 +32,6 @@ HTTP_DIRECTORY = os.path.join(project_root, 'client')
 WS_HOST = 'localhost'
 WS_PORT = 8000
 
-class HTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
-    """
-    自定义 HTTP 请求处理程序，确保静态文件从正确的目录加载
-    """
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, directory=HTTP_DIRECTORY, **kwargs)
-
 class HTTPThread(threading.Thread):
     """
     用于在单独线程中运行 HTTP 服务器的类
@@ -47,8 +39,9 @@ class HTTPThread(threading.Thread):
     def __init__(self):
         threading.Thread.__init__(self)
         
-        # 创建 HTTP 服务器，使用自定义请求处理程序
-        self.httpd = socketserver.TCPServer(("", HTTP_PORT), HTTPRequestHandler)
+        # 创建多线程静态文件服务器（启动时预先计算 ETag 和压缩版本）
+        from server.static_server import StaticHTTPServer
+        self.httpd = StaticHTTPServer(("", HTTP_PORT), HTTP_DIRECTORY)
         
         print(f"HTTP 服务器配置完成，端口: {HTTP_PORT}")
         print(f"静态文件目录: {HTTP_DIRECTORY}")
@@ -92,6 +85,22 @@ async def start_websocket_server():
     except Exception as e:
         print(f"启动 WebSocket 服务器失败: {e}")
 
+def run_supervisor(workers):
+    """
+    多进程模式：HTTP 服务器在本进程中运行，WebSocket 服务由 supervisor 管理的多个工作进程共享端口提供
+    """
+    os.chdir(project_root)
+    from server.supervisor import Supervisor
+    
+    http_thread = HTTPThread()
+    http_thread.start()
+    try:
+        Supervisor(host=WS_HOST, port=WS_PORT, workers=workers).run()
+    finally:
+        http_thread.stop()
+        http_thread.join()
+        print("所有服务器已停止")
+
 async def main():
     """
     主函数，启动 HTTP 服务器和 WebSocket 服务器
@@ -117,11 +126,19 @@ async def main():
         print(f"启动服务器失败: {e}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="智能瞭望系统 完整服务器启动程序")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="WebSocket 工作进程数，大于1时以多进程模式运行（需要系统支持 SO_REUSEPORT）")
+    args = parser.parse_args()
+    
     print("智能瞭望系统 完整服务器启动程序")
     print("=" * 60)
     
     try:
-        asyncio.run(main())
+        if args.workers > 1:
+            run_supervisor(args.workers)
+        else:
+            asyncio.run(main())
     except KeyboardInterrupt:
         print("\n程序已退出")
     except Exception as e:
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试正文批量提取引擎（使用本地HTTP服务器，不访问外网）：
+按编译后的规则提取标题、正文段落和图片地址，以及批量并发提取的结果顺序和进度
+"""
+
+import sys
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from server.article_extractor import ArticleExtractor
+from server.html_document import ParsedDocument
+from server.http_client import HttpClient
+from server.page_archive import PageArchive
+from server.rule_cache import CompiledRule
+
+ARTICLE = '''<html><head><title>雅安新闻网</title><style>p { color: red; }</style></head><body>
+<div class="nav"><a href="/">首页</a></div>
+<h1>  雅安市召开
+    新闻发布会 </h1>
+<div id="content">
+  <p>第一段正文。</p>
+  <script>var tracking = 1;</script>
+  <p>第二段<strong>强调</strong>正文。</p>
+  <div class="pic"><img data-src="../images/1.jpg"></div>
+</div>
+</body></html>'''
+
+
+def make_rule(title_xpath, content_xpath, image_xpath=None, request_headers=None):
+    """
+    按 SPIDER_RULE_COLUMNS 顺序构造规则并编译
+    """
+    return CompiledRule((1, 'http://example.com/news/1.html', 'example.com', title_xpath, content_xpath, image_xpath,
+                         '2024-01-01 00:00:00', '2024-01-01 00:00:00', request_headers))
+
+
+class Handler(BaseHTTPRequestHandler):
+    """
+    /news/<n>.html 返回文章页面，其他路径返回404
+    """
+
+    def do_GET(self):
+        if not self.path.startswith('/news/'):
+            self.send_error(404)
+            return
+        body = ARTICLE.replace('新闻发布会', f'新闻发布会{self.path}').encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_extract_document():
+    """标题合并空白，正文按文本片段分段并跳过脚本，图片地址按页面URL补全"""
+    with tempfile.TemporaryDirectory() as directory:
+        extractor = ArticleExtractor(http_client=HttpClient(), archive=PageArchive(directory))
+    document = ParsedDocument.from_html(ARTICLE)
+    rule = make_rule('//h1', '//div[@id="content"]', '//div[@class="pic"]/img')
+    article = extractor.extract_document(document, rule, 'http://example.com/news/2024/1.html')
+    assert article == {
+        'title': '雅安市召开 新闻发布会',
+        'content': '第一段正文。\n第二段\n强调\n正文。',
+        'image_url': 'http://example.com/news/images/1.jpg'
+    }, article
+
+    # XPath 返回字符串（text()、@src）时直接使用
+    rule = make_rule('//title/text()', '//div[@id="content"]/p/text()', '//img/@data-src')
+    article = extractor.extract_document(document, rule, 'http://example.com/news/1.html')
+    assert article['title'] == '雅安新闻网' and article['content'] == '第一段正文。\n第二段\n正文。'
+    assert article['image_url'] == 'http://example.com/images/1.jpg'
+
+    # 非法或未匹配的XPath返回空字段
+    rule = make_rule('//h1[', '//article')
+    assert rule.title is None
+    assert extractor.extract_document(document, rule, 'http://example.com/') == {'title': '', 'content': '', 'image_url': ''}
+
+
+def test_extract_articles():
+    """批量提取的结果与输入顺序一致、保留调用方附带的字段，失败项带有错误信息，每完成一项报告一次进度"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            extractor = ArticleExtractor(http_client=HttpClient(host_rate=100, host_burst=10, retries=0),
+                                         max_workers=4, archive=PageArchive(directory))
+            rule = make_rule('//h1', '//div[@id="content"]', '//img', {'User-Agent': 'test'})
+            items = [{'url': f'{base}/news/{i}.html', 'rule': rule, 'record_id': i} for i in range(5)]
+            items.append({'url': f'{base}/missing', 'rule': rule, 'record_id': 5})
+            reports = []
+            results = extractor.extract_articles(items, progress=lambda stage, percent, message: reports.append(percent))
+
+            assert [result['record_id'] for result in results] == list(range(6))
+            assert all(result['success'] for result in results[:5]) and not results[5]['success']
+            assert results[3]['title'] == '雅安市召开 新闻发布会/news/3.html'
+            assert results[3]['image_url'] == f'{base}/images/1.jpg'
+            assert '404' in results[5]['error']
+            assert reports[-1] == 100 and len(reports) == 6
+            # 成功抓取的页面写入存档
+            assert len(extractor.archive.pages(base[len('http://'):])) == 5
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    ArticleExtractor.log = lambda self, message, level='INFO': None
+    tests = [test_extract_document, test_extract_articles]
+    for test in tests:
+        test()
+        print(f"✓ {test.__name__}")
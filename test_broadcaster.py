@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试数据变更广播：变更不发给发起变更的连接和未订阅的连接，同一窗口内新增又删除的记录不发送
+"""
+
+import asyncio
+import json
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from server.broadcaster import Broadcaster
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.packets = []
+
+    async def send(self, packet):
+        self.packets.append(json.loads(packet))
+
+
+def test_broadcast_excludes_origin_and_merges_changes():
+    """变更推送给其他订阅者；同一窗口内新增又删除的记录不发送"""
+    async def run():
+        broadcaster = Broadcaster(coalesce_delay=0.01)
+        origin, other, unsubscribed = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+        broadcaster.subscribe(origin, ['data_records'])
+        broadcaster.subscribe(other, ['data_records', 'unknown'])
+
+        broadcaster.publish_added('data_records', [{'id': 1}, {'id': 2}], origin=origin)
+        broadcaster.publish_deleted('data_records', [2, 7], origin=origin)
+        await asyncio.sleep(0.05)
+
+        assert origin.packets == [] and unsubscribed.packets == []
+        assert [(packet['type'], packet['data']) for packet in other.packets] == [
+            ('records_added', {'topic': 'data_records', 'records': [{'id': 1}]}),
+            ('records_deleted', {'topic': 'data_records', 'ids': [7]}),
+        ]
+
+        # 取消订阅后不再收到
+        broadcaster.unsubscribe(other)
+        broadcaster.publish_added('data_records', [{'id': 3}])
+        await asyncio.sleep(0.05)
+        assert len(other.packets) == 2 and [packet['data']['records'] for packet in origin.packets] == [[{'id': 3}]]
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    tests = [test_broadcast_excludes_origin_and_merges_changes]
+    for test in tests:
+        test()
+        print(f"✓ {test.__name__}")
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试按大小阈值的 permessage-deflate：小于阈值的消息不压缩（RSV1 不置位），
+不小于阈值的消息压缩后客户端可以正常解压，以及与真实客户端协商后的收发
+"""
+
+import asyncio
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import websockets
+from websockets.extensions.permessage_deflate import PerMessageDeflate
+from websockets.frames import Frame, Opcode
+
+from server.compression import ThresholdPerMessageDeflate, ThresholdDeflateFactory, CompressionStats
+
+
+def test_threshold_frames():
+    """小消息原样发送，大消息压缩且可被对端解压"""
+    stats = CompressionStats()
+    server = ThresholdPerMessageDeflate(False, False, 12, 12, {'memLevel': 5}, min_size=100, stats=stats)
+    client = PerMessageDeflate(False, False, 12, 12)
+
+    small = Frame(Opcode.TEXT, b'{"type":"searching"}')
+    encoded = server.encode(small)
+    assert not encoded.rsv1 and encoded.data == small.data
+
+    large = Frame(Opcode.TEXT, ('{"records":[' + ','.join(['{"title":"雅安市人民政府"}'] * 200) + ']}').encode('utf-8'))
+    encoded = server.encode(large)
+    assert encoded.rsv1 and len(encoded.data) < len(large.data)
+    assert client.decode(encoded).data == large.data
+
+    assert (stats.skipped, stats.compressed, stats.raw_bytes) == (1, 1, len(large.data))
+
+
+def test_negotiated_connection():
+    """客户端协商 permessage-deflate 后，大小消息都能正确接收"""
+    async def run():
+        stats = CompressionStats()
+        small = 'x' * 50
+        large = '雅安' * 2000
+
+        async def handler(websocket):
+            await websocket.send(small)
+            await websocket.send(large)
+            await websocket.wait_closed()
+
+        extensions = [ThresholdDeflateFactory(min_size=1024, stats=stats)]
+        async with websockets.serve(handler, 'localhost', 0, compression=None, extensions=extensions) as server:
+            port = next(iter(server.sockets)).getsockname()[1]
+            async with websockets.connect(f'ws://localhost:{port}') as client:
+                assert await client.recv() == small
+                assert await client.recv() == large
+
+        assert stats.to_dict()['connections'] == 1
+        assert stats.skipped == 1 and stats.compressed == 1
+        assert stats.to_dict()['ratio'] > 1
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    tests = [test_threshold_frames, test_negotiated_connection]
+    for test in tests:
+        test()
+        print(f"✓ {test.__name__}")
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试数据管理页面的增量同步：变更日志的增量查询（since_version），以及变更日志压缩后回退为全量同步
+"""
+
+import sys
+import os
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from server.database import Database
+
+
+def test_delta_sync_since_version():
+    """增量同步只返回指定版本之后新增/修改的记录和删除的ID"""
+    with tempfile.TemporaryDirectory() as directory:
+        db = Database(os.path.join(directory, 'test.db'))
+        try:
+            start = db.get_data_version()
+            first = db.add_data_record('标题1', '摘要', '', 'http://example.com/1', 'test')
+            second = db.add_data_record('标题2', '摘要', '', 'http://example.com/2', 'test')
+            version, records, deleted = db.get_data_changes(start)
+            assert version == db.get_data_version() > start
+            assert sorted(record[0] for record in records) == [first, second] and deleted == []
+
+            # 之后的增量只包含删除
+            db.delete_data_record(first)
+            new_version, records, deleted = db.get_data_changes(version)
+            assert new_version > version and records == [] and deleted == [first]
+
+            # 从起始版本同步：新增后又删除的记录只出现在删除列表中
+            _, records, deleted = db.get_data_changes(start)
+            assert [record[0] for record in records] == [second] and deleted == [first]
+
+            # 已是最新版本时增量为空
+            assert db.get_data_changes(new_version) == (new_version, [], [])
+        finally:
+            db.close()
+
+
+def test_compacted_or_invalid_version_requires_snapshot():
+    """变更日志被压缩到客户端版本之后，或版本号超过当前版本时返回 None（改为全量同步）"""
+    with tempfile.TemporaryDirectory() as directory:
+        db = Database(os.path.join(directory, 'test.db'))
+        try:
+            start = db.get_data_version()
+            for i in range(5):
+                db.add_data_record(f'标题{i}', '', '', f'http://example.com/{i}', 'test')
+            assert db.compact_data_changes(keep=2) == 3
+            version = db.get_data_version()
+            assert db.get_data_changes(start) is None
+            assert db.get_data_changes(version - 2) is not None
+            assert db.get_data_changes(version + 1) is None
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    tests = [test_delta_sync_since_version, test_compacted_or_invalid_version_requires_snapshot]
+    for test in tests:
+        test()
+        print(f"✓ {test.__name__}")
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试 SpiderTool 的规则提取（不访问外网）：每个页面只解析一次、所有提取器共享同一个 ParsedDocument，
+以及正文块评分（排除导航、侧栏、页脚，链接密度高的区块不被选中，优先选择标题附近的正文）
+"""
+
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from server.html_document import ParsedDocument
+from server.spider_tool import SpiderTool
+
+LOCAL_HTML = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test_local_html.html')
+LOCAL_TITLE = 'Python教程：从入门到精通'
+
+PARAGRAPH = '<p>' + '雅安市今日召开新闻发布会，介绍城市建设最新进展情况。' * 4 + '</p>'
+NEWS_PAGE = ('<html><body><div class="wrapper"><div class="nav">'
+             + ''.join(f'<a href="/{i}">导航链接第{i}项栏目名称</a>' for i in range(40)) + '</div>'
+             + '<div id="main"><h1>雅安新闻标题</h1><div id="content">' + PARAGRAPH * 8 + '</div></div>'
+             + '<div class="sidebar">' + PARAGRAPH * 3 + '</div><footer>' + PARAGRAPH * 10 + '</footer>'
+             + '</div></body></html>')
+
+
+def count_parses():
+    """
+    替换 ParsedDocument.from_html，记录解析次数
+
+    Returns:
+        tuple: (调用记录列表, 恢复函数)
+    """
+    original = ParsedDocument.__dict__['from_html']
+    calls = []
+
+    def from_html(cls, html_content):
+        calls.append(len(html_content))
+        return original.__func__(cls, html_content)
+
+    ParsedDocument.from_html = classmethod(from_html)
+    return calls, lambda: setattr(ParsedDocument, 'from_html', original)
+
+
+def test_extract_rules_parses_once():
+    """extract_rules 只解析一次HTML，标题、正文、图片提取器都不再各自解析，也不构建BeautifulSoup视图"""
+    with open(LOCAL_HTML, encoding='utf-8') as f:
+        html = f.read()
+    spider_tool = SpiderTool()
+    calls, restore = count_parses()
+    try:
+        rules = spider_tool.extract_rules('http://example.com/python.html', html, LOCAL_TITLE)
+        assert calls == [len(html)], calls
+
+        document = ParsedDocument.from_html(html)
+        del calls[:]
+        assert spider_tool.extract_rules('http://example.com/python.html', document, LOCAL_TITLE) == rules
+        assert calls == [] and document._soup is None
+    finally:
+        restore()
+
+    assert rules['domain'] == 'example.com'
+    assert rules['title_xpath'] == '/html/body/main/article/h1'
+    assert rules['content_xpath'] == '/html/body/main/article'
+    assert document.root.xpath(rules['title_xpath'])[0].text == LOCAL_TITLE
+
+
+def test_sniff_rules_reuses_fetched_document():
+    """sniff_rules 直接使用抓取时增量解析得到的文档，并按阶段报告进度"""
+    with open(LOCAL_HTML, 'rb') as f:
+        document = ParsedDocument.from_chunks([f.read()])
+    spider_tool = SpiderTool()
+    spider_tool.fetch_page = lambda url: {'content': document, 'headers': {'Content-Type': 'text/html'}}
+    stages = []
+    calls, restore = count_parses()
+    try:
+        rules = spider_tool.sniff_rules('http://example.com/python.html', LOCAL_TITLE,
+                                        progress=lambda stage, percent: stages.append((stage, percent)))
+    finally:
+        restore()
+    assert calls == []
+    assert rules['title_xpath'] == '/html/body/main/article/h1' and rules['request_headers'] == spider_tool.headers
+    assert [stage for stage, _ in stages] == ['fetching', 'parsing', 'title', 'content', 'image']
+    assert [percent for _, percent in stages] == sorted(percent for _, percent in stages)
+
+
+def test_content_block_scoring():
+    """正文取文本最集中的区块，而不是包含它的外层容器；导航、侧栏、页脚不参与评分"""
+    spider_tool = SpiderTool()
+    document = ParsedDocument.from_html(NEWS_PAGE)
+    content_xpath = spider_tool.extract_content_xpath(document)
+    [content] = document.root.xpath(content_xpath)
+    assert content.get('id') == 'content'
+    # 路径与 lxml getpath 一致，不依赖文本匹配反查节点
+    assert content_xpath == document.root.getroottree().getpath(content) == '/html/body/div/div[2]/div'
+    assert spider_tool.extract_content_xpath(document, '/html/body/div/div[2]/h1') == content_xpath
+
+    # 链接密度高的“相关阅读”区块文本更长也不会被选中
+    links = ''.join(f'<p><a href="/{i}">' + '相关阅读链接标题文字' * 3 + '</a></p>' for i in range(30))
+    page = f'<html><body><h1>标题</h1><div id="content">{PARAGRAPH * 5}</div><div id="links">{links}</div></body></html>'
+    assert spider_tool.extract_content_xpath(page) == '/html/body/div[1]'
+
+    # 文本太短时没有候选
+    assert spider_tool.extract_content_xpath('<html><body><div><p>短</p></div></body></html>') is None
+
+
+def test_content_near_title_preferred():
+    """得分接近最高分时，优先选择标题之后的正文区块"""
+    article = '<div id="article">' + PARAGRAPH * 6 + '</div>'
+    digest = '<div id="digest">' + PARAGRAPH * 7 + '</div>'
+    page = f'<html><body>{digest}<h1>雅安新闻标题</h1>{article}</body></html>'
+    spider_tool = SpiderTool()
+    assert spider_tool.extract_content_xpath(page) == '/html/body/div[1]'
+    assert spider_tool.extract_content_xpath(page, '/html/body/h1') == '/html/body/div[2]'
+
+
+if __name__ == "__main__":
+    tests = [test_extract_rules_parses_once, test_sniff_rules_reuses_fetched_document, test_content_block_scoring,
+             test_content_near_title_preferred]
+    for test in tests:
+        test()
+        print(f"✓ {test.__name__}")
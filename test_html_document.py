@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试 ParsedDocument：element_path 与 lxml getpath 的结果一致，
+SpiderTool 和 WebSniffer 对同一元素生成相同的位置路径，以及增量解析（from_chunks）的字符集处理
+"""
+
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from server.html_document import ParsedDocument
+from server.spider_tool import SpiderTool
+from server.sniffer import WebSniffer
+
+PAGE = '''<html><head><title>雅安新闻</title></head><body>
+<!-- 导航 -->
+<div class="nav"><a href="/">首页</a><a href="/news">新闻</a></div>
+<div><h1>标题</h1><p>第一段</p><!-- 注释 --><p>第二段<span>强调</span></p><p>第三段</p></div>
+<div><table><tr><td>1</td><td>2</td></tr></table></div>
+</body></html>'''
+
+
+def test_element_path_matches_getpath():
+    """所有元素的位置路径与 getroottree().getpath() 一致，且能唯一定位该元素"""
+    document = ParsedDocument.from_html(PAGE)
+    tree = document.root.getroottree()
+    elements = [element for element in document.elements() if isinstance(element.tag, str)]
+    for element in elements:
+        path = document.element_path(element)
+        assert path == tree.getpath(element), (path, tree.getpath(element))
+        assert document.root.xpath(path) == [element]
+    assert document.element_path(document.root.find('.//h1')) == '/html/body/div[2]/h1'
+    assert document.element_path(document.root.find('.//span')) == '/html/body/div[2]/p[2]/span'
+
+
+def test_sniffers_share_element_path():
+    """SpiderTool 与 WebSniffer 对没有唯一 id/class 的元素生成相同的路径"""
+    document = ParsedDocument.from_html(PAGE)
+    spider_tool = SpiderTool()
+    sniffer = WebSniffer()
+    for element in document.root.iter('p', 'td', 'h1'):
+        assert spider_tool.get_element_xpath(document, element) == sniffer.get_element_xpath(document, element)
+
+    assert spider_tool.extract_title_xpath(document, '标题') == '/html/body/div[2]/h1'
+
+
+def split_bytes(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def test_from_chunks_detects_encoding():
+    """按 <meta charset> 或响应声明的字符集解析，字节块边界落在多字节字符中间也能正确解析"""
+    page = PAGE.replace('<head>', '<head><meta charset="gbk">')
+    document = ParsedDocument.from_chunks(split_bytes(page.encode('gbk'), 7))
+    assert document.root.findtext('.//h1') == '标题'
+    assert document.element_path(document.root.find('.//h1')) == '/html/body/div[2]/h1'
+
+    # 响应声明的字符集优先于推断
+    document = ParsedDocument.from_chunks(split_bytes(PAGE.encode('gb18030'), 5000), encoding='gb18030')
+    assert document.root.findtext('.//title') == '雅安新闻'
+
+    # 没有声明时按UTF-8解码
+    assert ParsedDocument.from_chunks(split_bytes(PAGE.encode('utf-8'), 3)).root.findtext('.//h1') == '标题'
+    assert ParsedDocument.from_chunks([]).root is None
+
+
+if __name__ == "__main__":
+    tests = [test_element_path_matches_getpath, test_sniffers_share_element_path, test_from_chunks_detects_encoding]
+    for test in tests:
+        test()
+        print(f"✓ {test.__name__}")
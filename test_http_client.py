@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试共享HTTP客户端（使用本地HTTP服务器，不访问外网）：
+带退避的重试与 Retry-After、令牌桶限速、按主机划分的连接池、压缩传输的透明解压与字节统计，
+流式读取的字节上限、内容类型过滤，以及嗅探抓取时边下载边存档原始字节
+"""
+
+import sys
+import os
+import gzip
+import tempfile
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from server.http_client import ACCEPT_ENCODING, HttpClient, TokenBucket, UnsupportedContentType
+from server.html_document import ParsedDocument
+from server.page_archive import PageArchive
+from server.spider_tool import SpiderTool
+
+GBK_PAGE = ('<html><head><title>雅安新闻</title></head><body><h1>雅安市新闻标题</h1>'
+            + '<p>正文段落</p>' * 20000 + '</body></html>').encode('gbk')
+
+
+class Handler(BaseHTTPRequestHandler):
+    """
+    按路径返回预设响应：ROUTES[path] = (状态码, 响应头, 正文)，
+    为列表时依次返回其中的响应（最后一个重复使用）；REQUESTS 记录收到的 (路径, 请求头)
+    """
+
+    ROUTES = {}
+    REQUESTS = []
+
+    def do_GET(self):
+        self.REQUESTS.append((self.path, dict(self.headers)))
+        route = self.ROUTES[self.path]
+        if isinstance(route, list):
+            route = route.pop(0) if len(route) > 1 else route[0]
+        status, headers, body = route
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def hits(path):
+    return sum(1 for request_path, _ in Handler.REQUESTS if request_path == path)
+
+
+def test_retry_with_backoff():
+    """可重试的状态码按退避间隔重试，重试用尽后返回最后一次响应；其他状态码不重试"""
+    server, base = start_server()
+    Handler.ROUTES['/flaky'] = [(503, {}, b''), (503, {}, b''), (200, {}, b'ok')]
+    Handler.ROUTES['/down'] = (503, {}, b'')
+    Handler.ROUTES['/missing'] = (404, {}, b'')
+    try:
+        client = HttpClient(retries=3, backoff=0.05, host_rate=100, host_burst=10)
+        started = time.monotonic()
+        response = client.get(base + '/flaky')
+        assert response.status_code == 200 and response.content == b'ok' and hits('/flaky') == 3
+        # 退避间隔 0.05 + 0.1
+        assert time.monotonic() - started >= 0.15
+
+        stats = client.get_stats()[base[len('http://'):]]
+        assert stats['requests'] == 3 and stats['retries'] == 2 and stats['errors'] == 2
+
+        client = HttpClient(retries=1, backoff=0.01, host_rate=100, host_burst=10)
+        assert client.get(base + '/down').status_code == 503 and hits('/down') == 2
+        assert client.get(base + '/missing').status_code == 404 and hits('/missing') == 1
+    finally:
+        server.shutdown()
+
+
+def test_retry_after():
+    """服务端的 Retry-After（秒）优先于退避间隔，且最多等待60秒"""
+    client = HttpClient(backoff=0.5)
+    assert [client.get_retry_delay(attempt) for attempt in range(3)] == [0.5, 1.0, 2.0]
+    assert client.get_retry_delay(0, types.SimpleNamespace(headers={'Retry-After': '3'})) == 3.0
+    assert client.get_retry_delay(0, types.SimpleNamespace(headers={'Retry-After': '600'})) == 60.0
+    # HTTP 日期格式不解析，按退避间隔等待
+    retry_after = {'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT'}
+    assert client.get_retry_delay(1, types.SimpleNamespace(headers=retry_after)) == 1.0
+
+
+def test_token_bucket_limits_rate():
+    """令牌桶容量内的请求不等待，之后按速率放行"""
+    bucket = TokenBucket(rate=20, capacity=2)
+    assert bucket.acquire() == 0.0 and bucket.acquire() == 0.0
+    started = time.monotonic()
+    waited = sum(bucket.acquire() for _ in range(3))
+    elapsed = time.monotonic() - started
+    assert waited >= 0.14 and elapsed >= 0.14, (waited, elapsed)
+
+
+def test_per_host_pools():
+    """每个主机独立的连接池、限速器和统计，host_overrides 按主机覆盖配置"""
+    server, base = start_server()
+    Handler.ROUTES['/page'] = (200, {'Content-Type': 'text/html'}, b'<html></html>')
+    port = server.server_address[1]
+    try:
+        client = HttpClient(host_connections=4, host_rate=100, host_burst=10,
+                            host_overrides={f'localhost:{port}': {'connections': 1, 'rate': 50, 'burst': 1}})
+        client.get(f'http://127.0.0.1:{port}/page')
+        client.get(f'http://localhost:{port}/page')
+        client.get(f'http://localhost:{port}/page')
+
+        default, override = client.hosts[f'127.0.0.1:{port}'], client.hosts[f'localhost:{port}']
+        assert default.session is not override.session
+        assert default.session.get_adapter(base)._pool_maxsize == 4
+        assert override.session.get_adapter(base)._pool_maxsize == 1
+        assert (default.bucket.rate, default.bucket.capacity) == (100, 10)
+        assert (override.bucket.rate, override.bucket.capacity) == (50, 1)
+        # 第二个请求等待令牌（容量为1，每秒50个）
+        assert override.stats.throttled_time > 0 and default.stats.throttled_time == 0
+
+        stats = client.get_stats()
+        assert stats[f'127.0.0.1:{port}']['requests'] == 1 and stats[f'localhost:{port}']['requests'] == 2
+        assert client.get_host_state(f'localhost:{port}') is override
+    finally:
+        server.shutdown()
+
+
+def test_gzip_response_decoded():
+    """统一声明 Accept-Encoding，gzip 响应透明解压，按主机和调用方分别记录线上与解压后字节数"""
+    server, base = start_server()
+    body = '<html><body>'.encode() + '<p>雅安新闻</p>'.encode() * 2000 + b'</body></html>'
+    compressed = gzip.compress(body)
+    Handler.ROUTES['/gzip'] = (200, {'Content-Type': 'text/html; charset=utf-8', 'Content-Encoding': 'gzip'}, compressed)
+    try:
+        client = HttpClient(host_rate=100, host_burst=10)
+        response = client.get(base + '/gzip', headers={'Accept-Encoding': 'identity', 'User-Agent': 'test'}, source='baidu')
+        assert response.content == body
+
+        _, headers = Handler.REQUESTS[-1]
+        assert headers['Accept-Encoding'] == ACCEPT_ENCODING and 'gzip' in ACCEPT_ENCODING
+        assert headers['User-Agent'] == 'test'
+
+        host = client.get_stats()[base[len('http://'):]]
+        assert host['wire_bytes'] == len(compressed) and host['decoded_bytes'] == len(body)
+        source = client.get_transfer_stats()['baidu']
+        assert source['requests'] == 1 and source['compression_ratio'] == len(body) / len(compressed)
+
+        # 流式读取同样解压，并在读取完成后记入调用方统计
+        response = client.open_stream(base + '/gzip', source='sniffer')
+        assert b''.join(client.iter_content(response, source='sniffer')) == body
+        source = client.get_transfer_stats()['sniffer']
+        assert source['wire_bytes'] == len(compressed) and source['decoded_bytes'] == len(body)
+    finally:
+        server.shutdown()
+
+
+def test_iter_content_caps_bytes():
+    """超过 max_bytes 的部分不读取，并标记 truncated"""
+    server, base = start_server()
+    Handler.ROUTES['/big'] = (200, {'Content-Type': 'text/html'}, b'<p>x</p>' * 40000)
+    try:
+        client = HttpClient()
+        response = client.open_stream(base + '/big')
+        assert sum(len(chunk) for chunk in client.iter_content(response, max_bytes=100000)) == 100000
+        assert response.truncated
+
+        response = client.open_stream(base + '/big')
+        assert sum(len(chunk) for chunk in client.iter_content(response, max_bytes=0)) == 320000
+        assert not response.truncated
+    finally:
+        server.shutdown()
+
+
+def test_content_type_gate():
+    """非HTML内容在读取正文前被拒绝；content_types=None 时不检查"""
+    server, base = start_server()
+    Handler.ROUTES['/file.pdf'] = (200, {'Content-Type': 'application/pdf'}, b'%PDF-1.4')
+    Handler.ROUTES['/page'] = (200, {'Content-Type': 'application/xhtml+xml; charset=utf-8'}, b'<html></html>')
+    try:
+        client = HttpClient()
+        try:
+            client.open_stream(base + '/file.pdf')
+        except UnsupportedContentType:
+            pass
+        else:
+            raise AssertionError('PDF 响应应被拒绝')
+        assert client.open_stream(base + '/file.pdf', content_types=None).status_code == 200
+        assert client.open_stream(base + '/page').status_code == 200
+    finally:
+        server.shutdown()
+
+
+def test_fetch_page_archives_raw_bytes():
+    """嗅探抓取时存档的是截断后的原始字节和响应声明的字符集，回放解析结果与抓取时一致"""
+    server, base = start_server()
+    Handler.ROUTES['/news/1.html'] = (200, {'Content-Type': 'text/html; charset=gbk'}, GBK_PAGE)
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            spider_tool = SpiderTool(max_bytes=64 * 1024)
+            spider_tool.archive = PageArchive(directory)
+            page = spider_tool.fetch_page(base + '/news/1.html')
+            assert page['content'].root.findtext('.//h1') == '雅安市新闻标题'
+
+            [(url, path, encoding)] = spider_tool.archive.pages(base[len('http://'):])
+            with open(path, 'rb') as f:
+                raw = f.read()
+            assert url == base + '/news/1.html' and encoding == 'gbk'
+            assert raw == GBK_PAGE[:64 * 1024]
+            assert ParsedDocument.from_chunks([raw], encoding=encoding).root.findtext('.//h1') == '雅安市新闻标题'
+    finally:
+        server.shutdown()
+
+
+def test_unfinished_stream_is_not_archived():
+    """调用方未读取完（如解析出错）时不存档不完整的页面"""
+    with tempfile.TemporaryDirectory() as directory:
+        archive = PageArchive(directory)
+        chunks = archive.save_chunks('http://example.com/a', iter([b'<html>', b'<body>', b'</body></html>']))
+        assert next(chunks) == b'<html>'
+        chunks.close()
+        assert archive.pages('example.com') == []
+        assert os.listdir(os.path.join(directory, 'example.com')) == []
+
+        assert b''.join(archive.save_chunks('http://example.com/b', [b'<html>', b'</html>'])) == b'<html></html>'
+        assert [page[0] for page in archive.pages('example.com')] == ['http://example.com/b']
+
+
+if __name__ == "__main__":
+    HttpClient.log = lambda self, message, level='INFO': None
+    tests = [test_retry_with_backoff, test_retry_after, test_token_bucket_limits_rate, test_per_host_pools,
+             test_gzip_response_decoded, test_iter_content_caps_bytes, test_content_type_gate,
+             test_fetch_page_archives_raw_bytes, test_unfinished_stream_is_not_archived]
+    for test in tests:
+        test()
+        print(f"✓ {test.__name__}")
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试连接发送队列：进度包按键合并、超过高水位时丢弃可合并的数据包、
+其他数据包无法入队时断开慢速客户端，以及发送任务异常时关闭连接
+"""
+
+import asyncio
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from server.outbound_queue import OutboundQueue, SLOW_CONSUMER_CLOSE_CODE, WRITER_ERROR_CLOSE_CODE
+
+
+class FakeWebSocket:
+    """
+    记录发送的数据包；gate 未打开时 send 一直等待，模拟接收缓慢的客户端
+    """
+
+    remote_address = ('127.0.0.1', 50000)
+
+    def __init__(self):
+        self.sent = []
+        self.gate = asyncio.Event()
+        self.close_code = None
+
+    async def send(self, packet):
+        await self.gate.wait()
+        if packet == 'fail':
+            raise TypeError('unexpected packet type')
+        self.sent.append(packet)
+
+    async def close(self, code=1000, reason=''):
+        self.close_code = code
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_coalesce_progress_packets():
+    """队列中尚未发送的同键数据包只保留最新的一条，顺序不变"""
+    async def run():
+        websocket = FakeWebSocket()
+        queue = OutboundQueue(websocket)
+        await queue.send('first')
+        await settle()
+        # 'first' 正在发送（阻塞），之后的数据包留在队列中
+        await queue.send('progress 10%', coalesce_key='job')
+        await queue.send('result')
+        await queue.send('progress 50%', coalesce_key='job')
+        websocket.gate.set()
+        await settle()
+        assert websocket.sent == ['first', 'progress 50%', 'result'], websocket.sent
+        assert queue.get_stats()['coalesced'] == 1
+        await queue.aclose()
+
+    asyncio.run(run())
+
+
+def test_overflow_drops_coalescable_then_disconnects():
+    """超过高水位时可合并的数据包被丢弃，不可合并的数据包导致断开慢速客户端"""
+    async def run():
+        websocket = FakeWebSocket()
+        queue = OutboundQueue(websocket, max_packets=3)
+        await queue.send('in flight')
+        await settle()
+        for i in range(3):
+            assert await queue.send(f'packet {i}')
+
+        assert not await queue.send('progress', coalesce_key='job')
+        assert not queue.closed
+        assert queue.get_stats()['dropped'] == 1
+
+        assert not await queue.send('must deliver')
+        await settle()
+        assert queue.closed
+        assert websocket.close_code == SLOW_CONSUMER_CLOSE_CODE
+        stats = queue.get_stats()
+        assert stats['slow_consumer'] and stats['depth'] == 0 and stats['dropped'] == 4
+        assert not await queue.send('after close')
+        await queue.aclose()
+
+    asyncio.run(run())
+
+
+def test_writer_error_closes_connection():
+    """发送任务遇到意外异常时关闭连接，不再接受新的数据包"""
+    async def run():
+        websocket = FakeWebSocket()
+        websocket.gate.set()
+        queue = OutboundQueue(websocket)
+        await queue.send('ok')
+        await queue.send('fail')
+        await queue.send('queued after failure')
+        await settle()
+        assert websocket.sent == ['ok']
+        assert queue.closed and queue.writer.done()
+        assert websocket.close_code == WRITER_ERROR_CLOSE_CODE
+        assert queue.get_stats()['dropped'] == 1
+        assert not await queue.send('after close')
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    tests = [test_coalesce_progress_packets, test_overflow_drops_coalescable_then_disconnects,
+             test_writer_error_closes_connection]
+    for test in tests:
+        test()
+        print(f"✓ {test.__name__}")
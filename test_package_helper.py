@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试 C2SPackageHelper 的数据包序列化：紧凑的UTF-8 JSON往返、预序列化的固定状态数据包、
+MessagePack 传输格式的往返与协商，以及预序列化数据包追加 request_id 后与直接序列化的结果一致
+"""
+
+import json
+import sys
+import os
+from datetime import datetime
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from server.C2SPackageHelper import (C2SPackageHelper, STATIC_PACKAGES, SUPPORTED_WIRE_FORMATS,
+                                     dumps, encode, splice_request_id)
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+RESULTS = [{'id': i, 'title': f'雅安市第{i}条新闻标题', 'summary': '雅安新闻摘要 "引号" \\ 反斜杠\n换行',
+            'url': f'http://www.yaan.gov.cn/news/{i}.html', 'score': 0.5 + i, 'tags': ['雅安', None, True]}
+           for i in range(3)]
+
+
+def test_json_round_trip_is_compact_utf8():
+    """JSON数据包不转义中文、不含多余空白，解码后与原数据一致"""
+    package = {'type': 'search_completed', 'data': {'results': RESULTS}}
+    text = dumps(package)
+    assert json.loads(text) == package
+    assert '雅安市第0条新闻标题' in text and '\\u' not in text
+    assert text == json.dumps(package, ensure_ascii=False, separators=(',', ':'))
+    assert len(text.encode('utf-8')) < len(json.dumps(package).encode('utf-8'))
+
+    # 超过64位的整数等 orjson 不支持的值交给标准库序列化
+    assert json.loads(dumps({'big': 2 ** 70})) == {'big': 2 ** 70}
+    assert encode(package, 'json') == text
+
+    C2SPackageHelper.set_wire_format('json')
+    assert json.loads(C2SPackageHelper.search_completed(RESULTS))['data'] == {'data_list': RESULTS}
+
+
+def test_static_packages_prebuilt():
+    """固定状态数据包直接返回预序列化的帧，内容与动态创建的数据包一致"""
+    C2SPackageHelper.set_wire_format('json')
+    assert C2SPackageHelper.searching() is STATIC_PACKAGES['searching']['json']
+    assert C2SPackageHelper.deleting_data() is STATIC_PACKAGES['deleting_data']['json']
+    assert C2SPackageHelper.reading_data() == C2SPackageHelper.create_package('data_management_response',
+                                                                              {'status': 'reading'})
+    for name, frames in STATIC_PACKAGES.items():
+        assert set(frames) == set(SUPPORTED_WIRE_FORMATS)
+        assert json.loads(frames['json'])['data'] is not None, name
+
+
+def test_msgpack_round_trip():
+    """协商为 msgpack 时数据包为二进制帧，解码后与原数据一致；协议协商数据包始终为JSON"""
+    if msgpack is None:
+        print('未安装 msgpack，跳过')
+        return
+    package = {'type': 'search_completed', 'data': {'results': RESULTS}}
+    frame = encode(package, 'msgpack')
+    assert isinstance(frame, bytes) and msgpack.unpackb(frame) == package
+    assert len(frame) < len(dumps(package).encode('utf-8'))
+    # 无法直接编码的值（如时间）转为字符串
+    assert msgpack.unpackb(encode({'at': datetime(2024, 1, 1)}, 'msgpack')) == {'at': '2024-01-01 00:00:00'}
+
+    C2SPackageHelper.set_wire_format(C2SPackageHelper.negotiate_wire_format('msgpack'))
+    try:
+        assert msgpack.unpackb(C2SPackageHelper.search_completed(RESULTS))['data'] == {'data_list': RESULTS}
+        assert msgpack.unpackb(C2SPackageHelper.searching()) == {'type': 'searching', 'data': {}}
+        assert json.loads(C2SPackageHelper.protocol_negotiated('msgpack'))['data'] == {'wire_format': 'msgpack'}
+    finally:
+        C2SPackageHelper.set_wire_format('json')
+
+    assert C2SPackageHelper.negotiate_wire_format('cbor') == 'json'
+    assert C2SPackageHelper.negotiate_wire_format(None) == 'json'
+
+
+def test_splice_request_id_matches_full_encoding():
+    """在预序列化的固定数据包后追加 request_id，与直接序列化含 request_id 的数据包结果一致"""
+    for fmt in SUPPORTED_WIRE_FORMATS:
+        for request_id in ('req-1', 42):
+            spliced = splice_request_id(STATIC_PACKAGES['searching'][fmt], fmt, request_id)
+            expected = encode({'type': 'searching', 'data': {}, 'request_id': request_id}, fmt)
+            assert spliced == expected, (fmt, spliced, expected)
+
+            C2SPackageHelper.set_wire_format(fmt)
+            C2SPackageHelper.set_request_id(request_id)
+            packet = C2SPackageHelper.filter_completed()
+            decoded = msgpack.unpackb(packet) if fmt == 'msgpack' else json.loads(packet)
+            assert decoded == {'type': 'filter_completed', 'data': {}, 'request_id': request_id}
+    C2SPackageHelper.set_wire_format('json')
+    C2SPackageHelper.set_request_id(None)
+
+
+if __name__ == "__main__":
+    tests = [test_json_round_trip_is_compact_utf8, test_static_packages_prebuilt, test_msgpack_round_trip,
+             test_splice_request_id_matches_full_encoding]
+    for test in tests:
+        test()
+        print(f"✓ {test.__name__}")
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试搜索结果解析进程池：搜索源 parse_page 从原始字节解析出结果元组、响应字符集的处理，
+以及在进程池中和在调用线程中解析的结果一致
+"""
+
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from server import parse_pool
+from server.parse_pool import decode_html, load_source_module, parse_in_pool
+
+SOURCES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'search_sources')
+YAAN_GOV = os.path.join(SOURCES_DIR, 'yaanGov.py')
+BAIDU = os.path.join(SOURCES_DIR, 'baidu.py')
+
+YAAN_GOV_PAGE = '''<html><head><meta charset="gbk"></head><body><ul>
+<li><h1><a href="http://www.yaan.gov.cn/xinwen/1.html">雅安市召开新闻发布会</a></h1><p><span>发布会介绍了城市建设进展</span></p></li>
+<li><h1><a href="http://www.yaan.gov.cn/xinwen/2.html">雨城区开展防汛演练</a></h1></li>
+<li><h1>没有链接的条目</h1><p><span>不应出现在结果中</span></p></li>
+<li><a href="/other">导航</a></li>
+</ul></body></html>'''
+
+BAIDU_PAGE = '''<html><body>
+<div class="result c-container"><h3><a href="http://www.baidu.com/link?url=1">雅安<em>新闻</em>标题</a></h3>
+<div class="c-abstract">雅安市今日召开新闻发布会，介绍城市建设情况</div><img src="//img.baidu.com/1.jpg"></div>
+<div class="result c-container"><h3><a href="http://www.baidu.com/link?url=2">雅安天气</a></h3>
+<div class="c-abstract">短</div><img data-src="/img/2.png"></div>
+</body></html>'''
+
+
+def test_yaan_gov_parse_page():
+    """按页面声明的字符集解码，只返回同时有标题和链接的结果，字段顺序见 RESULT_FIELDS"""
+    module = load_source_module(YAAN_GOV)
+    rows = module.parse_page(YAAN_GOV_PAGE.encode('gbk'))
+    assert module.RESULT_FIELDS == ('title', 'summary', 'image_url', 'source_url')
+    assert rows == [
+        ('雅安市召开新闻发布会', '发布会介绍了城市建设进展', '', 'http://www.yaan.gov.cn/xinwen/1.html'),
+        ('雨城区开展防汛演练', '', '', 'http://www.yaan.gov.cn/xinwen/2.html'),
+    ], rows
+    assert module.parse_page(b'') == []
+
+
+def test_baidu_parse_page():
+    """提取标题、概要和补全后的封面地址，概要过短时为空"""
+    module = load_source_module(BAIDU)
+    rows = module.parse_page(BAIDU_PAGE.encode('utf-8'), 'utf-8')
+    assert [dict(zip(module.RESULT_FIELDS, row)) for row in rows] == [
+        {'title': '雅安新闻标题', 'summary': '雅安市今日召开新闻发布会，介绍城市建设情况',
+         'url': 'http://www.baidu.com/link?url=1', 'cover_url': 'https://img.baidu.com/1.jpg'},
+        {'title': '雅安天气', 'summary': '', 'url': 'http://www.baidu.com/link?url=2',
+         'cover_url': 'https://www.baidu.com/img/2.png'},
+    ], rows
+
+
+def test_decode_html():
+    """响应头声明的字符集优先；requests 的默认 ISO-8859-1 和未知字符集不可信，按页面内容推断或按UTF-8解码"""
+    page = YAAN_GOV_PAGE.encode('gbk')
+    assert '雅安' in decode_html(page, 'gbk') and '雅安' in decode_html(page)
+    assert '雅安' in decode_html(page, 'ISO-8859-1')
+    assert decode_html('雅安'.encode('utf-8'), 'no-such-charset') == '雅安'
+    assert decode_html('已解码的文本') == '已解码的文本'
+
+
+def test_parse_in_pool_matches_inline():
+    """进程池中解析（传入原始字节、返回结果元组）与在调用线程中解析的结果一致"""
+    raw = YAAN_GOV_PAGE.encode('gbk')
+    try:
+        parse_pool.configure(0)
+        inline = parse_in_pool(YAAN_GOV, raw)
+        assert parse_pool.get_parse_pool() is None
+
+        parse_pool.configure(2)
+        pooled = [parse_in_pool(YAAN_GOV, raw) for _ in range(3)]
+        assert parse_pool.get_parse_pool() is not None
+        assert all(rows == inline for rows in pooled) and len(inline) == 2
+        assert parse_in_pool(BAIDU, BAIDU_PAGE.encode('utf-8'), 'utf-8')[0][0] == '雅安新闻标题'
+    finally:
+        parse_pool.shutdown()
+
+
+if __name__ == "__main__":
+    parse_pool.log = lambda message, level='INFO': None
+    tests = [test_yaan_gov_parse_page, test_baidu_parse_page, test_decode_html, test_parse_in_pool_matches_inline]
+    for test in tests:
+        test()
+        print(f"✓ {test.__name__}")
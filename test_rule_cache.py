@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试已编译爬虫规则缓存：命中时不再查询数据库、规则写入后按域名失效（不影响其他域名）、
+未找到规则的URL同样缓存，以及LRU容量和命中统计
+"""
+
+import sys
+import os
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from server.database import Database
+from server.rule_cache import RuleCache
+
+
+def count_queries(db):
+    """
+    记录 find_spider_rule 的调用次数
+    """
+    calls = []
+    find_spider_rule = db.find_spider_rule
+
+    def counted(url):
+        calls.append(url)
+        return find_spider_rule(url)
+
+    db.find_spider_rule = counted
+    return calls
+
+
+def test_rule_update_invalidates_domain():
+    """更新规则后同域名的缓存失效并读到新规则，其他域名的缓存仍然命中"""
+    with tempfile.TemporaryDirectory() as directory:
+        db = Database(os.path.join(directory, 'test.db'))
+        try:
+            db.add_spider_rule('http://example.com/news/1.html', 'example.com', '//h1', '//div[@id="content"]',
+                               request_headers={'User-Agent': 'test'})
+            db.add_spider_rule('http://other.com/a.html', 'other.com', '//h2', '//article')
+            cache = RuleCache(db)
+            queries = count_queries(db)
+
+            rule = cache.find('http://example.com/news/1.html')
+            assert rule.title_xpath == '//h1' and rule.headers == {'User-Agent': 'test'}
+            assert rule.title is not None and rule.title.path == '//h1'
+            assert cache.find('http://example.com/news/1.html') is rule
+            assert cache.find('http://other.com/a.html').title_xpath == '//h2'
+            assert len(queries) == 2
+
+            db.add_spider_rule('http://example.com/news/1.html', 'example.com', '//header/h1', '//article')
+            assert cache.find('http://example.com/news/1.html').title_xpath == '//header/h1'
+            assert cache.find('http://other.com/a.html').title_xpath == '//h2'
+            assert queries == ['http://example.com/news/1.html', 'http://other.com/a.html', 'http://example.com/news/1.html']
+
+            stats = cache.get_stats()
+            assert (stats['hits'], stats['misses'], stats['invalidations']) == (2, 3, 1), stats
+        finally:
+            db.close()
+
+
+def test_missing_rule_cached_until_domain_changes():
+    """没有规则的URL也缓存，直到该域名写入规则（嗅探或归纳）"""
+    with tempfile.TemporaryDirectory() as directory:
+        db = Database(os.path.join(directory, 'test.db'))
+        try:
+            cache = RuleCache(db)
+            queries = count_queries(db)
+            assert cache.find('http://example.com/news/2.html') is None
+            assert cache.find('http://example.com/news/2.html') is None and len(queries) == 1
+            assert cache.by_domain('example.com') == []
+
+            db.add_spider_rules([{'source_url': 'http://example.com/news/1.html', 'domain': 'example.com',
+                                  'title_xpath': '//h1', 'content_xpath': '//article'}])
+            assert [rule.source_url for rule in cache.by_domain('example.com')] == ['http://example.com/news/1.html']
+            assert cache.find('http://example.com/news/2.html') is None and len(queries) == 2
+
+            db.replace_domain_rules('example.com', [
+                {'url_pattern': r'/news/\d+\.html', 'title_xpath': '//h1', 'content_xpath': '//article',
+                 'image_xpath': None, 'request_headers': None, 'confidence': 1.0, 'sample_count': 2}])
+            rule = cache.find('http://example.com/news/2.html')
+            assert rule.is_domain_rule and rule.to_dict()['url_pattern'] == r'/news/\d+\.html'
+        finally:
+            db.close()
+
+
+def test_lru_capacity():
+    """超过容量时淘汰最久未使用的条目"""
+    with tempfile.TemporaryDirectory() as directory:
+        db = Database(os.path.join(directory, 'test.db'))
+        try:
+            cache = RuleCache(db, capacity=2)
+            queries = count_queries(db)
+            for url in ('http://a.com/1', 'http://b.com/1', 'http://a.com/1', 'http://c.com/1', 'http://a.com/1'):
+                cache.find(url)
+            # b.com 被淘汰，a.com 一直在使用中
+            assert queries == ['http://a.com/1', 'http://b.com/1', 'http://c.com/1']
+            cache.find('http://b.com/1')
+            assert len(queries) == 4 and cache.get_stats()['size'] == 2
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    RuleCache.log = lambda self, message, level='INFO': None
+    Database.log = lambda self, message, level='INFO': None
+    tests = [test_rule_update_invalidates_domain, test_missing_rule_cached_until_domain_changes, test_lru_capacity]
+    for test in tests:
+        test()
+        print(f"✓ {test.__name__}")
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试域名级规则归纳：URL模式规则和域名规则的生成、位置谓词不一致时的归纳、
+置信度过低时不生成归纳规则，以及 find_spider_rule 的回退顺序
+"""
+
+import sys
+import os
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from server.rule_generalizer import RuleGeneralizer, generalize_xpath, url_pattern
+from server.database import Database
+
+
+def make_rule(rule_id, source_url, title_xpath, content_xpath, image_xpath=None):
+    """
+    按 SPIDER_RULE_COLUMNS 顺序构造爬虫规则元组
+    """
+    return (rule_id, source_url, 'example.com', title_xpath, content_xpath, image_xpath,
+            '2024-01-01 00:00:00', '2024-01-01 00:00:00', None)
+
+
+def test_generalize_xpath():
+    """位置谓词不一致的步骤去掉谓词，置信度为结构一致的XPath所占比例"""
+    xpath, confidence = generalize_xpath(['/html/body/div[2]/h1', '/html/body/div[3]/h1', '/html/body/h2', None])
+    assert xpath == '/html/body/div/h1' and confidence == 0.5
+    assert generalize_xpath([None, '']) == (None, 0.0)
+    assert url_pattern('http://example.com/news/2024/123.html') == r'/news/\d+/\d+\.html'
+
+
+def test_generalize_url_pattern_and_domain_rule():
+    rules = [
+        make_rule(1, 'http://example.com/news/1.html', '/html/body/div[1]/h1', '//div[@id="content"]', '//img[1]'),
+        make_rule(2, 'http://example.com/news/2.html', '/html/body/div[2]/h1', '//div[@id="content"]', '//img[2]'),
+        make_rule(3, 'http://example.com/about', '/html/body/h1', '//div[@id="content"]'),
+    ]
+    generalized = {rule['url_pattern']: rule for rule in RuleGeneralizer().generalize(rules)}
+    assert set(generalized) == {r'/news/\d+\.html', ''}
+
+    news = generalized[r'/news/\d+\.html']
+    assert news['title_xpath'] == '/html/body/div/h1' and news['image_xpath'] == '//img'
+    assert news['confidence'] == 1.0 and news['sample_count'] == 2
+
+    # 域名规则：标题结构 2/3 一致，图片只有 2/3 的规则嗅探到
+    domain = generalized['']
+    assert domain['title_xpath'] == '/html/body/div/h1' and domain['confidence'] == 0.667
+    assert domain['sample_count'] == 3
+
+
+def test_low_confidence_not_generalized():
+    """页面模板不一致（置信度低于阈值）或样本不足时不生成归纳规则"""
+    rules = [
+        make_rule(1, 'http://example.com/a', '/html/body/h1', '//div[@id="a"]'),
+        make_rule(2, 'http://example.com/b', '/html/body/div/h2', '//div[@id="b"]/p'),
+        make_rule(3, 'http://example.com/c', '/html/body/section/h3', '//article'),
+    ]
+    assert RuleGeneralizer().generalize(rules) == []
+    assert RuleGeneralizer().generalize(rules[:1]) == []
+    assert len(RuleGeneralizer(min_confidence=0.3).generalize(rules)) == 1
+
+
+def test_find_spider_rule_fallback():
+    """精确规则优先，其次匹配路径的URL模式规则、域名规则；没有归纳规则时不套用其他页面的规则"""
+    with tempfile.TemporaryDirectory() as directory:
+        db = Database(os.path.join(directory, 'test.db'))
+        try:
+            db.add_spider_rule('http://example.com/news/1.html', 'example.com', '/html/body/h1', '//div[@id="content"]')
+            db.add_spider_rule('http://example.com/news/2.html', 'example.com', '/html/body/h1', '//div[@id="content"]')
+            assert db.find_spider_rule('http://example.com/news/3.html') is None
+
+            db.replace_domain_rules('example.com', [
+                {'url_pattern': r'/news/\d+\.html', 'title_xpath': '//h1', 'content_xpath': '//article',
+                 'image_xpath': None, 'request_headers': None, 'confidence': 1.0, 'sample_count': 2},
+                {'url_pattern': '', 'title_xpath': '//h2', 'content_xpath': '//main',
+                 'image_xpath': None, 'request_headers': None, 'confidence': 0.6, 'sample_count': 3},
+            ])
+            assert db.find_spider_rule('http://example.com/news/1.html')[3] == '/html/body/h1'
+            assert db.find_spider_rule('http://example.com/news/3.html')[3] == '//h1'
+            assert db.find_spider_rule('http://example.com/about')[3] == '//h2'
+            assert db.find_spider_rule('http://other.com/news/3.html') is None
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    tests = [test_generalize_xpath, test_generalize_url_pattern_and_domain_rule, test_low_confidence_not_generalized,
+             test_find_spider_rule_fallback]
+    for test in tests:
+        test()
+        print(f"✓ {test.__name__}")
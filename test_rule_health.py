@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试爬虫规则健康检查：样本页面按URL模式选取并定期换成最近存档的页面、样本页面不被淘汰，
+规则只在同模板页面上回放，以及网站改版后的新页面使规则被标记
+"""
+
+import sys
+import os
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from server.database import Database
+from server.page_archive import PageArchive
+from server.rule_health import RuleHealthChecker
+
+NEWS_PAGE = '<html><body><h1>新闻标题{0}</h1><div id="content"><p>雅安新闻正文{0}</p></div></body></html>'
+REDESIGNED_NEWS_PAGE = '<html><body><header><h2>新闻标题{0}</h2></header><article>雅安新闻正文{0}</article></body></html>'
+ABOUT_PAGE = '<html><body><div class="intro"><h3>关于我们</h3><p>单位简介</p></div></body></html>'
+
+
+def test_sample_rotates_to_recent_pages():
+    """样本只包含匹配URL模式的页面，连续使用 sample_refresh_runs 次后换成最近存档的页面"""
+    with tempfile.TemporaryDirectory() as directory:
+        archive = PageArchive(directory, max_pages_per_domain=3, sample_refresh_runs=2)
+        for i in (1, 2, 3):
+            archive.save(f'http://example.com/news/{i}.html', NEWS_PAGE.format(i))
+        archive.save('http://example.com/about', ABOUT_PAGE)
+
+        first = [url for url, _, _ in archive.sample('example.com', r'/news/\d+\.html', 2)]
+        assert first == ['http://example.com/news/2.html', 'http://example.com/news/3.html'], first
+
+        # 超出上限时淘汰不在样本中的最早页面，样本页面保留；样本使用次数未到上限时保持不变
+        for i in (4, 5, 6):
+            archive.save(f'http://example.com/news/{i}.html', NEWS_PAGE.format(i))
+        assert sorted(url for url, _, _ in archive.pages('example.com')) == [f'http://example.com/news/{i}.html' for i in range(2, 7)]
+        second = archive.sample('example.com', r'/news/\d+\.html', 2)
+        assert [url for url, _, _ in second] == first and all(os.path.exists(path) for _, path, _ in second)
+
+        urls = [url for url, _, _ in archive.sample('example.com', r'/news/\d+\.html', 2)]
+        assert urls == ['http://example.com/news/5.html', 'http://example.com/news/6.html'], urls
+        assert archive.sample('example.com', r'/other', 2) == []
+
+
+def test_redesign_is_flagged():
+    """规则只在同模板的页面上回放；改版后的页面进入样本后，产出下降的规则被标记"""
+    with tempfile.TemporaryDirectory() as directory:
+        db = Database(os.path.join(directory, 'test.db'))
+        archive = PageArchive(os.path.join(directory, 'archive'), sample_refresh_runs=1)
+        try:
+            db.add_spider_rule('http://example.com/news/1.html', 'example.com', '//h1', '//div[@id="content"]')
+            db.add_spider_rule('http://example.com/about', 'example.com', '//div[@class="intro"]/h3', '//div[@class="intro"]/p')
+            for i in (1, 2, 3):
+                archive.save(f'http://example.com/news/{i}.html', NEWS_PAGE.format(i))
+            archive.save('http://example.com/about', ABOUT_PAGE)
+
+            checker = RuleHealthChecker(db=db, archive=archive, max_workers=1, max_pages=3)
+            results = {result['rule_id']: result for result in checker.run()}
+            news_id, about_id = (db.get_spider_rule(url)[0] for url in ('http://example.com/news/1.html', 'http://example.com/about'))
+            assert results[news_id]['pages'] == 3 and results[about_id]['pages'] == 1
+            assert not any(result['flagged'] for result in results.values())
+
+            # 网站改版：新存档的页面换了模板，样本轮换到最近的页面后产出率低于基准
+            for i in (4, 5):
+                archive.save(f'http://example.com/news/{i}.html', REDESIGNED_NEWS_PAGE.format(i))
+            results = {result['rule_id']: result for result in checker.run()}
+            assert results[news_id]['pages'] == 3 and results[news_id]['matched'] == 1
+            assert results[news_id]['flagged'] and not results[about_id]['flagged']
+
+            # 基准不随被标记的结果更新
+            assert db.get_rule_health_baselines()[news_id][1] == 3
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    tests = [test_sample_rotates_to_recent_pages, test_redesign_is_flagged]
+    for test in tests:
+        test()
+        print(f"✓ {test.__name__}")
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试搜索调度：排队顺序（按用户公平分配、小搜索优先、权限等级加权）、队列位置通知、
+排队期间取消，以及多进程模式下由 supervisor 发放名额时的全局并发上限和排队取消后撤回名额申请
+"""
+
+import asyncio
+import sys
+import os
+import types
+import uuid
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from server.job_manager import JobCancelled
+from server.search_scheduler import SearchScheduler, SearchPermits
+from server.supervisor import Supervisor
+
+
+class FakeJob:
+    """
+    只提供调度器用到的属性的任务
+    """
+
+    def __init__(self, owner, name=None):
+        self.job_id = name or uuid.uuid4().hex
+        self.owner = owner
+        self.cancel_callbacks = []
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+        for callback in self.cancel_callbacks:
+            callback()
+
+    def check_cancelled(self):
+        if self.cancelled:
+            raise JobCancelled(self.job_id)
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_dispatch_order_prefers_small_and_privileged():
+    """名额用完后，权限高的用户和预计页数少的搜索先执行"""
+    async def run():
+        started = []
+
+        async def on_started(job):
+            started.append(job.job_id)
+
+        scheduler = SearchScheduler(1, on_started=on_started)
+        holder = FakeJob('holder', 'holder')
+        await scheduler.acquire(holder, 1, 0)
+
+        waiters = [
+            asyncio.create_task(scheduler.acquire(FakeJob('u1', 'big'), 20, 0)),
+            asyncio.create_task(scheduler.acquire(FakeJob('u2', 'small'), 1, 0)),
+            asyncio.create_task(scheduler.acquire(FakeJob('u3', 'admin'), 5, 4)),
+        ]
+        await settle()
+        assert [ticket.job.job_id for ticket in scheduler.dispatch_order()] == ['admin', 'small', 'big']
+
+        # 每次结束一个搜索，按调度顺序开始下一个
+        for job_id in ('holder', 'admin', 'small'):
+            owner = {'holder': 'holder', 'admin': 'u3', 'small': 'u2'}[job_id]
+            await scheduler.release(FakeJob(owner, job_id))
+            await settle()
+        await asyncio.gather(*waiters)
+        assert started == ['holder', 'admin', 'small', 'big'], started
+        assert scheduler.get_stats()['queued'] == 3
+
+    asyncio.run(run())
+
+
+def test_fair_share_between_users():
+    """已有搜索在执行的用户排在没有搜索在执行的用户之后，即使其搜索更小"""
+    async def run():
+        scheduler = SearchScheduler(2)
+        await scheduler.acquire(FakeJob('alice', 'a1'), 1, 0)
+        await scheduler.acquire(FakeJob('bob', 'b1'), 1, 0)
+        asyncio.create_task(scheduler.acquire(FakeJob('alice', 'a2'), 1, 0))
+        asyncio.create_task(scheduler.acquire(FakeJob('alice', 'a3'), 1, 0))
+        asyncio.create_task(scheduler.acquire(FakeJob('carol', 'c1'), 10, 0))
+        await settle()
+        assert [ticket.job.job_id for ticket in scheduler.dispatch_order()] == ['c1', 'a2', 'a3']
+
+        await scheduler.release(FakeJob('bob', 'b1'))
+        await settle()
+        assert scheduler.running == {'alice': 1, 'carol': 1}
+        assert scheduler.get_stats()['waiting'] == {'alice': 2}
+
+    asyncio.run(run())
+
+
+def test_queue_positions_notified():
+    """排队的搜索收到队列位置，位置变化时再次收到"""
+    async def run():
+        positions = []
+
+        async def on_queued(job, position, queue_length):
+            positions.append((job.job_id, position, queue_length))
+
+        scheduler = SearchScheduler(1, on_queued=on_queued)
+        await scheduler.acquire(FakeJob('u0', 'running'), 1, 0)
+        first = asyncio.create_task(scheduler.acquire(FakeJob('u1', 'first'), 1, 0))
+        await settle()
+        second = asyncio.create_task(scheduler.acquire(FakeJob('u2', 'second'), 2, 0))
+        await settle()
+        assert positions == [('first', 1, 1), ('second', 2, 2)], positions
+
+        positions.clear()
+        await scheduler.release(FakeJob('u0', 'running'))
+        await settle()
+        await first
+        assert positions == [('second', 1, 1)], positions
+        await scheduler.release(FakeJob('u1', 'first'))
+        await second
+
+    asyncio.run(run())
+
+
+def test_cancel_while_queued():
+    """排队期间取消的搜索移出队列并抛出 JobCancelled，不占用名额"""
+    async def run():
+        scheduler = SearchScheduler(1)
+        await scheduler.acquire(FakeJob('u0', 'running'), 1, 0)
+        job = FakeJob('u1', 'queued')
+        waiter = asyncio.create_task(scheduler.acquire(job, 1, 0))
+        await settle()
+        job.cancel()
+        try:
+            await waiter
+        except JobCancelled:
+            pass
+        else:
+            raise AssertionError('排队中的搜索取消后应抛出 JobCancelled')
+        assert scheduler.waiting() == 0
+        assert scheduler.get_stats()['cancelled_in_queue'] == 1
+
+        await scheduler.release(FakeJob('u0', 'running'))
+        assert scheduler.running_total() == 0
+
+    asyncio.run(run())
+
+
+def attach_workers(supervisor, count):
+    """
+    创建 count 个使用 supervisor 名额的调度器（模拟IPC：消息在事件循环的下一轮送达）
+
+    Returns:
+        tuple: (调度器列表, 模拟的工作进程列表)，工作进程的 grants 记录收到的名额数
+    """
+    loop = asyncio.get_running_loop()
+    schedulers, workers = [], []
+    for worker_id in range(1, count + 1):
+        scheduler = SearchScheduler()
+        worker = types.SimpleNamespace(worker_id=worker_id, permits_held=0, permits_wanted=0, disconnected=False, grants=0)
+
+        def send(message, scheduler=scheduler, worker=worker):
+            worker.grants += message['data']['count']
+            loop.call_soon(scheduler.on_permits_granted, message['data']['count'])
+
+        worker.send = send
+        scheduler.use_permits(SearchPermits(lambda kind, data, worker=worker: loop.call_soon(
+            supervisor.handle_message, worker, {'kind': kind, 'data': data})))
+        supervisor.workers.append(worker)
+        schedulers.append(scheduler)
+        workers.append(worker)
+    return schedulers, workers
+
+
+def test_permits_limit_across_workers():
+    """多进程模式：两个工作进程的调度器共用 supervisor 发放的名额，同时执行的搜索数不超过上限"""
+    async def run():
+        supervisor = Supervisor(workers=2, server_options={'max_concurrent_searches': 2})
+        schedulers, _ = attach_workers(supervisor, 2)
+
+        running = 0
+        peak = 0
+
+        async def search(scheduler, owner):
+            nonlocal running, peak
+            async with scheduler.slot(FakeJob(owner), 1):
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        await asyncio.gather(*(search(schedulers[i % 2], f'user{i}') for i in range(8)))
+        await settle()
+        assert peak == 2, peak
+        assert supervisor.search_permits == 2
+        assert [scheduler.permits.held for scheduler in schedulers] == [0, 0]
+
+    asyncio.run(run())
+
+
+def test_cancelled_waiters_withdraw_permit_requests():
+    """排队的搜索被取消后撤回名额申请，归还的名额直接发给仍有等待者的工作进程"""
+    async def run():
+        supervisor = Supervisor(workers=2, server_options={'max_concurrent_searches': 1})
+        (first, second), (first_worker, second_worker) = attach_workers(supervisor, 2)
+
+        running = FakeJob('u0', 'running')
+        holder = asyncio.create_task(first.acquire(running, 1, 0))
+        await settle()
+        await holder
+        queued = [FakeJob('u1'), FakeJob('u2')]
+        waiters = [asyncio.create_task(first.acquire(job, 1, 0)) for job in queued]
+        await settle()
+        assert first_worker.permits_wanted == 2 and first.permits.requested == 2
+
+        for job in queued:
+            job.cancel()
+        await settle()
+        assert first_worker.permits_wanted == 0 and first.permits.requested == 0
+        for waiter in waiters:
+            try:
+                await waiter
+            except JobCancelled:
+                pass
+
+        other = asyncio.create_task(second.acquire(FakeJob('u3', 'other'), 1, 0))
+        await settle()
+        await first.release(running)
+        await settle()
+        await other
+        assert (first_worker.grants, second_worker.grants) == (1, 1)
+        assert second.running_total() == 1 and supervisor.search_permits == 0
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    tests = [test_dispatch_order_prefers_small_and_privileged, test_fair_share_between_users,
+             test_queue_positions_notified, test_cancel_while_queued, test_permits_limit_across_workers,
+             test_cancelled_waiters_withdraw_permit_requests]
+    for test in tests:
+        test()
+        print(f"✓ {test.__name__}")
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试批量嗅探（不访问外网）：同一域名同时进行的嗅探数不超过 per_domain、不同域名并行进行，
+失败项以 None 回调，以及进度报告和取消
+"""
+
+import sys
+import os
+import threading
+import time
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from server.spider_tool import SpiderTool
+
+
+class ConcurrencyProbe:
+    """
+    替代 sniff_rules：每次嗅探耗时 delay 秒，并记录每个域名的最大并发数
+    """
+
+    def __init__(self, spider_tool, delay=0.05, failing=()):
+        self.spider_tool = spider_tool
+        self.delay = delay
+        self.failing = set(failing)
+        self.active = {}
+        self.max_active = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, url, target_title, progress=None):
+        domain = self.spider_tool.get_domain(url)
+        with self.lock:
+            self.active[domain] = self.active.get(domain, 0) + 1
+            self.max_active[domain] = max(self.max_active.get(domain, 0), self.active[domain])
+        try:
+            time.sleep(self.delay)
+            if url in self.failing:
+                raise RuntimeError('页面解析失败')
+            return {'source_url': url, 'domain': domain, 'title_xpath': '//h1'}
+        finally:
+            with self.lock:
+                self.active[domain] -= 1
+
+
+def make_items(domains, per_domain):
+    return [{'source_url': f'http://{domain}/news/{i}.html', 'target_title': f'标题{i}'}
+            for domain in domains for i in range(per_domain)]
+
+
+def test_per_domain_cap():
+    """同一域名最多 per_domain 个嗅探同时进行，不同域名之间并行"""
+    spider_tool = SpiderTool()
+    probe = ConcurrencyProbe(spider_tool)
+    spider_tool.sniff_rules = probe
+    items = make_items(['a.com', 'b.com', 'c.com'], 6)
+
+    started = time.monotonic()
+    results = spider_tool.sniff_rules_batch(items, max_workers=8, per_domain=2)
+    elapsed = time.monotonic() - started
+
+    assert len(results) == len(items)
+    assert probe.max_active == {'a.com': 2, 'b.com': 2, 'c.com': 2}, probe.max_active
+    # 每个域名6项、每次2个并行，至少需要3轮；三个域名同时进行，不需要9轮
+    assert 3 * probe.delay <= elapsed < 9 * probe.delay, elapsed
+
+    probe = ConcurrencyProbe(spider_tool)
+    spider_tool.sniff_rules = probe
+    spider_tool.sniff_rules_batch(make_items(['a.com'], 4), max_workers=8, per_domain=1)
+    assert probe.max_active == {'a.com': 1}
+
+
+def test_results_streamed_and_failures_reported():
+    """每完成一项回调一次（失败时 rules 为 None），失败项不计入返回的规则"""
+    spider_tool = SpiderTool()
+    items = make_items(['a.com', 'b.com'], 3)
+    spider_tool.sniff_rules = ConcurrencyProbe(spider_tool, delay=0.01, failing={'http://b.com/news/1.html'})
+    finished = []
+    reports = []
+    results = spider_tool.sniff_rules_batch(items, on_result=lambda item, rules: finished.append((item, rules)),
+                                            progress=lambda stage, percent, message: reports.append((percent, message)))
+
+    assert len(results) == 5 and len(finished) == 6
+    assert [item for item, rules in finished if rules is None] == [items[4]]
+    assert reports[-1] == (100, '6/6')
+    assert spider_tool.sniff_rules_batch([]) == []
+
+
+def test_progress_callback_cancels_batch():
+    """进度回调抛出异常（任务取消）时不再等待剩余嗅探"""
+    spider_tool = SpiderTool()
+    probe = ConcurrencyProbe(spider_tool, delay=0.05)
+    spider_tool.sniff_rules = probe
+
+    def cancel(stage, percent, message):
+        raise RuntimeError('任务已取消')
+
+    started = time.monotonic()
+    try:
+        spider_tool.sniff_rules_batch(make_items(['a.com'], 10), per_domain=1, progress=cancel)
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError('取消应中止批量嗅探')
+    assert time.monotonic() - started < 5 * probe.delay
+
+
+if __name__ == "__main__":
+    tests = [test_per_domain_cap, test_results_streamed_and_failures_reported, test_progress_callback_cancels_batch]
+    for test in tests:
+        test()
+        print(f"✓ {test.__name__}")
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试静态文件服务器（使用临时目录和本地端口）：ETag / If-Modified-Since 条件请求返回 304、
+按 Accept-Encoding 选择预压缩版本，以及 css / js 指纹文件名的改写和长期缓存
+"""
+
+import sys
+import os
+import gzip
+import re
+import tempfile
+import threading
+import email.utils
+import http.client
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from server import static_server
+from server.static_server import StaticHTTPServer, IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL
+
+INDEX_HTML = ('<html><head><link rel="stylesheet" href="css/style.css"></head><body>'
+              + '<p>雅安舆情监测</p>' * 50 + '<script src="/js/app.js"></script></body></html>')
+APP_JS = 'console.log("watchtower");\n' * 50
+STYLE_CSS = 'body { margin: 0; }\n'
+
+PAGE_MTIME = 1700000000
+
+
+def make_client_dir(directory):
+    """
+    生成包含 index.html、js/app.js、css/style.css 的临时前端目录，修改时间均为 PAGE_MTIME
+    """
+    files = {'index.html': INDEX_HTML, 'js/app.js': APP_JS, 'css/style.css': STYLE_CSS}
+    for name, content in files.items():
+        path = os.path.join(directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.utime(path, (PAGE_MTIME, PAGE_MTIME))
+
+
+def start_server(directory):
+    server = StaticHTTPServer(('127.0.0.1', 0), directory)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def request(server, path, headers=None, method='GET'):
+    connection = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=5)
+    try:
+        connection.request(method, path, headers=headers or {})
+        response = connection.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    finally:
+        connection.close()
+
+
+def test_fingerprinted_references():
+    """HTML 中的 css / js 引用改写为指纹文件名（保持相对写法），指纹文件长期缓存，HTML 每次验证"""
+    with tempfile.TemporaryDirectory() as directory:
+        make_client_dir(directory)
+        server = start_server(directory)
+        try:
+            status, headers, body = request(server, '/')
+            assert status == 200 and headers['Cache-Control'] == REVALIDATE_CACHE_CONTROL
+            html = body.decode('utf-8')
+            script = re.search(r'src="(/js/app\.[0-9a-f]{8}\.js)"', html).group(1)
+            assert re.search(r'href="css/style\.[0-9a-f]{8}\.css"', html)
+
+            status, headers, body = request(server, script)
+            assert status == 200 and body == APP_JS.encode('utf-8')
+            assert headers['Cache-Control'] == IMMUTABLE_CACHE_CONTROL
+            assert 'javascript' in headers['Content-Type'] and headers['Content-Type'].endswith('charset=utf-8')
+
+            # 原文件名仍可访问，但不长期缓存
+            status, headers, _ = request(server, '/js/app.js')
+            assert status == 200 and headers['Cache-Control'] == REVALIDATE_CACHE_CONTROL
+            assert request(server, '/missing.js')[0] == 404
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+def test_not_modified_via_etag():
+    """If-None-Match 与当前表示的 ETag 一致时返回 304，且优先于 If-Modified-Since"""
+    with tempfile.TemporaryDirectory() as directory:
+        make_client_dir(directory)
+        server = start_server(directory)
+        try:
+            _, headers, _ = request(server, '/index.html')
+            etag = headers['ETag']
+
+            status, headers, body = request(server, '/index.html', {'If-None-Match': etag})
+            assert status == 304 and body == b'' and headers['ETag'] == etag
+            assert request(server, '/index.html', {'If-None-Match': f'"other", W/{etag}'})[0] == 304
+
+            # ETag 不一致时即使 If-Modified-Since 满足也返回完整内容
+            status, _, body = request(server, '/index.html', {
+                'If-None-Match': '"other"', 'If-Modified-Since': email.utils.formatdate(PAGE_MTIME + 60, usegmt=True)})
+            assert status == 200 and body
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+def test_not_modified_via_if_modified_since():
+    """没有 If-None-Match 时按 If-Modified-Since 判断，早于修改时间则返回完整内容"""
+    with tempfile.TemporaryDirectory() as directory:
+        make_client_dir(directory)
+        server = start_server(directory)
+        try:
+            status, headers, _ = request(server, '/css/style.css')
+            assert status == 200 and headers['Last-Modified'] == email.utils.formatdate(PAGE_MTIME, usegmt=True)
+
+            status, _, body = request(server, '/css/style.css', {'If-Modified-Since': headers['Last-Modified']})
+            assert status == 304 and body == b''
+            earlier = email.utils.formatdate(PAGE_MTIME - 60, usegmt=True)
+            assert request(server, '/css/style.css', {'If-Modified-Since': earlier})[0] == 200
+            assert request(server, '/css/style.css', {'If-Modified-Since': 'not a date'})[0] == 200
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+def test_rewritten_html_tracks_referenced_assets():
+    """只修改 js 时，改写后的 HTML 的 Last-Modified 随之更新，If-Modified-Since 不再返回 304"""
+    with tempfile.TemporaryDirectory() as directory:
+        make_client_dir(directory)
+        cached = email.utils.formatdate(PAGE_MTIME, usegmt=True)
+
+        with open(os.path.join(directory, 'js', 'app.js'), 'a', encoding='utf-8') as f:
+            f.write('console.log("v2");\n')
+        os.utime(os.path.join(directory, 'js', 'app.js'), (PAGE_MTIME + 3600, PAGE_MTIME + 3600))
+
+        server = start_server(directory)
+        try:
+            status, headers, body = request(server, '/', {'If-Modified-Since': cached})
+            assert status == 200, status
+            assert headers['Last-Modified'] == email.utils.formatdate(PAGE_MTIME + 3600, usegmt=True)
+            script = re.search(r'src="(/js/app\.[0-9a-f]{8}\.js)"', body.decode('utf-8')).group(1)
+            assert request(server, script)[2].endswith(b'console.log("v2");\n')
+
+            assert request(server, '/', {'If-Modified-Since': headers['Last-Modified']})[0] == 304
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+def test_accept_encoding_selects_variant():
+    """按 Accept-Encoding 选择 gzip 版本，不同编码使用不同的 ETag，q=0 表示不接受"""
+    with tempfile.TemporaryDirectory() as directory:
+        make_client_dir(directory)
+        server = start_server(directory)
+        try:
+            status, identity_headers, identity_body = request(server, '/js/app.js')
+            assert status == 200 and 'Content-Encoding' not in identity_headers
+            assert identity_headers['Vary'] == 'Accept-Encoding'
+
+            status, headers, body = request(server, '/js/app.js', {'Accept-Encoding': 'gzip, deflate'})
+            assert status == 200 and headers['Content-Encoding'] == 'gzip' and headers['Vary'] == 'Accept-Encoding'
+            assert gzip.decompress(body) == identity_body and int(headers['Content-Length']) == len(body)
+            assert headers['ETag'] != identity_headers['ETag']
+
+            # 304 只对相同编码的 ETag 生效
+            assert request(server, '/js/app.js', {'Accept-Encoding': 'gzip', 'If-None-Match': headers['ETag']})[0] == 304
+            assert request(server, '/js/app.js', {'If-None-Match': headers['ETag']})[0] == 200
+
+            _, headers, _ = request(server, '/js/app.js', {'Accept-Encoding': 'gzip;q=0'})
+            assert 'Content-Encoding' not in headers
+
+            # 过小的文件不压缩，也不需要 Vary
+            _, headers, _ = request(server, '/css/style.css', {'Accept-Encoding': 'gzip'})
+            assert 'Content-Encoding' not in headers and 'Vary' not in headers
+
+            status, headers, body = request(server, '/js/app.js', {'Accept-Encoding': 'gzip'}, method='HEAD')
+            assert status == 200 and body == b'' and headers['Content-Encoding'] == 'gzip'
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    static_server.log = lambda message, level='INFO': None
+    tests = [test_fingerprinted_references, test_not_modified_via_etag, test_not_modified_via_if_modified_since,
+             test_rewritten_html_tracks_referenced_assets, test_accept_encoding_selects_variant]
+    for test in tests:
+        test()
+        print(f"✓ {test.__name__}")
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试多进程 supervisor 的进程管理逻辑（不启动真实进程）：
+工作进程异常退出后按退避间隔重启、滚动重启时新进程就绪后旧进程下线、
+退出进程持有的搜索执行名额被收回并发放给其他进程，以及数据变更通知的转发
+"""
+
+import sys
+import os
+import time
+import types
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from server import supervisor as supervisor_module
+from server.supervisor import Supervisor, MIN_UPTIME, RESTART_DELAY
+
+
+def make_supervisor(workers=1, **options):
+    """
+    创建 start_worker 只记录槽位、不启动进程的 supervisor
+    """
+    supervisor = Supervisor(workers=workers, drain_timeout=1, server_options=options)
+    supervisor.started_slots = []
+
+    def start_worker(slot):
+        worker = FakeWorker(slot, supervisor.next_worker_id)
+        supervisor.next_worker_id += 1
+        supervisor.workers.append(worker)
+        supervisor.started_slots.append(slot)
+        return worker
+
+    supervisor.start_worker = start_worker
+    return supervisor
+
+
+class FakeWorker:
+    def __init__(self, slot, worker_id, uptime=0):
+        self.slot = slot
+        self.worker_id = worker_id
+        self.started_at = time.monotonic() - uptime
+        self.process = types.SimpleNamespace(join=lambda: None, exitcode=1, is_alive=lambda: True,
+                                             terminate=lambda: None, pid=1000 + worker_id)
+        self.ready = False
+        self.draining = False
+        self.disconnected = False
+        self.kill_at = None
+        self.permits_held = 0
+        self.permits_wanted = 0
+        self.messages = []
+
+    def send(self, message):
+        self.messages.append(message)
+
+    def drain(self, timeout):
+        self.draining = True
+
+    def close(self):
+        pass
+
+
+def test_crashed_worker_restarts_with_backoff():
+    """启动后很快退出的工作进程重启间隔逐次加倍，运行足够久后退出按固定间隔重启"""
+    supervisor = make_supervisor()
+    worker = supervisor.start_worker(0)
+
+    delays = []
+    for _ in range(3):
+        supervisor.handle_exit(worker)
+        delays.append(supervisor.restart_delays[0])
+        supervisor.pending_restarts[0] = 0
+        supervisor.check_timers()
+        worker = supervisor.workers[-1]
+    assert delays == [RESTART_DELAY, RESTART_DELAY * 2, RESTART_DELAY * 4], delays
+    assert supervisor.started_slots == [0, 0, 0, 0]
+
+    worker.started_at -= MIN_UPTIME + 1
+    supervisor.handle_exit(worker)
+    assert supervisor.restart_delays[0] == RESTART_DELAY
+
+
+def test_draining_worker_is_not_restarted():
+    supervisor = make_supervisor()
+    worker = supervisor.start_worker(0)
+    worker.draining = True
+    supervisor.handle_exit(worker)
+    assert supervisor.pending_restarts == {} and supervisor.workers == []
+
+
+def test_rolling_restart_drains_old_worker_when_new_is_ready():
+    supervisor = make_supervisor(workers=2)
+    old = [supervisor.start_worker(slot) for slot in range(2)]
+    supervisor.rolling_restart()
+    new = supervisor.workers[2:]
+    assert sorted(worker.slot for worker in new) == [0, 1]
+
+    supervisor.handle_message(new[0], {'kind': 'ready', 'data': None})
+    drained = [worker for worker in old if worker.draining]
+    assert drained == [worker for worker in old if worker.slot == new[0].slot]
+
+
+def test_search_permits_reclaimed_from_exited_worker():
+    """名额发给持有最少的进程；进程退出后其名额收回并发给仍在等待的进程"""
+    supervisor = make_supervisor(workers=2, max_concurrent_searches=2)
+    first, second = supervisor.start_worker(0), supervisor.start_worker(1)
+
+    supervisor.handle_message(first, {'kind': 'search_permit_request', 'data': {'count': 3}})
+    assert first.permits_held == 2 and supervisor.search_permits == 0
+    supervisor.handle_message(second, {'kind': 'search_permit_request', 'data': {'count': 1}})
+    assert second.permits_held == 0 and second.permits_wanted == 1
+
+    # 归还的名额优先发给持有较少的进程
+    supervisor.handle_message(first, {'kind': 'search_permit_release', 'data': {'count': 1}})
+    assert second.permits_held == 1 and first.permits_held == 1
+
+    supervisor.handle_exit(first)
+    assert supervisor.search_permits == 1
+    assert [message['kind'] for message in second.messages] == ['search_permit_grant']
+
+
+def test_notifications_forwarded_to_other_workers():
+    supervisor = make_supervisor(workers=3)
+    workers = [supervisor.start_worker(slot) for slot in range(3)]
+    workers[2].disconnected = True
+    message = {'kind': 'records_deleted', 'data': {'topic': 'data_records', 'record_ids': [1]}, 'worker': 1}
+    supervisor.handle_message(workers[0], message)
+    assert workers[0].messages == [] and workers[1].messages == [message] and workers[2].messages == []
+
+
+if __name__ == "__main__":
+    supervisor_module.Supervisor.log = lambda self, message, level='INFO': None
+    tests = [test_crashed_worker_restarts_with_backoff, test_draining_worker_is_not_restarted,
+             test_rolling_restart_drains_old_worker_when_new_is_ready, test_search_permits_reclaimed_from_exited_worker,
+             test_notifications_forwarded_to_other_workers]
+    for test in tests:
+        test()
+        print(f"✓ {test.__name__}")